@@ -1,117 +1,175 @@
-import matplotlib.pyplot as plt
-
-# 文件路径
-file_path = 'BAND.dat'  # 数据文件路径
-band_gap_file_path = 'BAND_GAP'  # Band Gap 文件路径
-klabels_file_path = 'KLABELS'  # KLABELS 文件路径
-
-# 初始化存储多条线的数据
-all_lines = []
-x = []
-y = []
-
-# 读取 BAND.dat 文件数据
-with open(file_path, 'r') as file:
-    lines = file.readlines()
-    # 从第三行开始处理数据
-    for line in lines[2:]:
-        line = line.strip()
+import argparse
 
-        # 检查是否是空行
-        if line == "":
-            # 如果遇到空行且x和y有数据，将数据存储为一条线并重置
-            if x and y:
-                all_lines.append((x, y))
-                x = []
-                y = []
-            continue
+import numpy as np
+
+# --- BAND.dat 读取与绘制 ---
+# load_band 一次读入整个文件: 去掉 "# Band-Index" 后整体 split 并一次转为浮点数组，
+# 按能带数 reshape 成 (能带数, k 点数)；格式不规则时退回逐行解析 (与原来的逐行读取结果相同)。
+# render 把所有能带作为一个 LineCollection 画出 (不再每条能带调用一次 plt.plot)，完全在纵轴范围外的能带直接跳过。
 
-        # 检查是否是以# Band-Index开头的行
-        if line.startswith("# Band-Index"):
-            # 如果当前有数据未保存，先保存数据
+
+def _load_band_lines(text):
+    # 原来的逐行解析: 空行或 "# Band-Index" 分隔能带，无法解析为两个数的行跳过
+    bands = []
+    x, y = [], []
+    for line in text.splitlines()[2:]:
+        line = line.strip()
+        if line == "" or line.startswith("# Band-Index"):
             if x and y:
-                all_lines.append((x, y))
-                x = []
-                y = []
+                bands.append((x, y))
+                x, y = [], []
             continue
-
-        # 处理数据行
         try:
-            # 分割数据行并转换为浮点数
             x_value, y_value = map(float, line.split())
-            x.append(x_value)
-            y.append(y_value)
         except ValueError:
-            # 如果转换失败，跳过该行
             continue
-
-# 确保最后一组数据也被添加
-if x and y:
-    all_lines.append((x, y))
-
-# 计算 x 轴的最大值
-x_max = max(max(line[0]) for line in all_lines)
-
-# 读取 BAND_GAP 文件并提取 Band Gap 值
-band_gap_value = None
-with open(band_gap_file_path, 'r') as file:
-    for line in file:
-        if "Band Gap" in line:
-            # 提取 Band Gap 行的最后一个数据
-            band_gap_value = float(line.strip().split()[-1])
-            break
-
-# 读取 KLABELS 文件并提取刻度标签位置
-klabels_positions = []
-with open(klabels_file_path, 'r') as file:
-    for line in file:
-        parts = line.strip().split()
-        if len(parts) > 1:
-            try:
-                klabels_positions.append(float(parts[1]))
-            except ValueError:
-                continue
-
-# 假设你的刻度标签为 ['G', 'M', 'K', 'G']
-klabels_labels = ['G', 'M', 'K', 'G']
-
-# 创建图形并设置大小和分辨率
-plt.figure(figsize=(6, 5), dpi=400)
-
-# 绘制所有线条，统一使用蓝色折线
-for line in all_lines:
-    plt.plot(line[0], line[1], color='blue')
-
-# 设置纵轴范围
-plt.ylim(-4, 4)
-
-# 设置横轴范围从0到数据中的最大值
-plt.xlim(0, x_max)
-
-# 设置 x 轴刻度位置和标签
-if klabels_positions and len(klabels_positions) == len(klabels_labels):
-    plt.xticks(ticks=klabels_positions, labels=klabels_labels)
-
-# 在 y=0 处添加虚线
-plt.axhline(y=0, color='red', linestyle='--')
-
-# 设置刻度线朝内
-plt.tick_params(axis='both', direction='in')
-
-# 绘制纵向网格线（虚线）
-plt.grid(which='major', axis='x', linestyle='--')
-
-# 隐藏横向网格线
-plt.grid(which='major', axis='y', linestyle='none')
-
-# 设置标题
-plt.title(f'Band Gap  = {band_gap_value:.2f} eV')
-# 添加上标题
-#if band_gap_value is not None:
-#    plt.suptitle(f'Band Gap (Eg) = {band_gap_value}', x=0.5, y=1.02, ha='center')
-
-# 保存图像为文件
-plt.savefig('output_plot.png', bbox_inches='tight')  # 可以更改为需要的文件名和格式
-
-# 显示图像
-plt.show()
+        x.append(x_value)
+        y.append(y_value)
+    if x and y:
+        bands.append((x, y))
+    return bands
+
+
+def _pad(bands):
+    # [(k, E), ...] -> 两个 (能带数, 最大 k 点数) 数组，长度不足的补 NaN
+    nk = max((len(x) for x, _ in bands), default=0)
+    k = np.full((len(bands), nk), np.nan)
+    energies = np.full((len(bands), nk), np.nan)
+    for row, (x, y) in enumerate(bands):
+        k[row, :len(x)] = x
+        energies[row, :len(y)] = y
+    return k, energies
+
+
+def load_band(path='BAND.dat'):
+    # -> (k, energies): energies 形状 (能带数, k 点数)；各能带的 k 相同时 k 形状为 (k 点数,)，否则与 energies 相同
+    with open(path, 'rb') as f:
+        data = f.read()
+    parts = data.split(b'\n', 2)
+    body = parts[2] if len(parts) == 3 else b''
+    nbands = body.count(b'# Band-Index')
+    # 第一条数据行应为两列 (k E)，例如自旋极化的三列文件走逐行解析
+    first = body[body.find(b'\n', body.find(b'# Band-Index')) + 1:].split(b'\n', 1)[0].split()
+    if nbands and body.count(b'#') == nbands and len(first) == 2:
+        # 去掉 "# Band-Index" 后每条能带为: 序号 k E k E ...
+        try:
+            values = np.array(body.replace(b'# Band-Index', b'').split(), dtype=float)
+        except ValueError:
+            values = np.empty(0)
+        if values.size and values.size % nbands == 0 and (values.size // nbands) % 2 == 1:
+            rows = values.reshape(nbands, -1)
+            if np.array_equal(rows[:, 0], np.arange(1, nbands + 1)):
+                pairs = rows[:, 1:].reshape(nbands, -1, 2)
+                k, energies = pairs[:, :, 0], pairs[:, :, 1]
+                return (k[0].copy() if (k == k[0]).all() else k.copy()), energies.copy()
+    # 不规则的文件: 逐行解析
+    k, energies = _pad(_load_band_lines(data.decode('ascii', 'replace')))
+    if len(k) and np.array_equal(k, np.broadcast_to(k[0], k.shape), equal_nan=True):
+        k = k[0]
+    return k, energies
+
+
+def read_band_gap(path='BAND_GAP'):
+    with open(path, 'r') as file:
+        for line in file:
+            if "Band Gap" in line:
+                # 提取 Band Gap 行的最后一个数据
+                return float(line.strip().split()[-1])
+    return None
+
+
+def read_klabels(path='KLABELS'):
+    # 刻度标签位置
+    positions = []
+    with open(path, 'r') as file:
+        for line in file:
+            parts = line.strip().split()
+            if len(parts) > 1:
+                try:
+                    positions.append(float(parts[1]))
+                except ValueError:
+                    continue
+    return positions
+
+
+def render(ax, k, energies, ylim=None, color='blue', linewidth=None):
+    # 所有能带作为一个 LineCollection；ylim 给出时跳过完全在范围外的能带
+    import matplotlib as mpl
+    from matplotlib.collections import LineCollection
+
+    k = np.broadcast_to(k, energies.shape)
+    if ylim is not None:
+        visible = (np.nanmax(energies, axis=1) >= ylim[0]) & (np.nanmin(energies, axis=1) <= ylim[1])
+        k, energies = k[visible], energies[visible]
+    segments = np.stack([k, energies], axis=-1)
+    lines = LineCollection(segments, colors=color,
+                           linewidths=mpl.rcParams['lines.linewidth'] if linewidth is None else linewidth)
+    ax.add_collection(lines)
+    return lines
+
+
+def plot(k, energies, band_gap_value, klabels_positions, klabels_labels=('G', 'M', 'K', 'G'), ylim=(-4, 4)):
+    import matplotlib.pyplot as plt
+
+    # 创建图形并设置大小和分辨率
+    fig, ax = plt.subplots(figsize=(6, 5), dpi=400)
+
+    # 绘制所有线条，统一使用蓝色折线
+    render(ax, k, energies, ylim)
+
+    # 设置纵轴范围
+    ax.set_ylim(*ylim)
+
+    # 设置横轴范围从0到数据中的最大值
+    ax.set_xlim(0, np.nanmax(k))
+
+    # 设置 x 轴刻度位置和标签
+    if klabels_positions and len(klabels_positions) == len(klabels_labels):
+        ax.set_xticks(klabels_positions)
+        ax.set_xticklabels(klabels_labels)
+
+    # 在 y=0 处添加虚线
+    ax.axhline(y=0, color='red', linestyle='--')
+
+    # 设置刻度线朝内
+    ax.tick_params(axis='both', direction='in')
+
+    # 绘制纵向网格线（虚线）
+    ax.grid(which='major', axis='x', linestyle='--')
+
+    # 隐藏横向网格线
+    ax.grid(which='major', axis='y', linestyle='none')
+
+    # 设置标题
+    if band_gap_value is not None:
+        ax.set_title(f'Band Gap  = {band_gap_value:.2f} eV')
+    return fig
+
+
+def main():
+    parser = argparse.ArgumentParser(description="绘制 2D 材料的能带图 (vaspkit 的 BAND.dat、BAND_GAP、KLABELS)。")
+    parser.add_argument('--band', default='BAND.dat', help='数据文件路径 (默认: BAND.dat)')
+    parser.add_argument('--band-gap', default='BAND_GAP', help='Band Gap 文件路径 (默认: BAND_GAP)')
+    parser.add_argument('--klabels', default='KLABELS', help='KLABELS 文件路径 (默认: KLABELS)')
+    parser.add_argument('--labels', nargs='+', default=['G', 'M', 'K', 'G'], help='刻度标签 (默认: G M K G)')
+    parser.add_argument('--ylim', nargs=2, type=float, default=[-4, 4], help='纵轴范围 (默认: -4 4)')
+    parser.add_argument('-o', '--output', default='output_plot.png', help='输出图片 (默认: output_plot.png)')
+    parser.add_argument('--show', action='store_true', help='保存后显示窗口 (默认只用 Agg 后端保存)')
+    args = parser.parse_args()
+
+    import matplotlib
+    if not args.show:
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    k, energies = load_band(args.band)
+    fig = plot(k, energies, read_band_gap(args.band_gap), read_klabels(args.klabels), args.labels, args.ylim)
+
+    # 保存图像为文件
+    fig.savefig(args.output, bbox_inches='tight')
+    if args.show:
+        plt.show()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+import argparse
+import hashlib
+import os
+import sys
+
+import numpy as np
+
+from outcar import Outcar, resolve
+
+# --- 能带数据缓存 ---
+# 一次解析 EIGENVAL (本征值、占据数、k 点)、KPOINTS (线模式的分段与标签)、POSCAR (倒格子，用于 k 路径长度)
+# 和 OUTCAR (最后的 E-fermi)，保存为紧凑的 .bandcache.npz。之后带隙、带边、作图都从缓存读取，
+# 调整图的样式或只查询带隙时不再解析 VASP 输出。
+# 缓存记录各源文件的 大小、修改时间 和 SHA-1: 大小与修改时间未变时直接使用；变了则重新计算 SHA-1，
+# 内容相同 (例如复制或 touch 过) 时仍使用缓存，否则重新解析。
+
+CACHE_FILE = '.bandcache.npz'
+CACHE_VERSION = 1
+SOURCES = ('EIGENVAL', 'KPOINTS', 'POSCAR', 'OUTCAR')
+
+
+def file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_eigenval(path):
+    # -> (本征值 (ispin, nk, nb), 占据数 (ispin, nk, nb) 或 None, k 点 (nk, 3) 分数坐标, 权重 (nk,))
+    with open(path) as f:
+        header = [f.readline() for _ in range(6)]
+        rest = f.read()
+    ispin = int(header[0].split()[3])
+    nkpts, nbands = map(int, header[5].split()[1:3])
+    # 第一个 k 点之后第一行本征值的列数: 序号 E [E_down] [occ [occ_down]]
+    lines = rest.lstrip('\n').split('\n', 2)
+    ncols = len(lines[1].split())
+    values = np.array(rest.split(), dtype=float)
+    per_k = 4 + nbands * ncols
+    if values.size != nkpts * per_k:
+        raise ValueError(f"{path}: 数据数 {values.size} 与 {nkpts} 个 k 点 x {nbands} 条能带 x {ncols} 列不符")
+    blocks = values.reshape(nkpts, per_k)
+    kpoints, weights = blocks[:, :3], blocks[:, 3]
+    bands = blocks[:, 4:].reshape(nkpts, nbands, ncols)
+    energies = bands[:, :, 1:1 + ispin].transpose(2, 0, 1)
+    occupations = bands[:, :, 1 + ispin:1 + 2 * ispin].transpose(2, 0, 1) if ncols >= 1 + 2 * ispin else None
+    return energies.copy(), None if occupations is None else occupations.copy(), kpoints.copy(), weights.copy()
+
+
+def read_kpoints(path):
+    # 线模式 KPOINTS -> (每段 k 点数, 各高对称点标签 [起点1, 终点1, 起点2, ...])；非线模式返回 (None, [])
+    try:
+        with open(path) as f:
+            lines = f.read().splitlines()
+    except FileNotFoundError:
+        return None, []
+    if len(lines) < 4 or not lines[2].strip().lower().startswith('l'):
+        return None, []
+    per_segment = int(lines[1].split()[0])
+    labels = []
+    for line in lines[4:]:
+        if not line.strip():
+            continue
+        parts = line.split('!')
+        tokens = parts[0].split()
+        labels.append(parts[1].strip() if len(parts) > 1 else tokens[3] if len(tokens) > 3 else '')
+    return per_segment, labels
+
+
+def read_reciprocal(path):
+    # POSCAR 的倒格子 (行向量，1/Å，不含 2π)
+    with open(path) as f:
+        lines = f.readlines()
+    scale = float(lines[1].split()[0])
+    lattice = np.array([list(map(float, line.split()[:3])) for line in lines[2:5]])
+    if scale < 0:  # 负数表示体积
+        scale = (-scale / abs(np.linalg.det(lattice))) ** (1 / 3)
+    return np.linalg.inv(scale * lattice).T
+
+
+def kpath(kpoints, reciprocal, per_segment=None):
+    # 沿 k 路径的累计长度，以及高对称点 (各段端点) 的位置
+    cart = kpoints @ reciprocal
+    steps = np.linalg.norm(np.diff(cart, axis=0), axis=1)
+    if per_segment:
+        # 线模式各段之间不连续 (如 K|M) 时不计入长度
+        steps[per_segment - 1::per_segment] = 0.0
+    distance = np.concatenate([[0.0], np.cumsum(steps)])
+    if per_segment:
+        ticks = np.append(distance[::per_segment], distance[-1])
+    else:
+        ticks = distance[[0, -1]]
+    return distance, ticks
+
+
+def tick_labels(labels):
+    # [起点1, 终点1, 起点2, 终点2, ...] -> 各高对称点的标签，相邻段端点不同时写成 "K|M"
+    if not labels:
+        return []
+    merged = [labels[0]]
+    for end, start in zip(labels[1:-1:2], labels[2::2]):
+        merged.append(end if end == start else f"{end}|{start}")
+    merged.append(labels[-1])
+    return merged
+
+
+class BandStructure:
+    def __init__(self, energies, occupations, kpoints, weights, distance, ticks, labels, efermi):
+        self.energies = energies  # (ispin, nk, nb) eV
+        self.occupations = occupations  # 同形状，EIGENVAL 中没有时为 None
+        self.kpoints = kpoints
+        self.weights = weights
+        self.distance = distance  # (nk,) k 路径长度
+        self.ticks = ticks
+        self.labels = labels
+        self.efermi = efermi
+
+    @classmethod
+    def parse(cls, dirname='.'):
+        def path(name):
+            return os.path.join(dirname, name)
+
+        energies, occupations, kpoints, weights = read_eigenval(path('EIGENVAL'))
+        per_segment, labels = read_kpoints(path('KPOINTS'))
+        distance, ticks = kpath(kpoints, read_reciprocal(path('POSCAR')), per_segment)
+        efermi = Outcar(path('OUTCAR')).last(['efermi'])['efermi']
+        if efermi is None:
+            raise ValueError(f"{path('OUTCAR')} 中没有 E-fermi")
+        return cls(energies, occupations, kpoints, weights, distance, ticks, tick_labels(labels), efermi)
+
+    def save(self, path, sources):
+        tmp = f"{path}.{os.getpid()}.tmp.npz"
+        arrays = {'occupations': self.occupations} if self.occupations is not None else {}
+        np.savez_compressed(tmp, version=CACHE_VERSION, energies=self.energies, kpoints=self.kpoints,
+                            weights=self.weights, distance=self.distance, ticks=self.ticks,
+                            labels=np.array(self.labels, dtype=str), efermi=self.efermi,
+                            sources=np.array(sources, dtype=str), **arrays)
+        os.replace(tmp, path)
+
+    def band_edges(self, use_occupations=True):
+        # -> {'vbm', 'cbm', 'gap', 'vbm_k', 'cbm_k', 'direct'}；k 为 k 点序号，金属的 gap 为 0
+        energies = self.energies
+        if use_occupations and self.occupations is not None:
+            occupied = self.occupations >= 0.5
+        else:
+            occupied = energies <= self.efermi
+        valence = np.where(occupied, energies, -np.inf)
+        conduction = np.where(occupied, np.inf, energies)
+        vbm_index = np.unravel_index(np.argmax(valence), energies.shape)
+        cbm_index = np.unravel_index(np.argmin(conduction), energies.shape)
+        vbm, cbm = float(valence[vbm_index]), float(conduction[cbm_index])
+        return {'vbm': vbm, 'cbm': cbm, 'gap': max(0.0, cbm - vbm), 'vbm_k': int(vbm_index[1]),
+                'cbm_k': int(cbm_index[1]), 'direct': vbm_index[1] == cbm_index[1]}
+
+
+def source_stamps(dirname, previous=None):
+    # 各源文件的 "名字 大小 修改时间 SHA-1"；大小与修改时间都与 previous 相同时沿用其中的 SHA-1
+    known = {}
+    for entry in previous or ():
+        name, size, mtime, digest = entry.split()
+        known[name] = (size, mtime, digest)
+    stamps = []
+    for name in SOURCES:
+        path = resolve(os.path.join(dirname, name)) if name == 'OUTCAR' else os.path.join(dirname, name)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            stamps.append(f"{name} - - -")
+            continue
+        size, mtime = str(st.st_size), str(st.st_mtime_ns)
+        old = known.get(name)
+        digest = old[2] if old and old[:2] == (size, mtime) else file_hash(path)
+        stamps.append(f"{name} {size} {mtime} {digest}")
+    return stamps
+
+
+def load(dirname='.', cache=CACHE_FILE, refresh=False):
+    # 返回 (BandStructure, 是否来自缓存)
+    cache_path = os.path.join(dirname, cache)
+    try:
+        with np.load(cache_path) as data:
+            if refresh or int(data['version']) != CACHE_VERSION:
+                raise ValueError
+            previous = [str(s) for s in data['sources']]
+            stamps = source_stamps(dirname, previous)
+            if [s.split()[::3] for s in stamps] != [s.split()[::3] for s in previous]:
+                raise ValueError  # SHA-1 不同 (或文件增删)
+            bands = BandStructure(data['energies'], data['occupations'] if 'occupations' in data else None,
+                                  data['kpoints'], data['weights'], data['distance'], data['ticks'],
+                                  [str(s) for s in data['labels']], float(data['efermi']))
+    except (OSError, KeyError, ValueError):
+        bands = BandStructure.parse(dirname)
+        bands.save(cache_path, source_stamps(dirname))
+        return bands, False
+    if stamps != previous:
+        bands.save(cache_path, stamps)  # 内容未变，只更新修改时间
+    return bands, True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=f"解析 EIGENVAL/KPOINTS/POSCAR/OUTCAR 并缓存到 {CACHE_FILE}，输出带隙与带边。")
+    parser.add_argument('dirname', nargs='?', default='.', help='VASP 能带计算目录 (默认: 当前目录)')
+    parser.add_argument('--cache', default=CACHE_FILE, help=f'缓存文件名 (默认: {CACHE_FILE})')
+    parser.add_argument('--refresh', action='store_true', help='忽略缓存重新解析')
+    parser.add_argument('--fermi', action='store_true', help='按费米能级而不是占据数区分价带与导带')
+    args = parser.parse_args()
+    try:
+        bands, cached = load(args.dirname, args.cache, args.refresh)
+    except (OSError, ValueError, IndexError) as e:
+        print(f"错误: {e}", file=sys.stderr)
+        sys.exit(1)
+    edges = bands.band_edges(not args.fermi)
+    ispin, nk, nb = bands.energies.shape
+    print(f"{nk} 个 k 点，{nb} 条能带，ISPIN={ispin}，E-fermi {bands.efermi:.4f} eV"
+          + (" (来自缓存)" if cached else ""))
+    print(f"VBM {edges['vbm']:.4f} eV (k {edges['vbm_k'] + 1})，CBM {edges['cbm']:.4f} eV (k {edges['cbm_k'] + 1})，"
+          f"Eg = {edges['gap']:.4f} eV ({'直接' if edges['direct'] else '间接'})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import argparse
+import os
+import time
+
+import numpy as np
+
+from band import _load_band_lines, _pad, load_band, plot
+
+# --- BAND.dat 读取与绘制基准 ---
+# 生成 vaspkit 格式的合成 BAND.dat (--bands 条能带，每条 --kpoints 个 k 点)，对比:
+#   逐行解析 + 每条能带一次 plt.plot   band.py 原来的做法
+#   load_band + LineCollection         现在的做法
+# 两者都用 Agg 后端按 band.py 的设置 (6x5 英寸，400 dpi) 保存 PNG，并检查解析结果一致。
+# 现在的做法另外分别列出 读取 / 建图 / 保存 的耗时，以及纵轴覆盖所有能带 (没有能带被跳过) 时的耗时。
+
+
+def write_band(path, nbands, nk, seed=0):
+    rng = np.random.default_rng(seed)
+    k = np.linspace(0, 3.5, nk)
+    centers = np.sort(rng.uniform(-60, 40, nbands))
+    with open(path, 'w') as f:
+        f.write("#K-Path(1/A) Energy-Level(eV)\n")
+        f.write(f"# NKPTS & NBANDS: {nk:4d} {nbands:4d}\n")
+        for b, center in enumerate(centers, 1):
+            energies = center + 0.8 * np.cos(2 * np.pi * k / 3.5 * rng.integers(1, 4) + rng.uniform(0, 6))
+            f.write(f"# Band-Index {b:4d}\n")
+            f.write(''.join(f"{x:10.5f} {e:14.6f}\n" for x, e in zip(k, energies)))
+            f.write("\n")
+
+
+def timed(func, repeat=1):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func()
+        t = time.perf_counter() - t0
+        best = t if best is None else min(best, t)
+    return best, result
+
+
+def legacy(path, output):
+    import matplotlib.pyplot as plt
+
+    with open(path) as f:
+        bands = _load_band_lines(f.read())
+    plt.figure(figsize=(6, 5), dpi=400)
+    for x, y in bands:
+        plt.plot(x, y, color='blue')
+    plt.ylim(-4, 4)
+    plt.xlim(0, max(max(x) for x, _ in bands))
+    plt.axhline(y=0, color='red', linestyle='--')
+    plt.savefig(output, bbox_inches='tight')
+    plt.close()
+    return bands
+
+
+def current(path, output, ylim=(-4, 4)):
+    # -> (读取, 建图, 保存) 各自的耗时
+    import matplotlib.pyplot as plt
+
+    t0 = time.perf_counter()
+    k, energies = load_band(path)
+    t1 = time.perf_counter()
+    fig = plot(k, energies, 1.0, [], ylim=ylim)
+    t2 = time.perf_counter()
+    fig.savefig(output, bbox_inches='tight')
+    plt.close(fig)
+    return t1 - t0, t2 - t1, time.perf_counter() - t2
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BAND.dat 读取与绘制基准: 逐行 + plt.plot vs NumPy + LineCollection。")
+    parser.add_argument('--bands', type=int, default=1000, help='能带数 (默认: 1000)')
+    parser.add_argument('--kpoints', type=int, default=400, help='每条能带的 k 点数 (默认: 400)')
+    parser.add_argument('--file', default='bench_BAND.dat', help='合成文件路径 (默认: bench_BAND.dat)')
+    parser.add_argument('--repeat', type=int, default=3, help='解析的重复次数，取最快 (默认: 3)')
+    parser.add_argument('--keep', action='store_true', help='保留合成文件和图片')
+    args = parser.parse_args()
+
+    import matplotlib
+    matplotlib.use('Agg')
+
+    write_band(args.file, args.bands, args.kpoints)
+    size_mb = os.path.getsize(args.file) / 1e6
+
+    def parse_lines():
+        with open(args.file) as f:
+            return _load_band_lines(f.read())
+
+    t_lines, bands = timed(parse_lines, args.repeat)
+    t_numpy, (k, energies) = timed(lambda: load_band(args.file), args.repeat)
+    ref_k, ref_e = _pad(bands)
+    assert np.array_equal(np.broadcast_to(k, energies.shape), ref_k) and np.array_equal(energies, ref_e)
+
+    t_old, _ = timed(lambda: legacy(args.file, 'bench_band_old.png'))
+    t_new, parts = timed(lambda: current(args.file, 'bench_band_new.png'))
+    full = (float(np.nanmin(energies)) - 1, float(np.nanmax(energies)) + 1)
+    t_full, parts_full = timed(lambda: current(args.file, 'bench_band_new.png', full))
+    print(f"{args.bands} 条能带 x {args.kpoints} 个 k 点 ({size_mb:.1f} MB)，解析结果一致")
+    print(f"{'方式':<34} {'耗时(s)':>8} {'加速':>7}")
+    for name, t, ref in (('逐行解析', t_lines, t_lines), ('load_band', t_numpy, t_lines),
+                         ('逐行 + plt.plot 逐条 + 保存', t_old, t_old), ('load_band + LineCollection + 保存', t_new, t_old)):
+        print(f"{name:<34} {t:>8.3f} {ref / t:>6.1f}x")
+    print(f"  其中 读取 {parts[0]:.3f} s，建图 {parts[1]:.3f} s，保存 {parts[2]:.3f} s")
+    print(f"{'同上，纵轴覆盖所有能带':<34} {t_full:>8.3f} {t_old / t_full:>6.1f}x")
+    print(f"  其中 读取 {parts_full[0]:.3f} s，建图 {parts_full[1]:.3f} s，保存 {parts_full[2]:.3f} s")
+
+    if not args.keep:
+        for path in (args.file, 'bench_band_old.png', 'bench_band_new.png'):
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import argparse
+import time
+
+from sensor_protocol import BUFFER_SIZE, FrameSplitter
+
+# --- 分帧器微基准 ---
+# 对比 tcp.py 原来基于 str 拼接 + find('#') 切片的循环与 FrameSplitter，
+# 每次 "recv" 分别包含 1、100、10000 帧。
+
+
+class FakeSocket:
+    # 用预先准备好的数据块模拟 socket.recv / socket.recv_into
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+
+    def recv(self, bufsize):
+        return next(self.chunks, b'')
+
+    def recv_into(self, buffer):
+        chunk = next(self.chunks, b'')
+        buffer[:len(chunk)] = chunk
+        return len(chunk)
+
+
+def legacy_split(chunks):
+    # 原 handle_client_connection 中的分帧逻辑 (去掉了解析与日志)
+    frames = 0
+    data_buffer = ""
+    sock = FakeSocket(chunks)
+    while True:
+        request_bytes = sock.recv(BUFFER_SIZE)
+        if not request_bytes:
+            break
+        data_buffer += request_bytes.decode('utf-8', errors='ignore')
+        while True:
+            start_index = data_buffer.find('#')
+            if start_index == -1: break
+            end_index = data_buffer.find('#', start_index + 1)
+            if end_index == -1:
+                if len(data_buffer) > BUFFER_SIZE * 2:
+                    data_buffer = data_buffer[start_index:]
+                break
+            complete_message = data_buffer[start_index : end_index + 1]
+            data_buffer = data_buffer[end_index + 1 :]
+            frames += 1
+    return frames
+
+
+def splitter_split(chunks, recv_size):
+    frames = 0
+    splitter = FrameSplitter(recv_size=recv_size)
+    sock = FakeSocket(chunks)
+    while splitter.recv_into(sock):
+        for _ in splitter.frames():
+            frames += 1
+    return frames
+
+
+def make_chunks(frames_per_recv, total_frames):
+    frame = b"#23.5,45.0,12,415,2,8,15#"
+    # 每块末尾带半帧，模拟 TCP 把消息切开的情况
+    payload = frame * frames_per_recv
+    half = len(frame) // 2
+    chunks = []
+    for k in range(max(1, total_frames // frames_per_recv)):
+        if k == 0:
+            chunks.append(payload + frame[:half])
+        else:
+            chunks.append(frame[half:] + payload[len(frame):] + frame[:half])
+    return chunks, len(frame) * frames_per_recv + len(frame)
+
+
+def best_of(func, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分帧器微基准: str 拼接循环 vs FrameSplitter。")
+    parser.add_argument('--total', type=int, default=100000, help='每组测试的总帧数 (默认: 100000)')
+    parser.add_argument('--repeat', type=int, default=3, help='重复次数，取最快一次 (默认: 3)')
+    args = parser.parse_args()
+
+    print(f"{'帧/recv':>10} {'原str循环(s)':>14} {'FrameSplitter(s)':>18} {'加速比':>8}")
+    for frames_per_recv in (1, 100, 10000):
+        chunks, recv_size = make_chunks(frames_per_recv, args.total)
+        t_old, n_old = best_of(lambda: legacy_split(chunks), args.repeat)
+        t_new, n_new = best_of(lambda: splitter_split(chunks, recv_size), args.repeat)
+        assert n_old == n_new, (n_old, n_new)
+        print(f"{frames_per_recv:>10} {t_old:>14.4f} {t_new:>18.4f} {t_old / t_new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from outcar import INDEX_SUFFIX, Outcar
+from outcar_archive import compress
+
+# --- OUTCAR 读取基准 ---
+# 生成一个指定大小的合成 OUTCAR (每个离子步若干电子步，含 dipolmoment / dipole moment / TOTEN / E-fermi 行)，对比:
+#   tac | awk   create_heatmap_data_v2.sh 的做法，每个量一条管道
+#   Outcar      从末尾按块向前读，一遍取齐
+#   索引        建立 OUTCAR.outidx.npz 的耗时，以及之后用索引取值的耗时
+#   outcar.py   命令行 (含解释器启动)
+#   压缩文件   --compress gz,xz,zst 时，对各压缩格式的副本同样取最终值 (流式解压、向前读) 与 ionic_steps，
+#             结果须与未压缩的相同
+# --no-dipole 去掉 "dipole moment" 行，模拟不存在的量 (tac | awk 与无索引的 Outcar 都要读完整个文件)。
+# --atoms N 时每个离子步写出 N 个原子的 POSITION / TOTAL-FORCE 块。
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+AWK = {
+    'dipole': "/dipole moment/{print $(NF-3)+$(NF-2); exit}",
+    'dipolmoment': "/dipolmoment/{print $4; exit}",
+    'energy': "/free  energy   TOTEN/{print $5; exit}",
+}
+FILLER = "".join(f"  band No. {i:4d}  band energies  {-10 + i * 0.01:10.4f}  occupation 2.00000\n" for i in range(60))
+
+
+def write_outcar(path, size_mb, electronic=8, dipole=True, seed=0, natoms=0):
+    rng = np.random.default_rng(seed)
+    target = size_mb * 1e6
+    with open(path, 'w') as f:
+        f.write(" vasp.6.3.0 synthetic OUTCAR\n" + FILLER)
+        if natoms:
+            f.write(f"   number of dos      NEDOS =    301   number of ions     NIONS = {natoms:6d}\n")
+        step = 0
+        while f.tell() < target:
+            step += 1
+            for k in range(1, electronic + 1):
+                f.write(f"--------------------------------------- Iteration {step:6d}({k:4d})  "
+                        "---------------------------------------\n")
+                f.write(FILLER)
+                f.write(f"  free energy    TOTEN  = {rng.normal(-300, 1):17.8f} eV\n")
+                f.write(f" E-fermi : {rng.normal(-1, 0.1):10.4f}     XC(G=0): -10.1234     alpha+bet :-12.3456\n")
+                f.write(f" dipolmoment {0:14.6f}{0:14.6f}{rng.normal(0, 0.05):14.6f} electrons x Angstroem\n")
+            if dipole:
+                f.write(" dipole moment in direction 3 " + "".join(f"{v:12.6f}" for v in rng.normal(0, 0.1, 4)) + "\n")
+            if natoms:
+                rows = np.hstack([rng.random((natoms, 3)) * 20, rng.normal(0, 0.05, (natoms, 3))])
+                f.write(" POSITION                                       TOTAL-FORCE (eV/Angst)\n"
+                        " " + "-" * 83 + "\n"
+                        + ((" %12.5f" * 3 + "   " + "%14.6f" * 3 + "\n") * natoms) % tuple(rows.ravel().tolist())
+                        + " " + "-" * 83 + "\n")
+            f.write(f"  free  energy   TOTEN  = {rng.normal(-300, 1):17.8f} eV\n")
+            f.write(FILLER)
+
+
+def timed(func, repeat=1):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func()
+        t = time.perf_counter() - t0
+        best = t if best is None else min(best, t)
+    return best, result
+
+
+def tac_awk(path):
+    return {name: subprocess.run(f"tac '{path}' | awk '{prog}'", shell=True, check=True,
+                                 stdout=subprocess.PIPE, text=True).stdout.strip() or None
+            for name, prog in AWK.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OUTCAR 读取基准: tac | awk vs outcar.py。")
+    parser.add_argument('--file', default='bench_OUTCAR', help='合成 OUTCAR 路径 (默认: bench_OUTCAR)')
+    parser.add_argument('--size-mb', type=float, default=1000, help='合成文件大小 MB (默认: 1000)')
+    parser.add_argument('--no-dipole', action='store_true', help='不写 "dipole moment" 行 (不存在的量)')
+    parser.add_argument('--atoms', type=int, default=0, help='每个离子步写出的受力块原子数 (默认: 0，不写)')
+    parser.add_argument('--compress', default='', help='同时测试压缩副本，例如 gz,xz,zst')
+    parser.add_argument('--repeat', type=int, default=3, help='每项重复次数，取最快 (默认: 3)')
+    parser.add_argument('--keep', action='store_true', help='保留合成文件')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.file):
+        print(f"生成 {args.file} ({args.size_mb:.0f} MB) ...")
+        write_outcar(args.file, args.size_mb, dipole=not args.no_dipole, natoms=args.atoms)
+    index_path = args.file + INDEX_SUFFIX
+    if os.path.exists(index_path):
+        os.remove(index_path)
+    size_mb = os.path.getsize(args.file) / 1e6
+    names = list(AWK)
+
+    t_awk, ref = timed(lambda: tac_awk(args.file), args.repeat)
+    t_scan, scan = timed(lambda: Outcar(args.file).last_text(names), args.repeat)
+    t_build, _ = timed(lambda: Outcar(args.file, index=True, cache_index=False))
+    Outcar(args.file, index=True)  # 写出索引
+    t_indexed, indexed = timed(lambda: Outcar(args.file, index=True).last_text(names), args.repeat)
+    cli = [sys.executable, os.path.join(HERE, 'outcar.py'), '-q', ','.join(names), args.file]
+    t_cli, out = timed(lambda: subprocess.run(cli, check=True, stdout=subprocess.PIPE, text=True).stdout,
+                       args.repeat)
+    assert scan == ref and indexed == ref, f"结果不一致: awk {ref} / 向前读 {scan} / 索引 {indexed}"
+    assert out.split() == [ref[name] or '-' for name in names]
+
+    steps = len(Outcar(args.file, index=True).steps)
+    print(f"文件 {size_mb:.0f} MB, {steps} 个离子步, 结果与 tac | awk 一致: {ref}")
+    print(f"{'方式':<30} {'耗时(ms)':>10} {'相对 tac|awk':>12}")
+    for name, t in ((f'tac | awk x{len(names)}', t_awk), ('Outcar 末尾按块向前读', t_scan),
+                    ('建立索引 (一次)', t_build), ('Outcar 使用索引', t_indexed),
+                    ('outcar.py 命令行', t_cli)):
+        print(f"{name:<30} {t * 1000:>10.1f} {t_awk / t:>11.1f}x")
+
+    kinds = [k for k in args.compress.split(',') if k]
+    if kinds:
+        t_steps, steps_ref = timed(lambda: Outcar(args.file).ionic_steps())
+        print(f"\n{'格式':<8} {'大小(MB)':>9} {'最终值(ms)':>11} {'ionic_steps(ms)':>16}")
+        print(f"{'OUTCAR':<8} {size_mb:>9.1f} {t_scan * 1000:>11.1f} {t_steps * 1000:>16.1f}")
+        for kind in kinds:
+            copy = f"{args.file}.copy"
+            shutil.copyfile(args.file, copy)
+            packed = compress(copy, kind)
+            try:
+                t_last, last = timed(lambda: Outcar(copy).last_text(names), args.repeat)
+                t_all, steps_data = timed(lambda: Outcar(copy).ionic_steps())
+                assert last == ref, f"{kind}: 结果不一致 {last}"
+                for key, value in steps_ref.items():
+                    assert np.array_equal(value, steps_data[key], equal_nan=True), f"{kind}: ionic_steps {key} 不一致"
+                print(f"{'.' + kind:<8} {os.path.getsize(packed) / 1e6:>9.1f} {t_last * 1000:>11.1f} "
+                      f"{t_all * 1000:>16.1f}")
+            finally:
+                os.remove(packed)
+
+    os.remove(index_path)
+    if not args.keep:
+        os.remove(args.file)
+
+
+if __name__ == "__main__":
+    main()
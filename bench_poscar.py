@@ -0,0 +1,147 @@
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+import poscar
+
+# --- POSCAR 读写基准与往返检查 ---
+# 对比 poscar.py 与原来的两个读取函数 (strain.py: 读入文本行再取晶格；generate_displacements.py:
+# 逐行 split 成 Python 列表)，以及按原来的方式与用 PoscarTemplate 批量写出 --structures 个结构。
+# 往返检查: 对给出的 POSCAR (默认为几个合成的: Selective dynamics、VASP4、Cartesian、含速度)，
+# read -> format -> parse 的各数组相同，再次 format 的文本与第一次逐字节相同。
+
+
+def legacy_strain_read(path):
+    # strain.py 原来的 read_poscar + read_lattice
+    with open(path, 'r') as f:
+        lines = f.readlines()
+    return lines, np.array([list(map(float, line.split()[:3])) for line in lines[2:5]])
+
+
+def legacy_displacements_read(path):
+    # generate_displacements.py 原来的 read_poscar
+    with open(path, 'r') as f:
+        lines = f.readlines()
+    a = list(map(float, lines[2].split()))
+    b = list(map(float, lines[3].split()))
+    c = list(map(float, lines[4].split()))
+    nums = list(map(int, lines[6].split()))
+    coords = []
+    for line in lines[8:8 + sum(nums)]:
+        parts = line.split()
+        coords.append([float(parts[0]), float(parts[1]), float(parts[2])])
+    return {'title': lines[0].strip(), 'scale': float(lines[1]), 'lattice': [a, b, c], 'species': lines[5].split(),
+            'nums': nums, 'coord_type': lines[7].strip().lower()[0], 'coords': coords}
+
+
+def legacy_write(data, coords):
+    # generate_displacements.py 原来逐个原子格式化的写法
+    lines = [data['title'] + '\n', f"{data['scale']}\n"]
+    lines += [' '.join(map(str, vec)) + '\n' for vec in data['lattice']]
+    lines += [' '.join(data['species']) + '\n', ' '.join(map(str, data['nums'])) + '\n', 'Direct\n']
+    lines += [' '.join(f"{x:.10f}" for x in coord) + '\n' for coord in coords]
+    return ''.join(lines)
+
+
+def synthetic(natoms, seed=0, selective=False, vasp4=False, cartesian=False, velocities=False):
+    rng = np.random.default_rng(seed)
+    counts = [natoms // 3, natoms - natoms // 3]
+    lattice = np.array([[3.19, 0, 0], [-1.595, 2.7626, 0], [0, 0, 25.0]]) * rng.uniform(1, 1.01)
+    coords = rng.random((natoms, 3))
+    if cartesian:
+        coords = coords @ lattice
+    flags = rng.random((natoms, 3)) < 0.5 if selective else None
+    vel = rng.normal(0, 1e-3, (natoms, 3)) if velocities else None
+    return poscar.Structure('synthetic', 1.0, lattice, None if vasp4 else ['Mo', 'S'], counts, coords,
+                            cartesian, flags, vel)
+
+
+def same(a, b):
+    for name in poscar.Structure.__slots__:
+        x, y = getattr(a, name), getattr(b, name)
+        if isinstance(x, np.ndarray) or isinstance(y, np.ndarray):
+            if x is None or y is None or x.shape != y.shape or not np.array_equal(x, y):
+                return False
+        elif x != y:
+            return False
+    return True
+
+
+def round_trip(path):
+    s = poscar.read(path)
+    text = s.format()
+    again = poscar.parse(text)
+    # 文件本身的数值可能多于 16 位小数，这里比较第一次写出后的结构
+    return same(again, poscar.parse(again.format())) and again.format() == text \
+        and np.allclose(s.coords, again.coords, rtol=0, atol=1e-15) \
+        and np.allclose(s.lattice, again.lattice, rtol=0, atol=1e-14)
+
+
+def timed(func, repeat=5):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func()
+        t = time.perf_counter() - t0
+        best = t if best is None else min(best, t)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="POSCAR 读写基准 (poscar.py vs 原来的读写函数) 与往返检查。")
+    parser.add_argument('files', nargs='*', help='做往返检查的 POSCAR/CONTCAR (默认: 合成的几种)')
+    parser.add_argument('--atoms', type=int, default=2000, help='读取基准的原子数 (默认: 2000)')
+    parser.add_argument('--structures', type=int, default=5000, help='批量写出的结构数 (默认: 5000)')
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix='bench_poscar_')
+    try:
+        files = args.files
+        if not files:
+            variants = {'selective': dict(selective=True), 'vasp4': dict(vasp4=True),
+                        'cartesian': dict(cartesian=True), 'velocities': dict(velocities=True)}
+            for name, options in variants.items():
+                path = os.path.join(tmp, f'POSCAR-{name}')
+                synthetic(24, **options).write(path)
+                files.append(path)
+        for path in files:
+            print(f"往返 {path}: {'一致' if round_trip(path) else '不一致'}")
+
+        path = os.path.join(tmp, 'POSCAR')
+        synthetic(args.atoms).write(path)
+        print(f"\n读取 {args.atoms} 个原子 (最好的 5 次):")
+        for name, func in (('strain.py 原来的 (只取文本行与晶格)', legacy_strain_read),
+                           ('generate_displacements.py 原来的', legacy_displacements_read),
+                           ('poscar.read', poscar.read)):
+            t, _ = timed(lambda: func(path))
+            print(f"  {name:<40s} {t * 1000:8.2f} ms")
+
+        small = synthetic(24)
+        small.write(os.path.join(tmp, 'POSCAR-small'))
+        data = legacy_displacements_read(os.path.join(tmp, 'POSCAR-small'))
+        moving = np.zeros(small.natoms, dtype=bool)
+        moving[:4] = True
+        shifts = np.random.default_rng(1).random((args.structures, 1, 3)) * [1, 1, 0]
+        moved = small.coords[moving][None] + shifts
+        full = np.repeat(small.coords[None], args.structures, axis=0)
+        full[:, moving] = moved
+        names = [os.path.join(tmp, 'out', f'disp_{k:05d}', 'POSCAR') for k in range(args.structures)]
+        print(f"\n生成 {args.structures} 个 {small.natoms} 原子结构的文本 (4 个原子移动):")
+        t_old, _ = timed(lambda: [legacy_write(data, c) for c in full.tolist()], 3)
+        template = poscar.PoscarTemplate(small, moving)
+        t_new, _ = timed(lambda: list(template.texts(moved)), 3)
+        print(f"  逐个原子格式化 (原来)      {t_old:8.3f} s")
+        print(f"  PoscarTemplate.texts      {t_new:8.3f} s  ({t_old / t_new:.1f}x)")
+        t0 = time.perf_counter()
+        poscar.write_many(names, template.texts(moved))
+        print(f"  写出到目录 (write_many)   {time.perf_counter() - t0:8.3f} s")
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import argparse
+import multiprocessing
+import os
+import socket
+import threading
+import time
+
+from sensor_server import aggregate, raise_nofile_limit, start_workers
+
+# --- 多进程 SO_REUSEPORT 扩展性基准 ---
+# 分别用 1、2、4 ... 个 worker 进程监听同一端口，由若干压测进程以最快速度发送数据，
+# 统计汇聚进程实际收到的解析后读数条数/秒。注意压测进程本身也占用 CPU，
+# 核数不足 (worker 数 + 压测进程数) 时结果不会线性增长。
+
+
+def blaster(host, port, connections, duration, frames_per_write, counter):
+    payload = b"#23.5,45.0,12,415,2,8,15#" * frames_per_write
+    socks = [socket.create_connection((host, port)) for _ in range(connections)]
+    sent = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        for sock in socks:
+            sock.sendall(payload)
+            sent += frames_per_write
+    for sock in socks:
+        sock.close()
+    with counter.get_lock():
+        counter.value += sent
+
+
+def run_once(host, port, workers, clients, connections, duration, frames_per_write, warmup):
+    procs, conns = start_workers(host, port, workers)
+    time.sleep(0.5)  # 等待 worker 开始监听
+
+    received = [0]
+
+    def on_batch(batch):
+        received[0] += batch.size
+
+    collector = threading.Thread(target=aggregate, args=(conns, on_batch), daemon=True)
+    collector.start()
+
+    counter = multiprocessing.Value('q', 0)
+    senders = [multiprocessing.Process(target=blaster,
+                                       args=(host, port, connections, duration + warmup, frames_per_write, counter))
+               for _ in range(clients)]
+    for proc in senders:
+        proc.start()
+    time.sleep(warmup)
+    start_rows, start_time = received[0], time.monotonic()
+    time.sleep(duration)
+    rows, elapsed = received[0] - start_rows, time.monotonic() - start_time
+    for proc in senders:
+        proc.join()
+    for proc in procs:
+        proc.terminate()
+    collector.join(timeout=10)
+    for proc in procs:
+        proc.join()
+    return rows / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SO_REUSEPORT 多进程接收的扩展性基准。")
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址 (默认: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=18270, help='测试端口 (默认: 18270)')
+    parser.add_argument('--workers', type=int, nargs='+', default=None,
+                        help='要测试的 worker 数列表 (默认: 1 2 4 ... 直到 CPU 核数)')
+    parser.add_argument('--clients', type=int, default=None, help='压测进程数 (默认: CPU 核数的一半，至少 1)')
+    parser.add_argument('--connections', type=int, default=64, help='每个压测进程的连接数 (默认: 64)')
+    parser.add_argument('--frames-per-write', type=int, default=100, help='每次写入的帧数 (默认: 100)')
+    parser.add_argument('--duration', type=float, default=5.0, help='每组测量秒数 (默认: 5)')
+    parser.add_argument('--warmup', type=float, default=1.0, help='预热秒数 (默认: 1)')
+    args = parser.parse_args()
+
+    raise_nofile_limit()
+    cpus = os.cpu_count() or 1
+    counts = args.workers
+    if counts is None:
+        counts, n = [], 1
+        while n <= cpus:
+            counts.append(n)
+            n *= 2
+    clients = args.clients or max(1, cpus // 2)
+
+    print(f"CPU 核数 {cpus}, 压测进程 {clients} x {args.connections} 连接")
+    print(f"{'worker 数':>10} {'读数/秒':>14} {'相对 1 个 worker':>18}")
+    baseline = None
+    for workers in counts:
+        rate = run_once(args.host, args.port, workers, clients, args.connections,
+                        args.duration, args.frames_per_write, args.warmup)
+        baseline = baseline or rate
+        print(f"{workers:>10} {rate:>14.0f} {rate / baseline:>17.2f}x")
+
+
+if __name__ == "__main__":
+    main()
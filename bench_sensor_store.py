@@ -0,0 +1,69 @@
+import argparse
+import random
+import shutil
+import tempfile
+import time
+
+from sensor_protocol import parse_sensor_batch
+from sensor_store import SensorStore
+
+# --- 存储基准 ---
+# 模拟多个客户端的连续读数 (跨越 UTC 日期边界)，测试批量写入速率 (含 1m/1h 汇总更新) 与 24 小时汇总查询耗时。
+
+
+def make_batches(clients, rows, batch_size, start, rate):
+    frames = [f"#{random.uniform(15, 30):.1f},{random.uniform(30, 80):.1f},{random.randint(0, 150)},"
+              f"{random.randint(400, 2000)},{random.randint(1, 4)},{random.randint(0, 100)},"
+              f"{random.randint(0, 200)}#".encode() for _ in range(1000)]
+    addresses = {cid: (f"10.0.{cid // 256}.{cid % 256}", 40000 + cid) for cid in range(clients)}
+    batches = []
+    for offset in range(0, rows, batch_size):
+        n = min(batch_size, rows - offset)
+        ids = [random.randrange(clients) for _ in range(n)]
+        stamps = [start + (offset + k) / rate for k in range(n)]
+        batch = parse_sensor_batch([frames[k % 1000] for k in range(n)], ids, stamps)
+        batch.clients = {cid: addresses[cid] for cid in set(ids)}
+        batches.append(batch)
+    return batches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="传感器存储写入/查询基准。")
+    parser.add_argument('--rows', type=int, default=500000, help='写入总行数 (默认: 500000)')
+    parser.add_argument('--clients', type=int, default=1000, help='客户端数量 (默认: 1000)')
+    parser.add_argument('--batch', type=int, default=20000, help='每次写入的行数 (默认: 20000)')
+    parser.add_argument('--rate', type=float, default=50000,
+                        help='模拟数据的时间密度，每秒多少条读数 (默认: 50000)')
+    parser.add_argument('--dir', default=None, help='数据目录 (默认: 临时目录，结束后删除)')
+    args = parser.parse_args()
+
+    root = args.dir or tempfile.mkdtemp(prefix='sensor_store_')
+    # 从 UTC 午夜前开始，让数据跨越日期分区
+    now = time.time()
+    start = now - now % 86400 - args.rows / args.rate / 2
+    batches = make_batches(args.clients, args.rows, args.batch, start, args.rate)
+    store = SensorStore(root)
+    try:
+        t0 = time.perf_counter()
+        for offset in range(0, len(batches)):
+            store.append([batches[offset]])
+        elapsed = time.perf_counter() - t0
+        print(f"写入 {store.rows_written} 行, 用时 {elapsed:.2f} s, {store.rows_written / elapsed:.0f} 行/秒")
+
+        client = "10.0.0.1"
+        t0 = time.perf_counter()
+        rows = store.query(client, 'pm25', end=start + 86400, resolution='1h')
+        elapsed = time.perf_counter() - t0
+        print(f"查询 {client} 最近24小时 PM2.5 (1h): {len(rows)} 个区间, 用时 {elapsed * 1000:.2f} ms")
+        t0 = time.perf_counter()
+        rows = store.query(client, 'pm25', end=start + 86400, resolution='1m')
+        elapsed = time.perf_counter() - t0
+        print(f"查询 {client} 最近24小时 PM2.5 (1m): {len(rows)} 个区间, 用时 {elapsed * 1000:.2f} ms")
+    finally:
+        store.close()
+        if args.dir is None:
+            shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+# --- 启动时间与内存基准 ---
+# 对比无界面服务器 (sensor_server.py) 与带界面 (tcp.py，导入 tkinter + PIL) 的启动耗时和常驻内存 (RSS)。
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+IMPORT_PROBE = """
+import sys, time
+t0 = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - t0
+rss = [l for l in open('/proc/self/status') if l.startswith('VmRSS')][0].split()[1]
+gui = [m for m in ('tkinter', 'PIL') if m in sys.modules]
+print(elapsed, rss, ','.join(gui) or '-')
+"""
+
+
+def read_rss_kb(pid):
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmRSS'):
+                return int(line.split()[1])
+    return 0
+
+
+def probe_import(module):
+    # 在全新的解释器中导入模块，返回 (导入耗时, RSS KB, 被导入的界面库)
+    result = subprocess.run([sys.executable, '-c', IMPORT_PROBE.format(module=module)],
+                            cwd=HERE, capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    elapsed, rss, gui = result.stdout.split()
+    return float(elapsed), int(rss), gui
+
+
+def probe_server(port):
+    # 启动无界面服务器，记录从启动进程到开始监听的时间以及此时的 RSS
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, os.path.join(HERE, 'sensor_server.py'), '--port', str(port),
+                             '--stats-interval', '0'], stderr=subprocess.PIPE, text=True)
+    try:
+        for line in proc.stderr:
+            if '正在监听' in line:
+                return time.perf_counter() - t0, read_rss_kb(proc.pid)
+        return None
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="无界面/带界面两种方式的启动耗时与内存基准。")
+    parser.add_argument('--port', type=int, default=18269, help='无界面服务器测试端口 (默认: 18269)')
+    parser.add_argument('--repeat', type=int, default=5, help='重复次数，取中位数 (默认: 5)')
+    args = parser.parse_args()
+
+    def median(values):
+        values = sorted(values)
+        return values[len(values) // 2]
+
+    print(f"{'场景':<32} {'耗时(ms)':>10} {'RSS(MB)':>10}  导入的界面库")
+    for label, module in (("import sensor_server (无界面核心)", 'sensor_server'),
+                          ("import tcp (界面)", 'tcp')):
+        runs = [probe_import(module) for _ in range(args.repeat)]
+        if None in runs:
+            print(f"{label:<32} {'不可用 (缺少 tkinter/PIL 或无法导入)':>10}")
+            continue
+        print(f"{label:<32} {median(r[0] for r in runs) * 1000:>10.1f} "
+              f"{median(r[1] for r in runs) / 1024:>10.1f}  {runs[0][2]}")
+
+    runs = [probe_server(args.port) for _ in range(args.repeat)]
+    if None in runs:
+        print("无界面服务器启动失败")
+    else:
+        print(f"{'sensor_server.py 启动到监听':<32} {median(r[0] for r in runs) * 1000:>10.1f} "
+              f"{median(r[1] for r in runs) / 1024:>10.1f}  -")
+
+
+if __name__ == "__main__":
+    main()
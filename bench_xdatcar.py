@@ -0,0 +1,132 @@
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from xdatcar import Xdatcar
+
+# --- XDATCAR 读取基准 ---
+# 生成一个指定大小的合成 XDATCAR (VASP 的 3F12.8 格式)，对比:
+#   awk     extract_z.sh 原来的 awk 实现 (EXTRACT_Z_AWK=1)
+#   xdatcar.py 命令行 (含建立索引与文本输出)
+#   Xdatcar.read 只取 NumPy 数组
+# 并检查两者输出一致。另外用小文件检查: 正负坐标混在同一列时与 awk 输出逐字节一致 (符号位的空格)，
+# VASP4 (没有元素行) 的帧数和坐标正确。
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SPECIES = ['Hf', 'O']
+
+
+def write_xdatcar(path, natoms, frames, variable_cell=False, seed=0, vasp4=False, signed=False):
+    # vasp4: 不写元素行；signed: 坐标减去 0.5 (正负数混在同一列)。返回所有帧的坐标 (帧数, 原子数, 3)
+    rng = np.random.default_rng(seed)
+    counts = [natoms // 3, natoms - natoms // 3]
+    lattice = np.diag([10.0, 10.0, 20.0])
+    row = "  %11.8f  %11.8f  %11.8f\n" if signed else "  %10.8f  %10.8f  %10.8f\n"
+
+    def header(lat):
+        lines = ["synthetic\n", "           1\n"]
+        lines += ["    %11.6f %11.6f %11.6f\n" % tuple(v) for v in lat]
+        if not vasp4:
+            lines.append("   " + "".join(f"{s:>5}" for s in SPECIES) + "\n")
+        lines.append("   " + "".join(f"{n:>5}" for n in counts) + "\n")
+        return "".join(lines)
+
+    base = rng.random((natoms, 3))
+    written = []
+    with open(path, 'w') as f:
+        f.write(header(lattice))
+        for k in range(frames):
+            if variable_cell and k:
+                f.write(header(lattice * (1 + 0.001 * np.sin(k))))
+            coords = (base + 0.01 * rng.standard_normal((natoms, 3))) % 1.0 - (0.5 if signed else 0)
+            f.write(f"Direct configuration= {k + 1:5d}\n")
+            f.write("".join(row % tuple(c) for c in coords))
+            written.append(np.round(coords, 8))
+    return np.array(written)
+
+
+def timed(func):
+    t0 = time.perf_counter()
+    result = func()
+    return time.perf_counter() - t0, result
+
+
+def run_script(cmd, env=None):
+    return subprocess.run(cmd, check=True, stdout=subprocess.PIPE, env=env).stdout
+
+
+def check_small(env):
+    # 正负坐标混排与 awk 逐字节一致；VASP4 的帧数与坐标正确
+    tmp = tempfile.mkdtemp(prefix='bench_xdatcar_')
+    try:
+        path = os.path.join(tmp, 'XDATCAR-signed')
+        write_xdatcar(path, 12, 7, signed=True)
+        out_awk = run_script(['bash', os.path.join(HERE, 'extract_z.sh'), 'O', path], env)
+        out_py = run_script([sys.executable, os.path.join(HERE, 'xdatcar.py'), 'O', path])
+        assert out_awk == out_py, "正负坐标混排时 xdatcar.py 与 awk 的输出不一致"
+        path = os.path.join(tmp, 'XDATCAR-vasp4')
+        coords = write_xdatcar(path, 12, 7, vasp4=True)
+        with Xdatcar(path) as xdat:
+            assert len(xdat) == 7, f"VASP4: 应为 7 帧，读到 {len(xdat)} 帧"
+            assert np.allclose(xdat.read(axes='xyz'), coords, rtol=0, atol=1e-12), "VASP4: 坐标不一致"
+    finally:
+        shutil.rmtree(tmp)
+    print("小文件检查: 正负坐标混排与 awk 逐字节一致，VASP4 帧数与坐标正确")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="XDATCAR 读取基准: awk (extract_z.sh) vs xdatcar.py。")
+    parser.add_argument('--file', default='bench_XDATCAR', help='合成 XDATCAR 路径 (默认: bench_XDATCAR)')
+    parser.add_argument('--size-mb', type=float, default=500, help='合成文件大小 MB (默认: 500)')
+    parser.add_argument('--atoms', type=int, default=96, help='原子数 (默认: 96)')
+    parser.add_argument('--element', default='O', help='提取的元素 (默认: O)')
+    parser.add_argument('--indices', default='', help='元素内序号，如 "2,4" (默认: 全部)')
+    parser.add_argument('--keep', action='store_true', help='保留合成文件')
+    args = parser.parse_args()
+
+    frame_bytes = 38 * args.atoms + 28
+    frames = max(1, int(args.size_mb * 1e6 / frame_bytes))
+    if not os.path.exists(args.file):
+        print(f"生成 {args.file}: {args.atoms} 原子 x {frames} 帧 ...")
+        write_xdatcar(args.file, args.atoms, frames)
+    for suffix in ('.xdatidx.npz',):
+        if os.path.exists(args.file + suffix):
+            os.remove(args.file + suffix)
+    size_mb = os.path.getsize(args.file) / 1e6
+
+    env = dict(os.environ, EXTRACT_Z_AWK='1')
+    check_small(env)
+    t_awk, out_awk = timed(lambda: run_script(
+        ['bash', os.path.join(HERE, 'extract_z.sh'), args.element, args.file, args.indices], env))
+    cli = [sys.executable, os.path.join(HERE, 'xdatcar.py'), args.element, args.file, args.indices]
+    t_cold, out_py = timed(lambda: run_script(cli))
+    t_warm, _ = timed(lambda: run_script(cli))
+
+    def read_numpy():
+        with Xdatcar(args.file) as xdat:
+            indices = [int(i) for i in args.indices.split(',')] if args.indices else None
+            return xdat.read(atoms=xdat.atoms_of(args.element, indices), axes='z').shape
+
+    t_read, shape = timed(read_numpy)
+    assert out_awk == out_py, "xdatcar.py 与 awk 的输出不一致"
+
+    print(f"文件 {size_mb:.0f} MB, 输出 {shape[0]} 帧 x {shape[1]} 原子 (与 awk 输出逐字节一致)")
+    print(f"{'方式':<28} {'耗时(s)':>10} {'MB/s':>10} {'相对 awk':>10}")
+    for name, t in (('awk (extract_z.sh)', t_awk), ('xdatcar.py 首次 (建索引)', t_cold),
+                    ('xdatcar.py 再次 (索引缓存)', t_warm), ('Xdatcar.read -> NumPy', t_read)):
+        print(f"{name:<28} {t:>10.2f} {size_mb / t:>10.0f} {t_awk / t:>9.1f}x")
+
+    if not args.keep:
+        os.remove(args.file)
+        if os.path.exists(args.file + '.xdatidx.npz'):
+            os.remove(args.file + '.xdatidx.npz')
+
+
+if __name__ == "__main__":
+    main()
@@ -17,6 +17,13 @@ ELEMENT=$1
 FILE=${2:-XDATCAR}
 INDEX_STR=${3:-""}
 
+# 有 python3 + numpy 时交给 xdatcar.py (mmap + 帧索引，输出格式相同)；
+# 否则或设置了 EXTRACT_Z_AWK=1 时使用下面原来的 awk 实现
+SCRIPT_DIR=$(cd "$(dirname "$0")" && pwd)
+if [ -z "$EXTRACT_Z_AWK" ] && [ -f "$SCRIPT_DIR/xdatcar.py" ] && python3 -c "import numpy" 2>/dev/null; then
+    exec python3 "$SCRIPT_DIR/xdatcar.py" "$ELEMENT" "$FILE" "$INDEX_STR"
+fi
+
 awk -v element="$ELEMENT" -v indices_str="$INDEX_STR" '
 BEGIN {
     frame = 0; 
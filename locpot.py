@@ -0,0 +1,231 @@
+import argparse
+import mmap
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from outcar import Outcar
+
+# --- LOCPOT 平面平均与真空能级 ---
+# 用 mmap 打开 LOCPOT，解析头部 (晶格、原子数、网格 NGX NGY NGZ) 后按块 (整行切分) 把数据转为浮点数，
+# 每凑满若干个 z 平面 (NGX*NGY 个值，x 变化最快) 就累加到沿所选轴的平面和里，随后丢弃；
+# 内存中只有一块数据和一维结果，不会生成完整的三维网格。
+# 真空平台: 平面平均势中高于 最低值 + frac*(最高值 - 最低值) 且梯度小于 tol 的连续区域 (周期性)；
+# 以平板 (势最低的区域) 为中心，分别取其左侧 (坐标较小) 和右侧最长的平台。
+# ΔV = V左 - V右 (与原 plot_potential 相同)；同目录有 OUTCAR 时功函数 Φ = V真空 - E-fermi。
+
+PLANAR_FILE = 'PLANAR_AVERAGE.dat'
+BLOCK_SIZE = 1 << 23  # 每次解析的字节数
+AXES = {'x': 0, 'y': 1, 'z': 2}
+# 数据块中出现 E 以外的字母说明已读到数据段之后 (如 augmentation occupancies)
+_TEXT = re.compile(rb'[A-DF-Za-df-z]')
+
+
+class Locpot:
+    def __init__(self, path='LOCPOT'):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.size = os.fstat(f.fileno()).st_size
+            self._read_header(f)
+
+    def _read_header(self, f):
+        lines = [f.readline() for _ in range(7)]
+        scale = float(lines[1].split()[0])
+        lattice = np.array([list(map(float, line.split()[:3])) for line in lines[2:5]])
+        if scale < 0:  # 负数表示体积
+            scale = (-scale / abs(np.linalg.det(lattice))) ** (1 / 3)
+        self.lattice = scale * lattice
+        # VASP 5 起第 6 行为元素名，之后才是原子数
+        if lines[5].split()[0].isdigit():
+            self.species = []
+            counts = lines[5]
+        else:
+            self.species = lines[5].split()
+            counts = lines[6]
+            lines.append(f.readline())
+        self.counts = [int(c) for c in counts.split()]
+        if lines[-1].strip()[:1] in (b'S', b's'):  # Selective dynamics
+            f.readline()
+        for _ in range(sum(self.counts)):
+            f.readline()
+        line = f.readline()
+        while line and not line.strip():
+            line = f.readline()
+        self.grid = tuple(int(n) for n in line.split()[:3])
+        if len(self.grid) != 3:
+            raise ValueError(f"{self.path}: 原子坐标之后没有网格大小")
+        self.offset = f.tell()
+
+    def _values(self, mm, start, end):
+        block = mm[start:end]
+        match = _TEXT.search(block)
+        if match is not None:
+            # 读到了数据段之后的文字: 只解析其所在行之前的部分
+            block = block[:block.rfind(b'\n', 0, match.start()) + 1]
+        return np.array(block.split(), dtype=float)
+
+    def planar_average(self, axis=2, block_size=BLOCK_SIZE):
+        # -> (坐标 Å, 平面平均势 eV)，沿 axis (0/1/2 或 'x'/'y'/'z')
+        axis = AXES.get(axis, axis)
+        nx, ny, nz = self.grid
+        plane = nx * ny
+        sums = np.zeros(self.grid[axis])
+        done = 0
+        pending = np.empty(0)
+        with open(self.path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            start = self.offset
+            while done < nz and start < self.size:
+                end = min(start + block_size, self.size)
+                if end < self.size:
+                    cut = mm.rfind(b'\n', start, end)
+                    end = cut + 1 if cut >= 0 else self.size
+                values = self._values(mm, start, end)
+                start = end
+                if pending.size:
+                    values = np.concatenate([pending, values])
+                count = min(values.size // plane, nz - done)
+                planes = values[:count * plane].reshape(count, ny, nx)
+                if axis == 2:
+                    sums[done:done + count] = planes.sum(axis=(1, 2))
+                elif axis == 1:
+                    sums += planes.sum(axis=(0, 2))
+                else:
+                    sums += planes.sum(axis=(0, 1))
+                pending = values[count * plane:].copy()
+                done += count
+        if done < nz:
+            raise ValueError(f"{self.path}: 数据不完整 (读到 {done}/{nz} 个 z 平面)")
+        average = sums / (nx * ny * nz / self.grid[axis])
+        length = np.linalg.norm(self.lattice[axis])
+        return np.arange(self.grid[axis]) * (length / self.grid[axis]), average
+
+
+def read_planar(path=PLANAR_FILE):
+    # vaspkit 的 PLANAR_AVERAGE.dat: 第一行为标题，之后两列 坐标 势
+    data = np.loadtxt(path, skiprows=1, usecols=(0, 1), ndmin=2)
+    return data[:, 0], data[:, 1]
+
+
+def write_planar(path, coordinate, potential, axis=2):
+    name = 'xyz'[AXES.get(axis, axis)]
+    tmp = f"{path}.{os.getpid()}.tmp"
+    np.savetxt(tmp, np.column_stack([coordinate, potential]), fmt='%15.6f',
+               header=f"{name}(Angstrom)  Planar-Average(eV)")
+    os.replace(tmp, path)
+
+
+def _runs(mask):
+    # 周期性的 True 区间 -> [(起点, 长度), ...]，跨越末尾的区间起点在后部
+    n = len(mask)
+    if mask.all():
+        return [(0, n)]
+    shift = int(np.argmin(mask))  # 从一个 False 开始，跨越末尾的区间不会被拆开
+    rolled = np.concatenate([[False], np.roll(mask, -shift), [False]]).astype(np.int8)
+    edges = np.flatnonzero(np.diff(rolled))
+    return [((s + shift) % n, e - s) for s, e in zip(edges[::2], edges[1::2])]
+
+
+def vacuum_levels(coordinate, potential, frac=0.8, tol=0.05):
+    # -> {'left', 'right', 'delta', 'left_range', 'right_range', 'slab'}；range 为平台的 (起点, 终点) 坐标
+    v = np.asarray(potential, dtype=float)
+    n = len(v)
+    step = coordinate[1] - coordinate[0]
+    gradient = np.abs(np.roll(v, -1) - np.roll(v, 1)) / (2 * step)
+    threshold = v.min() + frac * (v.max() - v.min())
+    runs = _runs((v > threshold) & (gradient < tol))
+    if not runs:
+        raise ValueError(f"没有找到真空平台 (frac={frac}, tol={tol} eV/Å)")
+    # 平板: 低于阈值的最长区间，其中点为参考
+    slab = max(_runs(v <= threshold), key=lambda r: r[1])
+    center = (slab[0] + slab[1] / 2) % n
+    sides = {'left': [], 'right': []}
+    for start, length in runs:
+        offset = (start + length / 2 - center + n / 2) % n - n / 2
+        sides['left' if offset < 0 else 'right'].append((start, length))
+    result = {'slab': (float(coordinate[slab[0]]), float(coordinate[(slab[0] + slab[1] - 1) % n]))}
+    longest = max(runs, key=lambda r: r[1])
+    for side, candidates in sides.items():
+        # 对称平板没有偶极校正时真空只有一段，两侧取同一个平台
+        start, length = max(candidates, key=lambda r: r[1]) if candidates else longest
+        indices = (start + np.arange(length)) % n
+        result[side] = float(v[indices].mean())
+        result[side + '_range'] = (float(coordinate[indices[0]]), float(coordinate[indices[-1]]))
+    result['delta'] = result['left'] - result['right']
+    return result
+
+
+def efermi(dirname):
+    try:
+        return Outcar(os.path.join(dirname, 'OUTCAR')).last(['efermi'])['efermi']
+    except OSError:
+        return None
+
+
+def analyse(path, axis=2, frac=0.8, tol=0.05, write=False):
+    # 在子进程中运行: 一个 LOCPOT (或含 LOCPOT 的目录) -> 结果字典
+    if os.path.isdir(path):
+        path = os.path.join(path, 'LOCPOT')
+    dirname = os.path.dirname(path) or '.'
+    result = {'path': path}
+    try:
+        coordinate, potential = Locpot(path).planar_average(axis)
+        if write:
+            write_planar(os.path.join(dirname, PLANAR_FILE), coordinate, potential, axis)
+        result.update(vacuum_levels(coordinate, potential, frac, tol))
+    except (OSError, ValueError, IndexError) as e:
+        result['error'] = str(e)
+        return result
+    fermi = efermi(dirname)
+    result['efermi'] = fermi
+    result['phi_left'] = None if fermi is None else result['left'] - fermi
+    result['phi_right'] = None if fermi is None else result['right'] - fermi
+    return result
+
+
+def fmt(value):
+    return f"{'-':>10s}" if value is None else f"{value:10.4f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LOCPOT 平面平均、自动识别两侧真空平台，输出 ΔV 与功函数 (可并行处理多个结构)。")
+    parser.add_argument('paths', nargs='*', default=['LOCPOT'], help='LOCPOT 文件或含 LOCPOT 的目录 (默认: LOCPOT)')
+    parser.add_argument('--axis', choices=list(AXES), default='z', help='平均后保留的方向 (默认: z)')
+    parser.add_argument('--frac', type=float, default=0.8,
+                        help='真空判据: 势高于 最低值 + frac*(最高值-最低值) (默认: 0.8)')
+    parser.add_argument('--tol', type=float, default=0.05, help='真空平台的最大梯度 eV/Å (默认: 0.05)')
+    parser.add_argument('--write', action='store_true', help=f'在各 LOCPOT 旁写出 {PLANAR_FILE}')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='并行进程数 (默认: CPU 核数)')
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    options = (AXES[args.axis], args.frac, args.tol, args.write)
+    workers = min(args.jobs or os.cpu_count() or 1, len(args.paths))
+    if workers == 1:
+        results = [analyse(path, *options) for path in args.paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(analyse, args.paths, *[[o] * len(args.paths) for o in options]))
+
+    failed = 0
+    print(f"# {'file':<30s} {'V_left':>10s} {'V_right':>10s} {'dV':>10s} {'E_fermi':>10s} {'Phi_left':>10s} "
+          f"{'Phi_right':>10s}")
+    for r in results:
+        if 'error' in r:
+            print(f"错误: {r['path']}: {r['error']}", file=sys.stderr)
+            failed += 1
+            continue
+        print(f"  {r['path']:<30s} {fmt(r['left'])} {fmt(r['right'])} {fmt(r['delta'])} {fmt(r['efermi'])} "
+              f"{fmt(r['phi_left'])} {fmt(r['phi_right'])}")
+    print(f"{len(results)} 个 LOCPOT，失败 {failed} 个，用时 {time.perf_counter() - t0:.2f} s", file=sys.stderr)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
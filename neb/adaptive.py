@@ -0,0 +1,162 @@
+import argparse
+import time
+
+import numpy as np
+
+# --- 自适应细化 ---
+# 滑移能面 E(d) 对位移 d (分数坐标) 是周期函数。用周期核的 Kriging (高斯过程回归 / RBF 插值) 拟合已完成的点:
+#   k(d, d') = exp(-2 Σ sin²(π(d - d')) / ℓ²)，两个方向都以 1 为周期；ℓ 取边际似然最大者
+# 误差估计: 后验标准差 (离样本越远越大) 乘以附近样本的留一误差相对大小 (能量变化剧烈的区域，
+# 例如鞍点、窄的能量坑附近，留一预测不准，估计误差随之放大)。每轮在目标网格尚未计算的点中
+# 选估计误差最大的一批，彼此至少相隔 min_separation 个网格步长；所有点的估计误差都小于 tol 时认为已收敛。
+# python adaptive.py 用解析能量函数代替 VASP 模拟整个流程，并与同样密度的均匀网格比较。
+
+LENGTHS = (0.1, 0.15, 0.2, 0.3, 0.4, 0.6, 0.8, 1.2, 1.6)  # 候选核长度
+NUGGET = 1e-6  # 对角线上的小量，保证数值稳定
+LOO_CLIP = (0.3, 3.0)  # 留一误差放大系数的范围
+
+
+def periodic_kernel(a, b, length):
+    d = a[:, None, :] - b[None, :, :]
+    return np.exp(-2 * (np.sin(np.pi * d) ** 2).sum(axis=-1) / length ** 2)
+
+
+class PeriodicKriging:
+    def __init__(self, lengths=LENGTHS):
+        self.lengths = lengths
+
+    def fit(self, d, energies):
+        d = np.asarray(d, dtype=float)
+        y = np.asarray(energies, dtype=float)
+        self.d = d
+        self.mean = y.mean()
+        best = None
+        for length in self.lengths:
+            K = periodic_kernel(d, d, length) + NUGGET * np.eye(len(d))
+            try:
+                chol = np.linalg.cholesky(K)
+            except np.linalg.LinAlgError:
+                continue
+            alpha = np.linalg.solve(chol.T, np.linalg.solve(chol, y - self.mean))
+            variance = max((y - self.mean) @ alpha / len(y), 1e-16)  # 信号方差的最大似然估计
+            likelihood = -0.5 * len(y) * np.log(variance) - np.log(np.diag(chol)).sum()
+            if best is None or likelihood > best[0]:
+                best = (likelihood, length, chol, alpha, variance)
+        _, self.length, self.chol, self.alpha, self.variance = best
+        # 留一残差 (Rippa): e_i = alpha_i / (K^-1)_ii
+        inverse = np.linalg.inv(self.chol)
+        self.loo = np.abs(self.alpha / (inverse ** 2).sum(axis=0))
+        return self
+
+    def predict(self, d):
+        # -> (均值, 标准差)
+        k = periodic_kernel(np.asarray(d, dtype=float), self.d, self.length)
+        v = np.linalg.solve(self.chol, k.T)
+        variance = self.variance * np.maximum(1 + NUGGET - (v * v).sum(axis=0), 0.0)
+        return self.mean + k @ self.alpha, np.sqrt(variance)
+
+
+def periodic_distance(a, b, n):
+    # 网格坐标 a (p, 2) 与 b (q, 2) 之间考虑周期的距离 (网格步长)，形状 (p, q)
+    diff = np.abs(a[:, None, :] - b[None, :, :]) % n
+    diff = np.minimum(diff, n - diff)
+    return np.sqrt((diff ** 2).sum(axis=-1))
+
+
+def estimate(done, energies, grid):
+    # done: (n, 2) 已完成的网格坐标 (i, j)，i < nx, j < ny
+    # 返回 (预测能量, 估计误差, 核长度)，前两者形状为 (nx, ny)
+    nx, ny = grid
+    n = np.array([nx, ny])
+    cells = np.indices((nx, ny)).reshape(2, -1).T
+    model = PeriodicKriging().fit(done / n, energies)
+    predicted, std = model.predict(cells / n)
+    nearest = periodic_distance(cells, done, n).argmin(axis=1)
+    scale = np.sqrt((model.loo ** 2).mean()) or 1.0
+    error = 2 * std * np.clip(model.loo[nearest] / scale, *LOO_CLIP)
+    error = error.reshape(nx, ny)
+    error[done[:, 0], done[:, 1]] = 0.0
+    return predicted.reshape(nx, ny), error, model.length
+
+
+def select(error, exclude, batch, min_separation=1.5):
+    # 在 exclude (已计算或已提交的网格坐标) 之外，按估计误差从大到小贪心选取，彼此相距 >= min_separation
+    nx, ny = error.shape
+    n = np.array([nx, ny])
+    mask = np.ones((nx, ny), dtype=bool)
+    if len(exclude):
+        mask[exclude[:, 0] % nx, exclude[:, 1] % ny] = False
+    chosen = []
+    for flat in np.argsort(error, axis=None)[::-1]:
+        if len(chosen) >= batch:
+            break
+        cell = np.array(np.unravel_index(flat, (nx, ny)))
+        if not mask[tuple(cell)]:
+            continue
+        if chosen and periodic_distance(cell[None], np.array(chosen), n).min() < min_separation:
+            continue
+        chosen.append(cell)
+    return np.array(chosen, dtype=int).reshape(-1, 2)
+
+
+def coarse_points(grid, coarse):
+    # 初始的粗网格: 每 grid/coarse 个步长取一个点 (只取一个周期内的点，i < nx, j < ny)
+    nx, ny = grid
+    cx, cy = coarse
+    if nx % cx or ny % cy:
+        raise ValueError(f"粗网格 {cx}x{cy} 必须整除目标网格 {nx}x{ny}")
+    return np.array([(i, j) for i in range(0, nx, nx // cx) for j in range(0, ny, ny // cy)], dtype=int)
+
+
+# --- 用解析函数代替 VASP 的模拟 ---
+def model_energy(d):
+    # 六方双层的典型滑移能面 (eV): 第一、二壳层 Fourier 项，加一个较窄的周期 Gaussian 坑 (需要局部加密)
+    u, v = np.asarray(d, dtype=float).T
+    first = np.cos(2 * np.pi * u) + np.cos(2 * np.pi * v) + np.cos(2 * np.pi * (u + v))
+    second = np.cos(2 * np.pi * (2 * u + v)) + np.cos(2 * np.pi * (u + 2 * v)) + np.cos(2 * np.pi * (u - v))
+    du = (u - 0.62 + 0.5) % 1 - 0.5
+    dv = (v - 0.31 + 0.5) % 1 - 0.5
+    well = np.exp(-(du ** 2 + dv ** 2 + du * dv) / (2 * 0.06 ** 2))
+    return 0.02 * first + 0.004 * second - 0.015 * well
+
+
+def simulate(func, grid, coarse, batch, tol, max_rounds=200):
+    # 返回 (已计算的网格坐标, 每轮的 (样本数, 最大估计误差, 实际最大误差))
+    n = np.array(grid)
+    cells = np.indices(grid).reshape(2, -1).T
+    truth = func(cells / n).reshape(grid)
+    done = coarse_points(grid, coarse)
+    history = []
+    for _ in range(max_rounds):
+        predicted, error, _ = estimate(done, func(done / n), grid)
+        history.append((len(done), float(error.max()), float(np.abs(predicted - truth).max())))
+        if error.max() < tol:
+            break
+        new = select(error, done, batch)
+        if not len(new):
+            break
+        done = np.vstack([done, new])
+    return done, history
+
+
+def main():
+    parser = argparse.ArgumentParser(description="自适应细化的模拟: 用解析能量函数代替 VASP，与均匀网格比较所需计算数。")
+    parser.add_argument('--grid', nargs=2, type=int, default=[24, 24], help='目标网格间隔数 (默认: 24 24)')
+    parser.add_argument('--coarse', nargs=2, type=int, default=[4, 4], help='初始粗网格 (默认: 4 4)')
+    parser.add_argument('--batch', type=int, default=8, help='每轮新增的点数 (默认: 8)')
+    parser.add_argument('--tol', type=float, default=0.002, help='收敛判据: 最大估计误差 eV (默认: 0.002)')
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    grid = tuple(args.grid)
+    done, history = simulate(model_energy, grid, tuple(args.coarse), args.batch, args.tol)
+    print(f"{'轮次':>4} {'样本数':>6} {'估计误差(meV)':>14} {'实际最大误差(meV)':>18}")
+    for k, (count, estimated, actual) in enumerate(history):
+        print(f"{k:>4} {count:>6} {estimated * 1000:>14.2f} {actual * 1000:>18.2f}")
+    total = grid[0] * grid[1]
+    print(f"计算 {len(done)} 个点 (均匀 {grid[0]}x{grid[1]} 网格需 {total} 个，{len(done) / total:.0%})，"
+          f"用时 {time.perf_counter() - t0:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
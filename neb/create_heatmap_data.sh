@@ -5,22 +5,53 @@ echo "# Directory Dipole_Sum Energy" > combined_results.dat
 > dipole_c.dat
 > energy.dat
 
+# 有 python3 + numpy 时用 ../outcar.py 一次读出所有 OUTCAR 的最终值 (从文件末尾向前读)；
+# 否则 (或设置了 OUTCAR_AWK=1) 每个 OUTCAR 用 tac | awk 提取。每行输出: OUTCAR路径 偶极矩 能量，缺失为 -
+# outcar_archive.py --compress 压缩过的 OUTCAR.gz/.xz/.zst 同样可以读取 (awk 方式先解压到管道)。
+OUTCAR_PY=${OUTCAR_PY:-$(cd "$(dirname "$0")" && pwd)/../outcar.py}
+reverse() {
+    case "$1" in
+        *.gz) gzip -dc "$1" | tac ;;
+        *.xz) xz -dc "$1" | tac ;;
+        *.zst) zstd -dcq "$1" | tac ;;
+        *) tac "$1" ;;
+    esac
+}
+extract() {
+    if [ -z "$OUTCAR_AWK" ] && [ -f "$OUTCAR_PY" ] && python3 -c "import numpy" 2>/dev/null; then
+        python3 "$OUTCAR_PY" -H -q dipole,energy "$@"
+        return
+    fi
+    for outcar in "$@"; do
+        # 提取偶极矩数据和能量数据（取最后一个匹配项）
+        dipole=$(reverse "$outcar" | awk '/dipole moment/{print $(NF-3)+$(NF-2); exit}')
+        energy=$(reverse "$outcar" | awk '/free  energy   TOTEN/{print $5; exit}')
+        echo "$outcar ${dipole:--} ${energy:--}"
+    done
+}
+
 # 查找所有disp目录并按自然排序处理
-find . -maxdepth 1 -type d -name "disp_*" | sort -V | while read dir; do
+outcars=()
+for dir in $(find . -maxdepth 1 -type d -name "disp_*" | sort -V); do
     dirname=${dir#./}
-    
-    # 检查OUTCAR是否存在
-    if [ ! -f "$dirname/OUTCAR" ]; then
+
+    # 检查OUTCAR是否存在 (或已压缩)
+    outcar=""
+    for name in OUTCAR OUTCAR.gz OUTCAR.xz OUTCAR.zst; do
+        [ -f "$dirname/$name" ] && outcar="$dirname/$name" && break
+    done
+    if [ -z "$outcar" ]; then
         echo "警告: $dirname 中没有OUTCAR文件，跳过..."
         continue
     fi
+    outcars+=("$outcar")
+done
+
+[ ${#outcars[@]} -gt 0 ] && extract "${outcars[@]}" | while read outcar dipole energy; do
+    dirname=${outcar%/OUTCAR*}
+    [ "$dipole" = "-" ] && dipole=""
+    [ "$energy" = "-" ] && energy=""
 
-    # 提取偶极矩数据（取最后一个匹配项）
-    dipole=$(tac "$dirname/OUTCAR" | awk '/dipole moment/{print $(NF-3)+$(NF-2); exit}')
-    
-    # 提取能量数据（取最后一个匹配项）
-    energy=$(tac "$dirname/OUTCAR" | awk '/free  energy   TOTEN/{print $5; exit}')
-    
     # 验证数据完整性
     if [ -z "$dipole" ] || [ -z "$energy" ]; then
         echo "错误: $dirname 中的数据不完整，跳过..."
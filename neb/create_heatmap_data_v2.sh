@@ -7,22 +7,58 @@ echo "# Directory Dipole_Sum Dipole_Component Energy" > combined_results.dat
 > dipole_component.dat
 > energy.dat
 
+# 有 python3 + numpy 时用 ../outcar.py 一次读出所有 OUTCAR 的最终值 (从文件末尾向前读，三个量只读一遍)；
+# 否则 (或设置了 OUTCAR_AWK=1) 每个 OUTCAR 用 tac | awk 提取。每行输出: OUTCAR路径 偶极矩和 dipolmoment 能量，缺失为 -
+# outcar_archive.py --compress 压缩过的 OUTCAR.gz/.xz/.zst 同样可以读取 (awk 方式先解压到管道)。
+OUTCAR_PY=${OUTCAR_PY:-$(cd "$(dirname "$0")" && pwd)/../outcar.py}
+reverse() {
+    case "$1" in
+        *.gz) gzip -dc "$1" | tac ;;
+        *.xz) xz -dc "$1" | tac ;;
+        *.zst) zstd -dcq "$1" | tac ;;
+        *) tac "$1" ;;
+    esac
+}
+extract() {
+    if [ -z "$OUTCAR_AWK" ] && [ -f "$OUTCAR_PY" ] && python3 -c "import numpy" 2>/dev/null; then
+        python3 "$OUTCAR_PY" -H -q dipole,dipolmoment,energy "$@"
+        return
+    fi
+    for outcar in "$@"; do
+        # 提取三个数据项（逆向搜索最后出现的结果）
+        {
+            dipole_sum=$(reverse "$outcar" | awk '/dipole moment/{print $(NF-3)+$(NF-2); exit}')
+            dipole_raw=$(reverse "$outcar" | awk '/dipolmoment/{print $4; exit}')
+            energy=$(reverse "$outcar" | awk '/free  energy   TOTEN/{print $5; exit}')
+        } 2>/dev/null  # 忽略可能的错误输出
+        echo "$outcar ${dipole_sum:--} ${dipole_raw:--} ${energy:--}"
+    done
+}
+
 # 查找所有disp目录
-find . -maxdepth 1 -type d -name "disp_*" | sort -V | while read dir; do
+outcars=()
+for dir in $(find . -maxdepth 1 -type d -name "disp_*" | sort -V); do
     dirname=${dir#./}
     
-    # 检查OUTCAR存在性
-    if [ ! -f "$dirname/OUTCAR" ]; then
+    # 检查OUTCAR存在性 (或已压缩)
+    outcar=""
+    for name in OUTCAR OUTCAR.gz OUTCAR.xz OUTCAR.zst; do
+        [ -f "$dirname/$name" ] && outcar="$dirname/$name" && break
+    done
+    if [ -z "$outcar" ]; then
         echo "警告: $dirname 缺少OUTCAR，跳过..."
         continue
     fi
+    outcars+=("$outcar")
+done
 
-    # 提取三个数据项（逆向搜索最后出现的结果）
-    {
-        dipole_sum=$(tac "$dirname/OUTCAR" | awk '/dipole moment/{print $(NF-3)+$(NF-2); exit}')
-        dipole_comp=$(tac "$dirname/OUTCAR" | awk '/dipolmoment/{printf "%.6f", $4+1-0.982020; exit}')
-        energy=$(tac "$dirname/OUTCAR" | awk '/free  energy   TOTEN/{print $5; exit}')
-    } 2>/dev/null  # 忽略可能的错误输出
+[ ${#outcars[@]} -gt 0 ] && extract "${outcars[@]}" | while read outcar dipole_sum dipole_raw energy; do
+    dirname=${outcar%/OUTCAR*}
+    [ "$dipole_sum" = "-" ] && dipole_sum=""
+    [ "$energy" = "-" ] && energy=""
+    # 分量修正值: $4+1-0.982020
+    dipole_comp=""
+    [ "$dipole_raw" != "-" ] && dipole_comp=$(awk -v d="$dipole_raw" 'BEGIN{printf "%.6f", d+1-0.982020}')
 
     # 数据验证
     missing_data=()
@@ -0,0 +1,71 @@
+import argparse
+import os
+import sys
+import tarfile
+
+import numpy as np
+
+from generate_displacements import ARCHIVE_VERSION, moving_stack, write_dirs
+
+# --- 展开 generate_displacements.py --archive 写出的结构 ---
+# 作业端按需展开: 只为要提交的网格点建立 disp_i_j/POSCAR，例如在提交循环里
+#   python expand.py displacements.npz disp_03_04 && (cd disp_03_04 && qsub pbs.sh)
+# 不指定目录时展开全部；--list 只列出归档中的目录名。
+
+
+class Archive:
+    def __init__(self, path):
+        self.path = path
+        if path.endswith('.npz'):
+            with np.load(path) as data:
+                if int(data['version']) != ARCHIVE_VERSION:
+                    raise ValueError(f"{path}: 不支持的归档版本 {int(data['version'])}")
+                self.template = str(data['template'])
+                self.coords = data['coords']
+                self.moving = data['moving']
+                self.names = [str(name) for name in data['dirs']]
+                self.shifts = data['shifts']
+            self.tar = None
+        else:
+            self.tar = tarfile.open(path)
+            self.names = [member.name.rsplit('/', 1)[0] for member in self.tar.getmembers() if member.isfile()]
+
+    def texts(self, names):
+        # 目录名 -> POSCAR 文本
+        if self.tar is not None:
+            for name in names:
+                yield self.tar.extractfile(f"{name}/POSCAR").read().decode()
+            return
+        rows = {name: k for k, name in enumerate(self.names)}
+        selected = self.shifts[[rows[name] for name in names]]
+        for moved in moving_stack(self.coords, self.moving, selected):
+            yield self.template % tuple(moved.ravel().tolist())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="展开 generate_displacements.py --archive 写出的结构为 disp_*/POSCAR。")
+    parser.add_argument('archive', help='归档文件 (.npz 或 .tar/.tar.gz/.tgz/.tar.xz)')
+    parser.add_argument('dirs', nargs='*', help='要展开的目录名 (默认: 全部)')
+    parser.add_argument('--list', action='store_true', help='只列出归档中的目录名')
+    parser.add_argument('-C', '--directory', default='.', help='在此目录下展开 (默认: 当前目录)')
+    args = parser.parse_intermixed_args()
+
+    try:
+        archive = Archive(args.archive)
+    except (OSError, ValueError, KeyError, tarfile.TarError) as e:
+        print(f"错误: 无法读取 {args.archive}: {e}", file=sys.stderr)
+        sys.exit(1)
+    if args.list:
+        print('\n'.join(archive.names))
+        return
+    names = [os.path.basename(os.path.normpath(name)) for name in args.dirs] or archive.names
+    unknown = sorted(set(names) - set(archive.names))
+    if unknown:
+        print(f"错误: {args.archive} 中没有 {' '.join(unknown)}", file=sys.stderr)
+        sys.exit(1)
+    os.chdir(args.directory)
+    write_dirs(names, archive.texts(names))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# --- 本机模拟的 qsub / qstat ---
+# 供 jobs.py 在没有 PBS 的机器上测试整个流程:
+#   python fake_qsub.py [-J 0-N] job.sh   在后台运行作业 (数组作业每个元素一个进程，PBS_ARRAY_INDEX 为下标)，
+#                                          输出作业号，标准输出写到 job.sh.o<作业号>
+#   python fake_qsub.py --stat 作业号      作业仍在运行时退出码为 0，否则为 1 (与 qstat 查不到作业时相同)
+# 作业号与进程号记录在 $FAKE_PBS_DIR (默认: /tmp/fake_pbs-<用户名>)。
+
+STATE_DIR = os.environ.get('FAKE_PBS_DIR') or f"/tmp/fake_pbs-{os.environ.get('USER', os.getuid())}"
+
+
+def next_id():
+    os.makedirs(STATE_DIR, exist_ok=True)
+    path = os.path.join(STATE_DIR, 'counter')
+    try:
+        with open(path) as f:
+            counter = int(f.read()) + 1
+    except (OSError, ValueError):
+        counter = 1
+    with open(path, 'w') as f:
+        f.write(str(counter))
+    return f"{counter}.fake"
+
+
+def alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    # 已结束但尚未被回收的进程在 /proc 中的状态为 Z
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            return f.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except OSError:
+        return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本机模拟 qsub / qstat (测试 jobs.py 用)。")
+    parser.add_argument('script', nargs='?', help='作业脚本')
+    parser.add_argument('-J', '-t', dest='array', help='数组作业的下标范围，如 0-9')
+    parser.add_argument('--stat', metavar='JOB_ID', help='作业仍在运行时退出码为 0')
+    args = parser.parse_args()
+
+    if args.stat:
+        try:
+            with open(os.path.join(STATE_DIR, args.stat + '.json')) as f:
+                pids = json.load(f)
+        except (OSError, ValueError):
+            sys.exit(1)
+        sys.exit(0 if any(alive(pid) for pid in pids) else 1)
+    if not args.script:
+        parser.error("需要作业脚本")
+
+    job_id = next_id()
+    script = os.path.abspath(args.script)
+    if args.array:
+        first, last = map(int, args.array.split('-'))
+        indices = list(range(first, last + 1))
+    else:
+        indices = [None]
+    pids = []
+    for index in indices:
+        env = dict(os.environ, PBS_JOBID=job_id, PBS_O_WORKDIR=os.getcwd())
+        if index is not None:
+            env['PBS_ARRAY_INDEX'] = str(index)
+        suffix = '' if index is None else f'.{index}'
+        with open(f"{script}.o{job_id.split('.')[0]}{suffix}", 'w') as out:
+            process = subprocess.Popen(['bash', script], env=env, stdout=out, stderr=subprocess.STDOUT,
+                                       stdin=subprocess.DEVNULL, start_new_session=True)
+        pids.append(process.pid)
+    with open(os.path.join(STATE_DIR, job_id + '.json'), 'w') as f:
+        json.dump(pids, f)
+    print(job_id)
+
+
+if __name__ == "__main__":
+    main()
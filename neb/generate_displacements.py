@@ -1,47 +1,227 @@
 import os
+import io
+import sys
+import json
+import time
+import tarfile
 import argparse
 
-def read_poscar(poscar_path):
-    with open(poscar_path, 'r') as f:
-        lines = f.readlines()
-    
-    title = lines[0].strip()
-    scale = float(lines[1])
-    a = list(map(float, lines[2].split()))
-    b = list(map(float, lines[3].split()))
-    c = list(map(float, lines[4].split()))
-    species = lines[5].split()
-    nums = list(map(int, lines[6].split()))
-    total_atoms = sum(nums)
-    coord_type = lines[7].strip().lower()[0]
-    
-    coords = []
-    for line in lines[8:8+total_atoms]:
-        parts = line.split()
-        coords.append([float(parts[0]), float(parts[1]), float(parts[2])])
-    
-    return {
-        'title': title,
-        'scale': scale,
-        'lattice': [a, b, c],
-        'species': species,
-        'nums': nums,
-        'coord_type': coord_type,
-        'coords': coords
-    }
-
-def write_poscar(data, new_coords, folder, coord_type):
-    os.makedirs(folder, exist_ok=True)
-    with open(os.path.join(folder, 'POSCAR'), 'w') as f:
-        f.write(data['title'] + '\n')
-        f.write(f"{data['scale']}\n")
-        for vec in data['lattice']:
-            f.write(' '.join(map(str, vec)) + '\n')
-        f.write(' '.join(data['species']) + '\n')
-        f.write(' '.join(map(str, data['nums'])) + '\n')
-        f.write('Direct\n' if coord_type == 'd' else 'Cartesian\n')
-        for coord in new_coords:
-            f.write(' '.join(f"{x:.10f}" for x in coord) + '\n')
+import numpy as np
+
+from adaptive import coarse_points, estimate, select
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from poscar import PoscarTemplate, read, write_many  # noqa: E402
+
+# --- 批量生成 ---
+# 所有网格点的 POSCAR 只有移动原子的坐标不同: 用 NumPy 一次算出 (点数, 移动原子数, 3) 的坐标，
+# 表头和不动原子的行由 poscar.PoscarTemplate 只格式化一次，每个 POSCAR 只需一次 template % 坐标。
+# --archive 不建目录，把所有结构写进一个文件，作业端用 expand.py 按需展开:
+#   *.npz                    原始坐标 + 每个点的位移 (最紧凑)
+#   *.tar / *.tar.gz / *.tgz / *.tar.xz   每个点一个 disp_i_j/POSCAR，也可直接用 tar 解开
+
+ARCHIVE_VERSION = 1
+CHUNK = 4096  # 每次计算的网格点数，限制内存
+
+
+def point_shifts(points, grid, structure):
+    # points: (P, 2) 网格坐标 (i, j) -> (P, 3) 移动原子的位移，坐标类型与 POSCAR 相同
+    points = np.asarray(points, dtype=np.int64).reshape(-1, 2)
+    dx = points[:, 0] / grid[0]
+    dy = points[:, 1] / grid[1]
+    if not structure.cartesian:
+        return np.column_stack([dx, dy, np.zeros(len(points))])
+    # Cartesian 坐标与晶格一样以缩放系数为单位
+    lattice = structure.lattice
+    return dx[:, None] * lattice[0] + dy[:, None] * lattice[1]
+
+
+def moving_stack(coords, moving, shifts):
+    # -> (P, 移动原子数, 3) 每个点移动原子的新坐标
+    return np.asarray(coords, dtype=float)[moving][None, :, :] + shifts[:, None, :]
+
+
+def poscar_texts(template, coords, shifts):
+    # 按块生成每个点的 POSCAR 文本
+    for start in range(0, len(shifts), CHUNK):
+        yield from template.texts(moving_stack(coords, template.moving, shifts[start:start + CHUNK]))
+
+
+def write_dirs(names, texts):
+    write_many([os.path.join(name, 'POSCAR') for name in names], texts)
+
+
+def tar_mode(path):
+    for suffix, mode in (('.tar.gz', 'w:gz'), ('.tgz', 'w:gz'), ('.tar.xz', 'w:xz'), ('.tar', 'w')):
+        if path.endswith(suffix):
+            return mode
+    return None
+
+
+def write_archive(path, structure, names, points, shifts, template):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    if path.endswith('.npz'):
+        with open(tmp, 'wb') as f:
+            np.savez_compressed(f, version=ARCHIVE_VERSION, template=template.template,
+                                coords=structure.coords, moving=template.moving,
+                                dirs=np.array(names), points=np.asarray(points, dtype=np.int64).reshape(-1, 2),
+                                shifts=shifts)
+    else:
+        now = time.time()
+        with tarfile.open(tmp, tar_mode(path)) as tar:
+            for name, text in zip(names, poscar_texts(template, structure.coords, shifts)):
+                content = text.encode()
+                info = tarfile.TarInfo(f"{name}/POSCAR")
+                info.size = len(content)
+                info.mtime = now
+                tar.addfile(info, io.BytesIO(content))
+    os.replace(tmp, path)
+
+
+# --- 网格约化 ---
+# 位移 d (分数坐标) 与 d+1 是同一结构，所以 i=0 与 i=N (j 同理) 两行重复；
+# 若存在操作 g = (R, t) 使不动原子 F 映射到自身、移动原子 M 映射到 M + s，则 g(F ∪ (M+d)) = F ∪ (M + R d + s)，
+# 即位移 d 与 R d + s 的能量相同。--reduce periodic 只去掉周期重复，--reduce symmetry 另外按这些操作合并等价点。
+
+def lattice_rotations(lattice, tol=1e-4):
+    # 面内晶格点群: 保持 a、b 度规不变的整数矩阵 (作用于分数坐标 xy)
+    ab = np.array(lattice[:2], dtype=float)
+    metric = ab @ ab.T
+    rotations = []
+    for entries in np.ndindex(3, 3, 3, 3):
+        R = np.array(entries).reshape(2, 2) - 1
+        if abs(round(np.linalg.det(R))) == 1 and np.allclose(R.T @ metric @ R, metric, atol=tol * metric.max()):
+            rotations.append(R)
+    return rotations
+
+
+def _maps_onto(src, dst, src_species, dst_species, lattice, symprec):
+    # src 中每个原子都能在 dst 中找到同种、距离 (考虑周期) 小于 symprec 的原子
+    diff = src[:, None, :] - dst[None, :, :]
+    diff -= np.round(diff)
+    dist = np.linalg.norm(diff @ lattice, axis=-1)
+    return bool(((dist < symprec) & (src_species[:, None] == dst_species[None, :])).any(axis=1).all())
+
+
+def find_operations(frac, species, moving, lattice, symprec=0.01):
+    # 返回 [(R, s), ...]: 位移 d 与 R d + s 等价。frac: (n, 3) 分数坐标，moving: 移动原子的布尔掩码
+    fixed = ~moving
+    F, M = frac[fixed], frac[moving]
+    sF, sM = species[fixed], species[moving]
+    operations = []
+    for R2 in lattice_rotations(lattice):
+        R = np.eye(3)
+        R[:2, :2] = R2
+
+        def apply(x, t):
+            return x @ R.T + t
+
+        # 候选平移: 把 F 的某个原子 (原子数最少的种类中的第一个) 映射到同种原子
+        if len(F):
+            kinds, counts = np.unique(sF, return_counts=True)
+            anchor = np.flatnonzero(sF == kinds[np.argmin(counts)])[0]
+            translations = [F[k] - F[anchor] @ R.T for k in np.flatnonzero(sF == sF[anchor])]
+        else:
+            translations = [np.zeros(3)]
+        for t in translations:
+            t = t.copy()
+            t[2] = 0.0  # 只考虑面内操作，层的上下顺序不变
+            if len(F) and not _maps_onto(apply(F, t), F, sF, sF, lattice, symprec):
+                continue
+            image = apply(M, t)
+            for k in np.flatnonzero(sM == sM[0]):
+                shift = image[0] - M[k]
+                shift[2] = 0.0
+                if _maps_onto(image - shift, M, sM, sM, lattice, symprec):
+                    operations.append((R2, shift[:2] - np.round(shift[:2])))
+    return operations
+
+
+def reduce_grid(nx, ny, operations=(), tol=1e-3):
+    # 返回 rep: (nx+1, ny+1, 2) 每个网格点的代表点 (轨道中 (i, j) 最小者)
+    parent = {}
+
+    def find(p):
+        while parent.get(p, p) != p:
+            p = parent[p]
+        return p
+
+    def union(p, q):
+        p, q = find(p), find(q)
+        if p != q:
+            parent[max(p, q)] = min(p, q)
+
+    n = np.array([nx, ny])
+    for i in range(nx + 1):
+        for j in range(ny + 1):
+            union((i, j), (i % nx, j % ny))  # 周期重复
+            d = np.array([i / nx, j / ny])
+            for R, shift in operations:
+                q = (R @ d + shift) * n
+                k = np.round(q)
+                if np.abs(q - k).max() < tol:
+                    union((i % nx, j % ny), (int(k[0]) % nx, int(k[1]) % ny))
+    rep = np.zeros((nx + 1, ny + 1, 2), dtype=int)
+    for i in range(nx + 1):
+        for j in range(ny + 1):
+            rep[i, j] = find((i, j))
+    return rep
+
+
+# --- 自适应细化 (--adaptive) ---
+# 第一次运行生成粗网格；之后每次运行 (先用 harvest.py 收集已完成的能量) 用 adaptive.py 的 Kriging
+# 拟合能面，在估计误差最大的位置再生成 --batch 个点，直到估计误差都小于 --tol。
+# 目标网格 i=N、j=N 的点与 i=0、j=0 等价，不单独计算。
+
+def plan_adaptive(args):
+    # 返回 (要生成的 (i, j) 列表, 之前已生成的清单点, 本轮信息)
+    grid = tuple(args.grid)
+    previous = []
+    try:
+        with open('displacements.json') as f:
+            manifest = json.load(f)
+        if manifest.get('reduce') == 'adaptive' and tuple(manifest['grid']) == grid:
+            previous = manifest['points']
+            history = manifest.get('history', [])
+    except (OSError, ValueError, KeyError):
+        pass
+    if not previous:
+        return [(int(i), int(j)) for i, j in coarse_points(grid, tuple(args.coarse))], [], {'history': []}
+
+    try:
+        with open('harvest.json') as f:
+            harvested = {p['dir']: p for p in json.load(f)['points']}
+    except (OSError, ValueError, KeyError):
+        harvested = {}
+    done, energies = [], []
+    for point in previous:
+        result = harvested.get(point['dir'], {})
+        energy = result.get('values', {}).get('energy')
+        if result.get('status') == 'done' and energy is not None:
+            done.append((point['i'], point['j']))
+            energies.append(float(energy))
+    pending = len(previous) - len(done)
+    if len(done) < 4:
+        print(f"已完成的点只有 {len(done)} 个 (另有 {pending} 个未完成)，请等计算完成并运行 harvest.py 后再细化")
+        return [], previous, {'history': history}
+
+    done = np.array(done)
+    predicted, error, length = estimate(done, energies, grid)
+    # 保存当前的能面预测与估计误差 (周期延拓到 (N+1)x(N+1) 网格，与 heatmap.py 的网格一致)
+    wrap = (np.arange(grid[0] + 1) % grid[0])[:, None], (np.arange(grid[1] + 1) % grid[1])[None, :]
+    np.savez('adaptive.npz', energy=predicted[wrap], error=error[wrap], done=done, length=length)
+    max_error = float(error.max())
+    history = history + [{'samples': len(done), 'pending': pending, 'max_error': max_error}]
+    if max_error < args.tol:
+        print(f"已收敛: {len(done)} 个点，最大估计误差 {max_error * 1000:.2f} meV < {args.tol * 1000:.2f} meV "
+              f"(预测能面见 adaptive.npz)")
+        return [], previous, {'history': history}
+    generated = np.array([(p['i'], p['j']) for p in previous])
+    new = select(error, generated, args.batch)
+    print(f"{len(done)} 个点已完成 ({pending} 个未完成)，最大估计误差 {max_error * 1000:.2f} meV，"
+          f"新增 {len(new)} 个点")
+    return [(int(i), int(j)) for i, j in new], previous, {'history': history}
+
 
 def main():
     parser = argparse.ArgumentParser(description="Generate displacement POSCARs.")
@@ -49,11 +229,26 @@ def main():
                         help='1-based indices of atoms to displace')
     parser.add_argument('--grid', nargs=2, type=int, default=[12, 12],
                         help='Number of intervals in x and y directions (default: 12 12)')
+    parser.add_argument('--reduce', choices=['none', 'periodic', 'symmetry'], default='none',
+                        help='只生成不等价的位移: periodic 去掉 i=N、j=N 的周期重复，symmetry 另外按结构对称性合并 '
+                             '(默认: none，生成全部网格点)；对应关系写入 displacements.json')
+    parser.add_argument('--symprec', type=float, default=0.01, help='对称性判断的距离容差 (Å，默认: 0.01)')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='自适应细化: 第一次生成 --coarse 粗网格，之后每次运行按已完成的能量 (harvest.json) '
+                             '在估计误差最大处新增 --batch 个点；--grid 为目标网格')
+    parser.add_argument('--coarse', nargs=2, type=int, default=[4, 4], help='自适应细化的初始粗网格 (默认: 4 4)')
+    parser.add_argument('--batch', type=int, default=8, help='自适应细化每轮新增的点数 (默认: 8)')
+    parser.add_argument('--tol', type=float, default=0.002, help='自适应细化的收敛判据: 最大估计误差 eV (默认: 0.002)')
+    parser.add_argument('--archive',
+                        help='不建 disp_* 目录，所有结构写入一个文件 (.npz 或 .tar/.tar.gz/.tgz/.tar.xz)，'
+                             '作业端用 expand.py 展开')
     args = parser.parse_args()
+    if args.archive and not (args.archive.endswith('.npz') or tar_mode(args.archive)):
+        parser.error(f"--archive 只支持 .npz、.tar、.tar.gz、.tgz、.tar.xz: {args.archive}")
     
-    poscar_data = read_poscar('POSCAR')
-    coord_type = poscar_data['coord_type']
-    coords = poscar_data['coords']
+    structure = read('POSCAR')
+    coord_type = 'c' if structure.cartesian else 'd'
+    coords = structure.coords
     selected_atoms = [i-1 for i in args.atoms]
     
     max_index = len(coords) - 1
@@ -62,40 +257,67 @@ def main():
             raise ValueError(f"原子索引 {idx+1} 超出范围（总原子数：{max_index+1}）")
     
     intervals_x, intervals_y = args.grid
-    grid_x = intervals_x
-    grid_y = intervals_y
     width_x = len(str(intervals_x))  # 最大索引=间隔数
     width_y = len(str(intervals_y))
 
-    scale = poscar_data['scale']
-    a = [scale * x for x in poscar_data['lattice'][0]]
-    b = [scale * x for x in poscar_data['lattice'][1]]
-
-    # 修改循环范围为 0 到间隔数（包含）
-    for i in range(intervals_x + 1):
-        for j in range(intervals_y + 1):
-            dx = i / intervals_x
-            dy = j / intervals_y
-            
-            if coord_type == 'd':
-                displacement = [dx, dy, 0.0]
-            else:
-                displacement = [
-                    dx * a[0] + dy * b[0],
-                    dx * a[1] + dy * b[1],
-                    dx * a[2] + dy * b[2]
-                ]
-            
-            new_coords = []
-            for idx, coord in enumerate(coords):
-                if idx in selected_atoms:
-                    new_coord = [c + disp for c, disp in zip(coord, displacement)]
-                    new_coords.append(new_coord)
-                else:
-                    new_coords.append(coord.copy())
-            
-            folder = f"disp_{i:0{width_x}d}_{j:0{width_y}d}"
-            write_poscar(poscar_data, new_coords, folder, coord_type)
+    operations = []
+    if args.reduce == 'symmetry':
+        lattice = structure.cell
+        frac = structure.direct()
+        species = structure.elements
+        moving = np.zeros(len(coords), dtype=bool)
+        moving[selected_atoms] = True
+        operations = find_operations(frac, species, moving, lattice, args.symprec)
+    rep = reduce_grid(intervals_x, intervals_y, operations) if args.reduce != 'none' else None
+
+    def folder_name(i, j):
+        return f"disp_{i:0{width_x}d}_{j:0{width_y}d}"
+
+    manifest_points = []
+    equivalent = {}
+    extra = {}
+    if args.adaptive:
+        todo, manifest_points, extra = plan_adaptive(args)
+        # 目标网格 i=N 或 j=N 的点是 i=0、j=0 的周期像
+        for i in range(intervals_x + 1):
+            for j in range(intervals_y + 1):
+                if i == intervals_x or j == intervals_y:
+                    equivalent[folder_name(i, j)] = folder_name(i % intervals_x, j % intervals_y)
+    else:
+        todo = []
+        # 修改循环范围为 0 到间隔数（包含）
+        for i in range(intervals_x + 1):
+            for j in range(intervals_y + 1):
+                if rep is not None and tuple(rep[i, j]) != (i, j):
+                    equivalent[folder_name(i, j)] = folder_name(*rep[i, j])
+                    continue
+                todo.append((i, j))
+    added = len(todo)
+
+    t0 = time.perf_counter()
+    moving = np.zeros(len(coords), dtype=bool)
+    moving[selected_atoms] = True
+    points = np.array(todo, dtype=np.int64).reshape(-1, 2)
+    shifts = point_shifts(points, args.grid, structure)
+    names = [folder_name(i, j) for i, j in todo]
+    template = PoscarTemplate(structure, moving)
+    if args.archive:
+        write_archive(args.archive, structure, names, points, shifts, template)
+    else:
+        write_dirs(names, poscar_texts(template, coords, shifts))
+    for (i, j), name in zip(todo, names):
+        manifest_points.append({'dir': name, 'i': i, 'j': j, 'dx': i / intervals_x, 'dy': j / intervals_y})
+
+    # 网格清单: heatmap.py 据此确定网格大小，harvest.py / heatmap.py 用 equivalent 把结果展开回完整网格
+    with open('displacements.json', 'w') as f:
+        json.dump({'grid': [intervals_x, intervals_y], 'atoms': args.atoms, 'coord_type': coord_type,
+                   'reduce': 'adaptive' if args.adaptive else args.reduce, 'operations': len(operations),
+                   'points': manifest_points, 'equivalent': equivalent, 'archive': args.archive, **extra},
+                  f, indent=1)
+    total = (intervals_x + 1) * (intervals_y + 1)
+    print(f"生成 {added} 个位移，共 {len(manifest_points)} 个 (完整网格 {total} 个点"
+          + (f"，{len(operations)} 个对称操作" if args.reduce == 'symmetry' else '') + ")"
+          + (f"，写入 {args.archive}" if args.archive else '') + f"，用时 {time.perf_counter() - t0:.2f} s")
 
 if __name__ == "__main__":
     main()
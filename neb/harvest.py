@@ -0,0 +1,210 @@
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from outcar import FINISHED_MARKER, QUANTITIES, Outcar, resolve  # noqa: E402
+
+# --- disp_* 结果收集 ---
+# 取代 create_heatmap_data.sh / create_heatmap_data_v2.sh 的串行 tac | awk:
+#   - 用进程池并行解析各目录的 OUTCAR (outcar.py 从文件末尾向前读)
+#   - 结果连同 OUTCAR 的大小和修改时间保存在 harvest.json 中，重新运行时只解析新增或变化的 OUTCAR
+#   - harvest.json 记录每个网格点的状态:
+#       done        VASP 正常结束且提取到所有量
+#       failed      VASP 已结束但缺少某个量
+#       unfinished  OUTCAR 没有结束标记 (仍在计算或被中断)
+#       missing     目录中没有 OUTCAR (也没有压缩的 OUTCAR.gz/.xz/.zst)
+#   - generate_displacements.py --reduce 只计算了不等价的网格点时，按 displacements.json 中的 equivalent
+#     把结果展开回完整网格 (展开的点记录 source = 实际计算的目录)
+#   - 同时写出与原脚本格式相同的 combined_results.dat 及单列文件，static.sh 可照常使用
+# 所有输出文件都先写临时文件再 os.replace，中途中断不会留下半个文件。
+
+RESULTS_FILE = 'harvest.json'
+MANIFEST = 'displacements.json'
+RESULTS_VERSION = 1
+DIR_PATTERN = re.compile(r'disp_(\d+)_(\d+)$')
+NAMES = ('dipole', 'dipolmoment', 'energy')
+# 原脚本的两种输出: 组合文件表头、组合文件的列、单列文件
+FORMATS = {
+    'v1': ("# Directory Dipole_Sum Energy", ('dipole', 'energy'),
+           {'dipole_c.dat': 'dipole', 'energy.dat': 'energy'}),
+    'v2': ("# Directory Dipole_Sum Dipole_Component Energy", ('dipole', 'dipole_component', 'energy'),
+           {'dipole_sum.dat': 'dipole', 'dipole_component.dat': 'dipole_component', 'energy.dat': 'energy'}),
+}
+
+
+def natural_key(name):
+    # 与 sort -V 相同的自然排序: disp_2_10 排在 disp_10_2 之前
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', name)]
+
+
+def list_dirs(root):
+    with os.scandir(root) as entries:
+        names = [e.name for e in entries if e.name.startswith('disp_') and e.is_dir()]
+    return sorted(names, key=natural_key)
+
+
+def parse_outcar(path):
+    # 在子进程中运行: 一遍向前读取所有量和结束标记
+    outcar = Outcar(path)
+    markers = {name: QUANTITIES[name].marker for name in NAMES}
+    markers['finished'] = FINISHED_MARKER
+    lines = outcar.find_last(markers)
+    texts = {name: None if lines[name] is None else QUANTITIES[name].text(lines[name]) for name in NAMES}
+    if texts['dipolmoment'] is not None:
+        # create_heatmap_data_v2.sh 中的修正: printf "%.6f", $4+1-0.982020
+        texts['dipole_component'] = '%.6f' % (float(texts['dipolmoment']) + 1 - 0.982020)
+    else:
+        texts['dipole_component'] = None
+    return lines['finished'] is not None, texts
+
+
+def point_status(finished, texts, names):
+    if all(texts.get(name) is not None for name in names):
+        return 'done' if finished else 'unfinished'
+    return 'failed' if finished else 'unfinished'
+
+
+def load_results(path):
+    try:
+        with open(path) as f:
+            data = json.load(f)
+        if data.get('version') != RESULTS_VERSION:
+            return {}
+        return {point['dir']: point for point in data['points']}
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def load_equivalent(root):
+    # displacements.json 中 未计算的网格点目录名 -> 与之等价、实际计算的目录名
+    try:
+        with open(os.path.join(root, MANIFEST)) as f:
+            return json.load(f).get('equivalent', {})
+    except (OSError, ValueError):
+        return {}
+
+
+def unfold(points, equivalent):
+    # 为每个未计算的等价网格点补上代表点的结果，按自然顺序返回完整网格
+    by_dir = {point['dir']: point for point in points}
+    for name, source in equivalent.items():
+        if name in by_dir:
+            continue
+        match = DIR_PATTERN.match(name)
+        point = {'dir': name, 'i': int(match.group(1)) if match else None,
+                 'j': int(match.group(2)) if match else None, 'source': source}
+        origin = by_dir.get(source)
+        if origin is None or 'values' not in origin:
+            point['status'] = 'missing'
+        else:
+            point.update(finished=origin['finished'], values=origin['values'], status=origin['status'])
+        by_dir[name] = point
+    return [by_dir[name] for name in sorted(by_dir, key=natural_key)]
+
+
+def write_atomic(path, text):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def harvest(root='.', jobs=None, results_file=RESULTS_FILE, fmt='v1', force=False):
+    # 返回 (points, 本次解析的 OUTCAR 数)
+    columns = FORMATS[fmt][1]
+    results_path = os.path.join(root, results_file)
+    cached = {} if force else load_results(results_path)
+    points = []
+    todo = []  # (point, OUTCAR 路径)
+    for name in list_dirs(root):
+        match = DIR_PATTERN.match(name)
+        point = {'dir': name, 'i': int(match.group(1)) if match else None,
+                 'j': int(match.group(2)) if match else None}
+        path = resolve(os.path.join(root, name, 'OUTCAR'))  # 也可能是 outcar_archive.py 压缩后的 OUTCAR.gz 等
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            point['status'] = 'missing'
+            points.append(point)
+            continue
+        point['size'] = st.st_size
+        point['mtime_ns'] = st.st_mtime_ns
+        old = cached.get(name)
+        if old and old.get('size') == st.st_size and old.get('mtime_ns') == st.st_mtime_ns and 'values' in old:
+            point['finished'] = old['finished']
+            point['values'] = old['values']
+        else:
+            todo.append((point, path))
+        points.append(point)
+
+    if todo:
+        paths = [path for _, path in todo]
+        if jobs == 1 or len(paths) == 1:
+            parsed = list(map(parse_outcar, paths))
+        else:
+            workers = jobs or os.cpu_count() or 1
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                parsed = list(pool.map(parse_outcar, paths, chunksize=max(1, len(paths) // (4 * workers))))
+        for (point, _), (finished, texts) in zip(todo, parsed):
+            point['finished'] = finished
+            point['values'] = texts
+
+    for point in points:
+        if 'values' in point:
+            point['status'] = point_status(point['finished'], point['values'], columns)
+    points = unfold(points, load_equivalent(root))
+
+    data = {'version': RESULTS_VERSION, 'format': fmt, 'columns': list(columns),
+            'harvested_at': time.strftime('%Y-%m-%d %H:%M:%S'), 'points': points}
+    write_atomic(results_path, json.dumps(data, ensure_ascii=False, indent=1) + '\n')
+    write_combined(root, points, fmt)
+    return points, len(todo)
+
+
+def write_combined(root, points, fmt):
+    # 与原脚本相同: 所有量都提取到的目录按自然顺序写入 (未结束但已有结果的也写入)
+    header, columns, singles = FORMATS[fmt]
+    rows = [p for p in points if 'values' in p and all(p['values'].get(c) is not None for c in columns)]
+    combined = [header + '\n']
+    for point in rows:
+        combined.append(f"{point['dir']:<12s}" + ''.join(f" {float(point['values'][c]):12.6f}" for c in columns) + '\n')
+    write_atomic(os.path.join(root, 'combined_results.dat'), ''.join(combined))
+    for filename, column in singles.items():
+        write_atomic(os.path.join(root, filename), ''.join(p['values'][column] + '\n' for p in rows))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="并行、增量地收集 disp_* 目录中 OUTCAR 的偶极矩与能量 (取代 create_heatmap_data*.sh)。")
+    parser.add_argument('root', nargs='?', default='.', help='包含 disp_* 目录的路径 (默认: 当前目录)')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='并行进程数 (默认: CPU 核数)')
+    parser.add_argument('--format', choices=list(FORMATS), default='v1',
+                        help='combined_results.dat 的格式: v1 = create_heatmap_data.sh, '
+                             'v2 = create_heatmap_data_v2.sh (默认: v1)')
+    parser.add_argument('--results', default=RESULTS_FILE, help=f'结构化结果文件 (默认: {RESULTS_FILE})')
+    parser.add_argument('--force', action='store_true', help='忽略缓存，重新解析所有 OUTCAR')
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    points, parsed = harvest(args.root, args.jobs, args.results, args.format, args.force)
+    counts = {}
+    for point in points:
+        counts[point['status']] = counts.get(point['status'], 0) + 1
+        if point['status'] == 'failed':
+            missing = [c for c in FORMATS[args.format][1] if point['values'].get(c) is None]
+            print(f"错误: {point['dir']} 缺少 {' '.join(missing)} 数据")
+    summary = ', '.join(f"{status} {counts[status]}"
+                        for status in ('done', 'unfinished', 'failed', 'missing') if status in counts)
+    print(f"{len(points)} 个网格点 ({summary})；解析 {parsed} 个 OUTCAR，"
+          f"其余来自缓存；用时 {time.perf_counter() - t0:.2f} s")
+    print(f"结果文件: {args.results} (每个网格点的状态), combined_results.dat, "
+          + ', '.join(FORMATS[args.format][2]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+import numpy as np
+
+# --- 热图数据生成 ---
+# 取代 static.sh / static_v2.sh 中逐格调用 awk、逐行 >> 追加的循环:
+# 读取 harvest.py 的 harvest.json (或 combined_results.dat)，网格大小取自 displacements.json
+# (generate_displacements.py 写出) 或由 disp_i_j 目录名推断，缺失的网格点为 NaN，
+# 一次写出与原脚本格式相同的 heatmap_data.dat、*_matrix.dat，以及 heatmap.npz。
+# generate_displacements.py --reduce 只计算了不等价点时，按 displacements.json 的 equivalent 展开回完整网格。
+
+HARVEST_FILE = 'harvest.json'
+COMBINED_FILE = 'combined_results.dat'
+MANIFEST = 'displacements.json'
+NPZ_FILE = 'heatmap.npz'
+DIR_PATTERN = re.compile(r'disp_(\d+)_(\d+)$')
+# combined_results.dat 表头中的列名 -> 量名
+COLUMN_NAMES = {'Dipole_Sum': 'dipole', 'Dipole_Component': 'dipole_component', 'Energy': 'energy'}
+# 原脚本的两种输出: (heatmap_data.dat 的列标题, 量名)，矩阵文件按同样顺序
+FORMATS = {
+    'v1': [('Energy', 'energy'), ('Dipole', 'dipole')],
+    'v2': [('Dipole_Sum', 'dipole'), ('Dipole_Component', 'dipole_component'), ('Energy', 'energy')],
+}
+
+
+def read_harvest(path):
+    # -> (格式, [(i, j, {量名: float}), ...])
+    with open(path) as f:
+        data = json.load(f)
+    points = []
+    for point in data['points']:
+        if point.get('i') is None:
+            continue
+        values = {name: float(text) for name, text in point.get('values', {}).items() if text is not None}
+        points.append((point['i'], point['j'], values))
+    return data.get('format', 'v1'), points
+
+
+def read_combined(path):
+    # combined_results.dat: 第一行 "# Directory 列名..."，之后每行 目录 数值...
+    with open(path) as f:
+        header = f.readline().split()[2:]
+        names = [COLUMN_NAMES[column] for column in header]
+        points = []
+        for line in f:
+            fields = line.split()
+            match = DIR_PATTERN.match(fields[0]) if fields and not fields[0].startswith('#') else None
+            if match:
+                points.append((int(match.group(1)), int(match.group(2)),
+                               dict(zip(names, map(float, fields[1:])))))
+    return ('v2' if 'dipole_component' in names else 'v1'), points
+
+
+def read_manifest(path):
+    # -> (网格间隔数 或 None, {未计算的目录名: 等价的已计算目录名})
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None, {}
+    grid = tuple(manifest['grid']) if 'grid' in manifest else None
+    return grid, manifest.get('equivalent', {})
+
+
+def unfold(grids, equivalent):
+    # 把代表点的值复制到与之等价、没有结果的网格点
+    pairs = [(DIR_PATTERN.match(name), DIR_PATTERN.match(source)) for name, source in equivalent.items()]
+    pairs = np.array([[int(m.group(1)), int(m.group(2)), int(r.group(1)), int(r.group(2))]
+                      for m, r in pairs if m and r], dtype=np.int64).reshape(-1, 4)
+    for values in grids.values():
+        nx, ny = values.shape
+        keep = (pairs[:, [0, 2]] < nx).all(axis=1) & (pairs[:, [1, 3]] < ny).all(axis=1)
+        i, j, ri, rj = pairs[keep].T
+        missing = np.isnan(values[i, j])
+        values[i[missing], j[missing]] = values[ri[missing], rj[missing]]
+
+
+def build_grids(points, names, grid):
+    # -> {量名: (nx+1, ny+1) 数组}；与 combined_results.dat 相同，缺少任一量的网格点全部为 NaN
+    nx, ny = grid
+    points = [(i, j, v) for i, j, v in points if i <= nx and j <= ny and all(name in v for name in names)]
+    if points:
+        ij = np.array([(i, j) for i, j, _ in points], dtype=np.int64)
+    grids = {}
+    for name in names:
+        grids[name] = np.full((nx + 1, ny + 1), np.nan)
+        if not points:
+            continue
+        grids[name][ij[:, 0], ij[:, 1]] = [v[name] for _, _, v in points]
+    return grids
+
+
+def axis_labels(intervals):
+    # 原脚本的坐标: awk printf "%.2f", i/intervals
+    return np.array([float('%.2f' % (k / intervals)) for k in range(intervals + 1)])
+
+
+def write_heatmap_data(path, x, y, columns):
+    # columns: [(标题, 数组), ...]；每行 x y 值...，与原脚本的 printf 格式相同
+    lines = ["x y " + ' '.join(title for title, _ in columns) + "\n"]
+    row_format = "%-6.2f %-6.2f" + " %-12.6f" * len(columns) + "\n"
+    xx, yy = np.meshgrid(x, y, indexing='ij')
+    stacked = np.column_stack([xx.ravel(), yy.ravel()] + [values.ravel() for _, values in columns])
+    lines += [row_format % tuple(row) for row in stacked.tolist()]
+    with open(path, 'w') as f:
+        f.write(''.join(lines))
+
+
+def write_matrix(path, x, y, values):
+    lines = ["%6s" % "" + ''.join(" %10.6f" % v for v in y) + "\n"]
+    row_format = "%6.2f" + " %10.6f" * len(y) + "\n"
+    lines += [row_format % (xv, *row) for xv, row in zip(x.tolist(), values.tolist())]
+    with open(path, 'w') as f:
+        f.write(''.join(lines))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="由 harvest.json / combined_results.dat 生成热图数据 (取代 static*.sh)。")
+    parser.add_argument('--source', help=f'结果文件 (默认: {HARVEST_FILE}，不存在时用 {COMBINED_FILE})')
+    parser.add_argument('--grid', nargs=2, type=int, metavar=('NX', 'NY'),
+                        help=f'x、y 方向的间隔数 (默认: 取自 {MANIFEST}，没有时由 disp_i_j 目录名推断)')
+    parser.add_argument('--format', choices=list(FORMATS),
+                        help='输出哪些量: v1 = static.sh (Energy Dipole)，v2 = static_v2.sh (默认: 与结果文件一致)')
+    parser.add_argument('--npz', default=NPZ_FILE, help=f'NumPy 输出 (默认: {NPZ_FILE})')
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    source = args.source or (HARVEST_FILE if os.path.exists(HARVEST_FILE) else COMBINED_FILE)
+    try:
+        fmt, points = read_harvest(source) if source.endswith('.json') else read_combined(source)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"错误: 无法读取 {source}: {e}", file=sys.stderr)
+        sys.exit(1)
+    fmt = args.format or fmt
+    manifest_grid, equivalent = read_manifest(MANIFEST)
+    grid = tuple(args.grid) if args.grid else manifest_grid
+    if grid is None:
+        if not points:
+            print(f"错误: {source} 中没有 disp_i_j 结果，无法推断网格，请用 --grid 指定", file=sys.stderr)
+            sys.exit(1)
+        grid = (max(i for i, _, _ in points), max(j for _, j, _ in points))
+    if min(grid) < 1:
+        print(f"错误: 网格间隔数至少为 1: {grid}", file=sys.stderr)
+        sys.exit(1)
+
+    columns = FORMATS[fmt]
+    grids = build_grids(points, [name for _, name in columns], grid)
+    unfold(grids, equivalent)
+    x, y = axis_labels(grid[0]), axis_labels(grid[1])
+    write_heatmap_data('heatmap_data.dat', x, y, [(title, grids[name]) for title, name in columns])
+    for title, name in columns:
+        write_matrix(f'{title}_matrix.dat', x, y, grids[name])
+    np.savez(args.npz, x=x, y=y, grid=np.array(grid), **grids)
+
+    filled = int(np.isfinite(grids[columns[0][1]]).sum())
+    print(f"网格 {grid[0]}x{grid[1]} ({(grid[0] + 1) * (grid[1] + 1)} 个点，{filled} 个有结果)，"
+          f"用时 {time.perf_counter() - t0:.2f} s")
+    print("数据文件已生成：")
+    print("- heatmap_data.dat (三列格式)")
+    for title, _ in columns:
+        print(f"- {title}_matrix.dat")
+    print(f"- {args.npz} (x, y, {', '.join(name for _, name in columns)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+import argparse
+import glob
+import os
+import shlex
+import sqlite3
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from outcar import Outcar, resolve  # noqa: E402
+from strain import place  # noqa: E402
+
+from harvest import natural_key  # noqa: E402
+
+# --- 作业打包提交 ---
+# 取代 work.sh 中每个 disp_* 目录复制 pbs.sh 并单独 qsub 的做法:
+#   - 把目录按 --bundle-size 个一组打包成一个作业 (组内顺序运行)，或 --array 时整批作为一个数组作业，每个元素一组
+#   - pbs.sh 作为模板: #! 与 #PBS 行作为作业头，其余部分在每个目录中运行 (PBS_O_WORKDIR 设为该目录)
+#   - 每个目录运行前后写 .job_start / .job_exit (退出码)，OUTCAR 正常结束为 done，否则为 failed
+#   - 重新提交前把上次的 OUTCAR 改名为 OUTCAR.prev，以免新作业开始前就按旧的 OUTCAR 判为 done
+#   - 状态保存在 jobs.db (SQLite): pending → running → done / failed；retry 只重新提交 failed
+#   - 作业已不在队列 (qstat 查不到) 但目录没有 .job_exit 时记为 failed (超时或被删除)
+# 后端: pbs 调用 qsub (--qsub 可换成 fake_qsub.py 在本机模拟)；local 在本机用进程池直接运行各组并等待结束。
+
+DB_FILE = 'jobs.db'
+JOBS_DIR = '.jobs'
+STATES = ('pending', 'running', 'done', 'failed')
+START_MARKER = '.job_start'
+EXIT_MARKER = '.job_exit'
+# qsub 提交数组作业的参数: PBS Pro 用 -J，Torque 用 -t
+ARRAY_FLAGS = {'pbs': '-J', 'torque': '-t'}
+PREVIOUS_SUFFIX = '.prev'  # 重新提交时上次的 OUTCAR 改名加上此后缀
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    dir TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    job_id TEXT,
+    script TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    submitted_at REAL,
+    updated_at REAL,
+    message TEXT
+)
+"""
+# 每组作业的脚本: 作业头 + 依次进入各目录运行 body.sh
+BUNDLE_TEMPLATE = """{header}
+# jobs.py 生成: {count} 个目录
+cd "{root}"
+{select}
+for dir in "${{dirs[@]}}"; do
+    (
+        cd "$dir" || exit 1
+        rm -f {exit_marker}
+        date +%s > {start_marker}
+        PBS_O_WORKDIR=$PWD bash "{body}"
+        echo $? > {exit_marker}
+    )
+done
+"""
+
+
+class JobDB:
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(SCHEMA)
+
+    def states(self):
+        return dict(self.conn.execute("SELECT dir, state FROM jobs"))
+
+    def rows(self, state=None):
+        query = "SELECT dir, state, job_id, script, attempts, message FROM jobs"
+        rows = self.conn.execute(query + (" WHERE state = ?" if state else ""), (state,) if state else ())
+        return sorted(rows, key=lambda row: natural_key(row[0]))
+
+    def add(self, dirs, state='pending'):
+        now = time.time()
+        with self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO jobs (dir, state, updated_at) VALUES (?, ?, ?)",
+                                  [(d, state, now) for d in dirs])
+
+    def set_state(self, dirs, state, message=None):
+        now = time.time()
+        with self.conn:
+            self.conn.executemany("UPDATE jobs SET state = ?, message = ?, updated_at = ? WHERE dir = ?",
+                                  [(state, message, now, d) for d in dirs])
+
+    def submitted(self, dirs, job_id, script):
+        now = time.time()
+        with self.conn:
+            self.conn.executemany("UPDATE jobs SET state = 'running', job_id = ?, script = ?, attempts = attempts + 1,"
+                                  " submitted_at = ?, updated_at = ?, message = NULL WHERE dir = ?",
+                                  [(job_id, script, now, now, d) for d in dirs])
+
+    def counts(self):
+        return dict(self.conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state"))
+
+
+def find_dirs(root, patterns):
+    dirs = set()
+    for pattern in patterns:
+        dirs.update(os.path.relpath(path, root) for path in glob.glob(os.path.join(root, pattern))
+                    if os.path.isdir(path))
+    return sorted(dirs, key=natural_key)
+
+
+def outcome(root, directory, outcar='OUTCAR'):
+    # -> (状态, 说明)；目录还没有运行完时为 (None, None)
+    path = os.path.join(root, directory)
+    try:
+        with open(os.path.join(path, EXIT_MARKER)) as f:
+            code = f.read().strip()
+    except FileNotFoundError:
+        code = None
+    try:
+        finished = Outcar(os.path.join(path, outcar)).finished()
+    except OSError:
+        finished = False
+    if finished and code in (None, '0'):
+        return 'done', None
+    if code is None:
+        return None, None
+    return 'failed', f"退出码 {code}" if code != '0' else f"{outcar} 未正常结束"
+
+
+def in_queue(qstat, job_id):
+    result = subprocess.run(qstat.split() + [job_id], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return result.returncode == 0
+
+
+def refresh(db, root, outcar='OUTCAR', qstat=None):
+    # 更新 running 目录的状态；qstat 给出时，作业已离开队列且没有结果的目录记为 failed
+    queued = {}
+    for directory, _, job_id, _, _, _ in db.rows('running'):
+        state, message = outcome(root, directory, outcar)
+        if state is None and qstat and job_id and job_id != 'local':
+            if job_id not in queued:
+                queued[job_id] = in_queue(qstat, job_id)
+            if not queued[job_id]:
+                state, message = 'failed', '作业已结束但目录未运行完 (超时或被删除)'
+        if state:
+            db.set_state([directory], state, message)
+
+
+def split_template(path):
+    # pbs.sh -> (作业头, 每个目录运行的部分)
+    header, body = [], []
+    with open(path) as f:
+        for line in f:
+            (header if line.startswith(('#!', '#PBS')) else body).append(line)
+    if not header or not header[0].startswith('#!'):
+        header.insert(0, '#!/bin/bash\n')
+    return ''.join(header).rstrip('\n'), ''.join(body)
+
+
+def prepare(root, dirs, common, outcar='OUTCAR'):
+    # 补上目录中没有的公共文件 (硬链接)，清掉上次运行的标记，上次的 OUTCAR (或压缩的 OUTCAR.gz 等) 改名为 *.prev
+    for directory in dirs:
+        path = os.path.join(root, directory)
+        for name in common:
+            src = os.path.join(root, name)
+            if os.path.exists(src) and not os.path.exists(os.path.join(path, name)):
+                place(src, os.path.join(path, name), 'hardlink')
+        for marker in (START_MARKER, EXIT_MARKER):
+            if os.path.exists(os.path.join(path, marker)):
+                os.remove(os.path.join(path, marker))
+        old = resolve(os.path.join(path, outcar))
+        if os.path.exists(old):
+            os.replace(old, old + PREVIOUS_SUFFIX)
+
+
+def write_scripts(root, bundles, template, array):
+    # 返回 [(脚本路径, 数组元素数 或 None, 该脚本包含的目录), ...]
+    jobs_dir = os.path.abspath(os.path.join(root, JOBS_DIR))
+    os.makedirs(jobs_dir, exist_ok=True)
+    header, body = split_template(template)
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    body_path = os.path.join(jobs_dir, f'{stamp}_body.sh')
+    with open(body_path, 'w') as f:
+        f.write(body)
+
+    def script(name, select, count):
+        path = os.path.join(jobs_dir, name)
+        with open(path, 'w') as f:
+            f.write(BUNDLE_TEMPLATE.format(header=header, count=count, root=os.path.abspath(root), select=select,
+                                           body=body_path, start_marker=START_MARKER, exit_marker=EXIT_MARKER))
+        return path
+
+    if array:
+        lists = os.path.join(jobs_dir, f'{stamp}_array.txt')
+        with open(lists, 'w') as f:
+            f.write(''.join(' '.join(bundle) + '\n' for bundle in bundles))
+        select = (f'index=${{PBS_ARRAY_INDEX:-${{PBS_ARRAYID:-0}}}}\n'
+                  f'read -ra dirs <<< "$(sed -n "$((index + 1))p" "{lists}")"')
+        count = sum(map(len, bundles))
+        # 只有一组时按普通作业提交 (数组下标缺省为 0)
+        elements = len(bundles) if len(bundles) > 1 else None
+        return [(script(f'{stamp}_array.sh', select, count), elements, [d for b in bundles for d in b])]
+    return [(script(f'{stamp}_{k:04d}.sh', f"dirs=({' '.join(map(shlex.quote, bundle))})", len(bundle)), None, bundle)
+            for k, bundle in enumerate(bundles)]
+
+
+def submit_pbs(db, scripts, qsub, scheduler='pbs'):
+    for path, elements, dirs in scripts:
+        command = qsub.split() + ([ARRAY_FLAGS[scheduler], f'0-{elements - 1}'] if elements else []) + [path]
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                                cwd=os.path.dirname(path))
+        if result.returncode != 0:
+            db.set_state(dirs, 'failed', f"qsub 失败: {result.stderr.strip()}")
+            print(f"错误: {' '.join(command)}: {result.stderr.strip()}", file=sys.stderr)
+            continue
+        db.submitted(dirs, result.stdout.strip(), path)
+
+
+def run_local(path, index, root):
+    env = dict(os.environ, PBS_O_WORKDIR=os.path.abspath(root), PBS_JOBID=f'local.{os.getpid()}')
+    if index is not None:
+        env['PBS_ARRAY_INDEX'] = str(index)
+    with open(f"{path}.{index or 0}.log", 'w') as log:
+        return subprocess.run(['bash', path], env=env, stdout=log, stderr=subprocess.STDOUT).returncode
+
+
+def submit_local(db, scripts, root, workers, outcar):
+    tasks = []
+    for path, elements, dirs in scripts:
+        db.submitted(dirs, 'local', path)
+        if elements:
+            tasks += [(path, k) for k in range(elements)]
+        else:
+            tasks.append((path, None))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_local, path, index, root) for path, index in tasks]
+        for _ in as_completed(futures):
+            refresh(db, root, outcar)
+    # 运行结束仍没有结果的目录 (例如脚本中途退出)
+    for directory, *_ in db.rows('running'):
+        db.set_state([directory], 'failed', '作业已结束但目录未运行完')
+
+
+def submit(args, retry=False):
+    db = JobDB(os.path.join(args.root, args.db))
+    dirs = find_dirs(args.root, args.pattern)
+    known = db.states()
+    new = [d for d in dirs if d not in known]
+    # 已经算完的目录不再提交
+    finished = [d for d in new if outcome(args.root, d, args.outcar)[0] == 'done']
+    db.add(finished, 'done')
+    db.add([d for d in new if d not in finished])
+    refresh(db, args.root, args.outcar, args.qstat if args.backend == 'pbs' else None)
+    todo = [row[0] for row in db.rows() if row[1] == 'pending' or retry and row[1] == 'failed']
+    if not todo:
+        print("没有需要提交的目录")
+        report(db)
+        return
+    bundles = [todo[k:k + args.bundle_size] for k in range(0, len(todo), args.bundle_size)]
+    if args.dry_run:
+        print(f"将提交 {len(todo)} 个目录，{len(bundles)} 组" + (" (一个数组作业)" if args.array else ""))
+        return
+    db.set_state(todo, 'pending')
+    prepare(args.root, todo, args.common, args.outcar)
+    scripts = write_scripts(args.root, bundles, os.path.join(args.root, args.script), args.array)
+    t0 = time.perf_counter()
+    if args.backend == 'local':
+        submit_local(db, scripts, args.root, args.workers, args.outcar)
+    else:
+        submit_pbs(db, scripts, args.qsub, args.scheduler)
+    print(f"提交 {len(todo)} 个目录: {len(scripts)} 个作业" + (f" ({len(bundles)} 个数组元素)" if args.array else "")
+          + f"，每组至多 {args.bundle_size} 个；用时 {time.perf_counter() - t0:.2f} s")
+    report(db)
+
+
+def report(db, verbose=False):
+    counts = db.counts()
+    print(', '.join(f"{state} {counts.get(state, 0)}" for state in STATES))
+    if verbose:
+        for directory, state, job_id, _, attempts, message in db.rows():
+            if state != 'done':
+                print(f"{directory:<20s} {state:<8s} {job_id or '-':<16s} 第 {attempts} 次 {message or ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="把 disp_* / 应变目录打包成作业提交，并在 jobs.db 中跟踪状态。")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--root', default='.', help='计算目录所在路径 (默认: 当前目录)')
+    common.add_argument('--db', default=DB_FILE, help=f'状态数据库 (默认: {DB_FILE})')
+    common.add_argument('--outcar', default='OUTCAR', help='判断完成的 OUTCAR (相对各目录，默认: OUTCAR)')
+    common.add_argument('--qstat', default='qstat',
+                        help='检查作业是否仍在队列的命令 (默认: qstat；本机测试可用 "python fake_qsub.py --stat")')
+
+    options = argparse.ArgumentParser(add_help=False, parents=[common])
+    options.add_argument('--pattern', nargs='+', default=['disp_*'],
+                         help='要提交的目录 (glob，默认: disp_*；应变目录如 "mobility-*/*")')
+    options.add_argument('--bundle-size', type=int, default=20, help='每个作业 (或数组元素) 运行的目录数 (默认: 20)')
+    options.add_argument('--array', action='store_true', help='所有组作为一个数组作业提交')
+    options.add_argument('--scheduler', choices=list(ARRAY_FLAGS), default='pbs',
+                         help='数组作业的 qsub 参数: pbs 用 -J (PBS Pro)，torque 用 -t (默认: pbs)')
+    options.add_argument('--script', default='pbs.sh', help='作业模板 (默认: pbs.sh)')
+    options.add_argument('--common', nargs='*', default=['POTCAR', 'INCAR', 'KPOINTS'],
+                         help='目录中没有时硬链接进去的公共文件 (默认: POTCAR INCAR KPOINTS)')
+    options.add_argument('--backend', choices=['pbs', 'local'], default='pbs',
+                         help='pbs: 用 --qsub 提交；local: 本机进程池直接运行并等待结束 (默认: pbs)')
+    options.add_argument('--qsub', default='qsub', help='提交命令 (默认: qsub；本机测试可用 "python fake_qsub.py")')
+    options.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='local 后端的并行数 (默认: CPU 核数)')
+    options.add_argument('--dry-run', action='store_true', help='只显示将要提交的目录数和组数')
+    sub.add_parser('submit', parents=[options], help='提交新的 (pending) 目录')
+    sub.add_parser('retry', parents=[options], help='把 failed 的目录重新提交')
+    status = sub.add_parser('status', parents=[common], help='更新并显示各目录状态')
+    status.add_argument('-v', '--verbose', action='store_true', help='列出未完成的目录')
+    args = parser.parse_args()
+    if getattr(args, 'bundle_size', 1) < 1:
+        parser.error("--bundle-size 至少为 1")
+
+    if args.command == 'status':
+        db = JobDB(os.path.join(args.root, args.db))
+        refresh(db, args.root, args.outcar, args.qstat)
+        report(db, args.verbose)
+        return
+    submit(args, retry=args.command == 'retry')
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,13 @@
 intervals_x=12
 intervals_y=12
 
+# 有 python3 + numpy 时交给 heatmap.py (一次写出全部文件，另外写出 heatmap.npz)；
+# 否则或设置了 HEATMAP_SH=1 时使用下面原来的实现
+HEATMAP_PY=${HEATMAP_PY:-$(cd "$(dirname "$0")" && pwd)/heatmap.py}
+if [ -z "$HEATMAP_SH" ] && [ -f "$HEATMAP_PY" ] && python3 -c "import numpy" 2>/dev/null; then
+    exec python3 "$HEATMAP_PY" --source combined_results.dat --grid "$intervals_x" "$intervals_y" --format v2
+fi
+
 # 初始化所有数据矩阵
 declare -A sum_matrix comp_matrix energy_matrix
 
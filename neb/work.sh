@@ -1,15 +1,29 @@
 #!/bin/bash
+# 网格点很多时建议用 jobs.py 打包成少量作业提交，并跟踪各目录的状态
 
 # 预复制公共文件（仅需执行一次）
 common_files=(pbs.sh POTCAR INCAR KPOINTS)
 
+# generate_displacements.py --archive 写出的归档: ARCHIVE=displacements.npz ./work.sh
+# 提交前才展开对应的 disp_*/POSCAR，不预先建立所有目录
+archive=${ARCHIVE:-}
+expand="$(dirname "$0")/expand.py"
+
 # 找到所有目标目录
-dirs=($(find . -maxdepth 1 -type d -name "disp_*" | sort -V))
+if [ -n "$archive" ]; then
+    dirs=($(python "$expand" --list "$archive"))
+else
+    dirs=($(find . -maxdepth 1 -type d -name "disp_*" | sort -V))
 
-# 并行复制文件
-printf "%s\0" "${dirs[@]}" | xargs -0 -P 8 -I {} cp "${common_files[@]}" {}
+    # 并行复制文件
+    printf "%s\0" "${dirs[@]}" | xargs -0 -P 8 -I {} cp "${common_files[@]}" {}
+fi
 
 # 顺序提交作业
 for dir in "${dirs[@]}"; do
+    if [ -n "$archive" ]; then
+        [ -f "$dir/POSCAR" ] || python "$expand" "$archive" "$dir" || continue
+        cp "${common_files[@]}" "$dir"
+    fi
     (cd "$dir" && qsub pbs.sh)
 done
@@ -0,0 +1,473 @@
+import argparse
+import gzip
+import lzma
+import os
+import re
+import shutil
+import subprocess
+import sys
+
+import numpy as np
+
+# --- OUTCAR 读取 ---
+# 取最终值时从文件末尾按块向前读，一遍找齐所有需要的量 (相当于 tac OUTCAR | awk '/.../{...; exit}'，
+# 但多个量只读一次)，通常只需读最后几个块。
+# 可选的索引 (OUTCAR.outidx.npz) 记录每个离子步的起始偏移和各个量所有出现位置，
+# 之后取最终值、某个量不存在、或按离子步取历史值都只需读几行。文件大小或修改时间变化后自动重建。
+# 压缩的 OUTCAR (.gz/.xz/.zst) 透明支持: 给出的路径不存在时依次尝试这些后缀；压缩文件不能向后定位，
+# 改为向前流式解压扫描一遍 (每个量保留最后一次出现的行)。.zst 有 zstandard 模块时用它，否则调用 zstd 命令。
+# ionic_steps 向前扫描一遍取出每个离子步的能量、偶极矩、费米能级和原子受力 (供 outcar_archive.py 归档)。
+
+INDEX_SUFFIX = '.outidx.npz'
+INDEX_VERSION = 1
+BLOCK_SIZE = 1 << 20
+# 每个离子步的第一个电子步: "----- Iteration    12(   1)  -----"
+STEP_PATTERN = re.compile(rb'Iteration\s*\d+\(\s*1\)')
+_NUMBER = re.compile(rb'\s*[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+COMPRESSED_SUFFIXES = ('.gz', '.xz', '.zst')
+FORCE_MARKER = b'TOTAL-FORCE (eV/Angst)'
+NIONS_PATTERN = re.compile(rb'NIONS\s*=\s*(\d+)')
+
+
+def awk_number(token):
+    # 与 awk 把字段当数字用时相同: 取开头的数字部分，没有则为 0
+    match = _NUMBER.match(token)
+    return float(match.group()) if match else 0.0
+
+
+def awk_format(value):
+    # 与 awk print 数字时相同: 整数原样输出，否则按 OFMT (%.6g)
+    if value == int(value) and abs(value) < 1e16:
+        return str(int(value))
+    return '%.6g' % value
+
+
+class Quantity:
+    # 含 marker 的最后一行中取 columns 列 (Python 下标，负数从行尾数) 之和
+    def __init__(self, marker, columns, help_text):
+        self.marker = marker
+        self.columns = columns
+        self.help = help_text
+
+    def fields(self, line):
+        fields = line.split()
+        try:
+            return [fields[c] for c in self.columns]
+        except IndexError:
+            return None
+
+    def value(self, line):
+        fields = self.fields(line)
+        return None if fields is None else sum(awk_number(f) for f in fields)
+
+    def text(self, line):
+        # 与原 awk 脚本输出的文本相同: 单列原样输出，多列求和后按 awk 的格式输出
+        fields = self.fields(line)
+        if fields is None:
+            return None
+        if len(fields) == 1:
+            return fields[0].decode('ascii', 'replace')
+        return awk_format(sum(awk_number(f) for f in fields))
+
+
+QUANTITIES = {
+    # /dipole moment/{print $(NF-3)+$(NF-2)}
+    'dipole': Quantity(b'dipole moment', (-4, -3), '偶极矩两分量之和'),
+    # /dipolmoment/{print $4}
+    'dipolmoment': Quantity(b'dipolmoment', (3,), 'dipolmoment 第 3 分量'),
+    # /free  energy   TOTEN/{print $5}
+    'energy': Quantity(b'free  energy   TOTEN', (4,), '离子步结束时的自由能 TOTEN (eV)'),
+    # /E-fermi/{print $3}
+    'efermi': Quantity(b'E-fermi', (2,), '费米能级 (eV)'),
+}
+DEFAULT_QUANTITIES = ('dipole', 'energy')
+# VASP 正常结束时在 OUTCAR 末尾写出计时信息
+FINISHED_MARKER = b'General timing and accounting'
+
+
+def resolve(path):
+    # path 不存在时返回同名的压缩文件 (OUTCAR -> OUTCAR.gz/.xz/.zst)；都不存在时原样返回
+    if os.path.exists(path):
+        return path
+    for suffix in COMPRESSED_SUFFIXES:
+        if os.path.exists(path + suffix):
+            return path + suffix
+    return path
+
+
+def compression(path):
+    return next((suffix for suffix in COMPRESSED_SUFFIXES if path.endswith(suffix)), None)
+
+
+class _Pipe:
+    # 外部解压命令的标准输出，当作只读文件使用
+    def __init__(self, args):
+        self.process = subprocess.Popen(args, stdout=subprocess.PIPE)
+
+    def read(self, size=-1):
+        return self.process.stdout.read(size)
+
+    def close(self):
+        self.process.stdout.close()
+        if self.process.poll() is None:
+            self.process.terminate()  # 没有读完就关闭
+        self.process.wait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_stream(path):
+    # 以二进制只读方式打开，压缩文件流式解压
+    kind = compression(path)
+    if kind == '.gz':
+        return gzip.open(path, 'rb')
+    if kind == '.xz':
+        return lzma.open(path, 'rb')
+    if kind == '.zst':
+        try:
+            import zstandard
+        except ImportError:
+            if shutil.which('zstd') is None:
+                raise OSError(f"{path}: 读取 .zst 需要 zstandard 模块或 zstd 命令") from None
+            open(path, 'rb').close()  # 文件不存在时与其他格式一样抛出 FileNotFoundError
+            return _Pipe(['zstd', '-dcq', path])
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    return open(path, 'rb')
+
+
+def _skip_lines(data, pos, count, end):
+    # 从 pos 起跳过 count 行，返回之后的位置；end 之前不够时返回 -1
+    for _ in range(count):
+        pos = data.find(b'\n', pos, end)
+        if pos == -1:
+            return -1
+        pos += 1
+    return pos
+
+
+def _last_per_step(steps, offsets):
+    # 每个离子步中最后一次出现的序号 -> (有值的步, 对应 offsets 的序号)
+    valid = np.zeros(len(steps), dtype=bool)
+    if not len(offsets) or not len(steps):
+        return valid, np.zeros(0, dtype=np.int64)
+    # 每步最后一次出现: 下一步起点之前的最后一个偏移
+    bounds = np.append(steps[1:], np.iinfo(np.int64).max)
+    last = np.searchsorted(offsets, bounds) - 1
+    valid = (last >= 0) & (offsets[np.maximum(last, 0)] >= steps)
+    return valid, last[valid]
+
+
+class Outcar:
+    def __init__(self, path, index=False, cache_index=True):
+        # index=True 时加载或建立索引 (cache_index 控制是否读写 OUTCAR.outidx.npz)
+        self.path = resolve(path)
+        self.compressed = compression(self.path) is not None
+        self.size = os.path.getsize(self.path)  # 压缩文件为压缩后的大小，只用于判断索引是否过期
+        self.steps = None
+        self.offsets = None  # 量名 -> 所有出现行的起始偏移
+        if index:
+            if not (cache_index and self._load_index()):
+                self._build_index()
+                if cache_index:
+                    self._save_index()
+
+    @property
+    def indexed(self):
+        return self.offsets is not None
+
+    # --- 索引 ---
+    def _index_path(self):
+        return self.path + INDEX_SUFFIX
+
+    def _build_index(self):
+        # 向前扫描一遍: 每个量用 bytes.find 逐个查找 (比一个多选正则快得多)，离子步用正则
+        positions = {name: [] for name in QUANTITIES}
+        steps = []
+        with open_stream(self.path) as f:
+            offset = 0
+            carry = b''
+            while True:
+                chunk = f.read(BLOCK_SIZE * 16)
+                block = carry + chunk
+                # 只处理完整的行，最后一行不完整时留到下一块
+                cut = len(block) if not chunk else block.rfind(b'\n') + 1
+                base = offset - len(carry)
+                region = block[:cut]
+                for name, quantity in QUANTITIES.items():
+                    found = positions[name]
+                    pos = region.find(quantity.marker)
+                    while pos != -1:
+                        line_start = region.rfind(b'\n', 0, pos) + 1
+                        found.append(base + line_start)
+                        pos = region.find(b'\n', pos)
+                        if pos == -1:
+                            break
+                        pos = region.find(quantity.marker, pos)
+                for match in STEP_PATTERN.finditer(region):
+                    steps.append(base + region.rfind(b'\n', 0, match.start()) + 1)
+                if not chunk:
+                    break
+                carry = block[cut:]
+                offset += len(chunk)
+        self.steps = np.array(steps, dtype=np.int64)
+        self.offsets = {name: np.array(found, dtype=np.int64) for name, found in positions.items()}
+
+    def _load_index(self):
+        try:
+            with np.load(self._index_path()) as data:
+                if (int(data['version']) != INDEX_VERSION or int(data['size']) != self.size
+                        or int(data['mtime_ns']) != os.stat(self.path).st_mtime_ns):
+                    return False
+                self.steps = data['steps']
+                self.offsets = {name: data['q_' + name] for name in QUANTITIES}
+        except (OSError, KeyError, ValueError):
+            return False
+        return True
+
+    def _save_index(self):
+        path = self._index_path()
+        tmp = f"{path}.{os.getpid()}.tmp.npz"
+        try:
+            np.savez(tmp, version=INDEX_VERSION, size=self.size, mtime_ns=os.stat(self.path).st_mtime_ns,
+                     steps=self.steps, **{'q_' + name: found for name, found in self.offsets.items()})
+            os.replace(tmp, path)
+        except OSError:
+            pass  # 目录不可写时不缓存
+
+    # --- 读取 ---
+    def _lines_at(self, offsets):
+        # 偏移 -> 该行内容 (不含换行)
+        if self.compressed:
+            return self._stream_lines_at(offsets)
+        lines = []
+        with open(self.path, 'rb') as f:
+            for offset in offsets:
+                f.seek(int(offset))
+                lines.append(f.readline().rstrip(b'\r\n'))
+        return lines
+
+    def _stream_lines_at(self, offsets):
+        # 压缩文件: 向前解压一遍，依次取出各偏移处的行
+        found = {}
+        with open_stream(self.path) as f:
+            block, block_start = b'', 0
+            for offset in sorted(set(int(o) for o in offsets)):
+                while True:
+                    rel = offset - block_start
+                    end = block.find(b'\n', rel) if rel < len(block) else -1
+                    if end != -1:
+                        break
+                    chunk = f.read(BLOCK_SIZE * 16)
+                    if not chunk:
+                        end = len(block)
+                        break
+                    keep = min(rel, len(block))  # 丢掉目标行之前的部分
+                    block, block_start = block[keep:] + chunk, block_start + keep
+                found[offset] = block[rel:end].rstrip(b'\r')
+        return [found[int(o)] for o in offsets]
+
+    def _scan_last(self, markers):
+        # 向前扫描一遍，每个 marker 保留最后一次出现的行 (压缩文件只能这样读)
+        found = dict.fromkeys(markers)
+        with open_stream(self.path) as f:
+            carry = b''
+            while True:
+                chunk = f.read(BLOCK_SIZE * 16)
+                block = carry + chunk
+                cut = len(block) if not chunk else block.rfind(b'\n') + 1
+                for name, marker in markers.items():
+                    pos = block.rfind(marker, 0, cut)
+                    if pos == -1:
+                        continue
+                    line_start = block.rfind(b'\n', 0, pos) + 1
+                    line_end = block.find(b'\n', pos, cut)
+                    found[name] = block[line_start:line_end if line_end != -1 else cut].rstrip(b'\r')
+                if not chunk:
+                    break
+                carry = block[cut:]
+        return found
+
+    def find_last(self, markers):
+        # markers: 名字 -> bytes；从文件末尾按块向前读，返回 名字 -> 含 marker 的最后一行 (找不到为 None)
+        if self.compressed:
+            return self._scan_last(markers)
+        remaining = dict(markers)
+        found = dict.fromkeys(markers)
+        with open(self.path, 'rb') as f:
+            end = self.size
+            carry = b''  # 上一块开头不完整的那一行
+            while remaining and end > 0:
+                start = max(0, end - BLOCK_SIZE)
+                f.seek(start)
+                block = f.read(end - start) + carry
+                # 块的第一行可能被截断，只在其后的完整行中查找，截断部分并入下一块
+                cut = block.find(b'\n') + 1 if start else 0
+                if start and not cut:
+                    carry = block
+                    end = start
+                    continue
+                for name, marker in list(remaining.items()):
+                    pos = block.rfind(marker, cut)
+                    if pos == -1:
+                        continue
+                    line_start = block.rfind(b'\n', 0, pos) + 1
+                    line_end = block.find(b'\n', pos)
+                    found[name] = block[line_start:line_end if line_end != -1 else len(block)].rstrip(b'\r')
+                    del remaining[name]
+                carry = block[:cut]
+                end = start
+        return found
+
+    def last_lines(self, names=DEFAULT_QUANTITIES):
+        # 量名 -> 最后一次出现的那一行 (bytes)，没有则为 None
+        names = list(names)
+        if self.indexed:
+            lines = dict.fromkeys(names)
+            present = [name for name in names if len(self.offsets[name])]
+            for name, line in zip(present, self._lines_at([self.offsets[name][-1] for name in present])):
+                lines[name] = line
+            return lines
+        return self.find_last({name: QUANTITIES[name].marker for name in names})
+
+    def finished(self):
+        return self.find_last({'finished': FINISHED_MARKER})['finished'] is not None
+
+    def last(self, names=DEFAULT_QUANTITIES):
+        # 量名 -> 最终值 (float)，没有则为 None
+        return {name: None if line is None else QUANTITIES[name].value(line)
+                for name, line in self.last_lines(names).items()}
+
+    def last_text(self, names=DEFAULT_QUANTITIES):
+        # 量名 -> 与原 tac | awk 脚本相同的输出文本，没有则为 None
+        return {name: None if line is None else QUANTITIES[name].text(line)
+                for name, line in self.last_lines(names).items()}
+
+    def per_step(self, name):
+        # 每个离子步中该量最后一次出现的值 (需要索引)；该步中没有出现时为 NaN
+        if not self.indexed:
+            raise ValueError("per_step 需要索引: Outcar(path, index=True)")
+        offsets = self.offsets[name]
+        values = np.full(len(self.steps), np.nan)
+        valid, last = _last_per_step(self.steps, offsets)
+        lines = self._lines_at(offsets[last])
+        values[valid] = [QUANTITIES[name].value(line) for line in lines]
+        return values
+
+    def ionic_steps(self, names=tuple(QUANTITIES)):
+        # 向前扫描一遍 (压缩文件同样适用)，返回
+        #   量名 -> (离子步数,) 每步最后一次出现的值，没有为 NaN
+        #   'positions', 'forces' -> (离子步数, 原子数, 3)，该步没有力时为 NaN
+        #   'natoms', 'finished'
+        seen = {name: ([], []) for name in names}  # 量名 -> (偏移, 值)
+        force_offsets, force_blocks = [], []
+        steps = []
+        natoms = None
+        finished = False
+        with open_stream(self.path) as f:
+            offset = 0
+            carry = b''
+            while True:
+                chunk = f.read(BLOCK_SIZE * 16)
+                block = carry + chunk
+                base = offset - len(carry)
+                cut = len(block) if not chunk else block.rfind(b'\n') + 1
+                if natoms is None:
+                    match = NIONS_PATTERN.search(block, 0, cut)
+                    natoms = int(match.group(1)) if match else None
+                if natoms is not None:
+                    pos = block.find(FORCE_MARKER, 0, cut)
+                    while pos != -1:
+                        line_start = block.rfind(b'\n', 0, pos) + 1
+                        data_start = _skip_lines(block, pos, 2, cut)  # 标题行和虚线
+                        data_end = -1 if data_start == -1 else _skip_lines(block, data_start, natoms, cut)
+                        if data_end == -1:
+                            if chunk:
+                                cut = line_start  # 数据块跨越块尾: 从标题行起留到下一块
+                            break
+                        try:
+                            values = np.array(block[data_start:data_end].split(), dtype=float)
+                        except ValueError:  # 块中有非数字 (例如 VASP 把过大的数写成 ****)
+                            values = np.empty(0)
+                        if values.size == natoms * 6:
+                            force_offsets.append(base + line_start)
+                            force_blocks.append(values.reshape(natoms, 6))
+                        pos = block.find(FORCE_MARKER, data_end, cut)
+                for name in names:
+                    found_offsets, found_values = seen[name]
+                    marker = QUANTITIES[name].marker
+                    pos = block.find(marker, 0, cut)
+                    while pos != -1:
+                        line_start = block.rfind(b'\n', 0, pos) + 1
+                        line_end = block.find(b'\n', pos, cut)
+                        line_end = cut if line_end == -1 else line_end
+                        found_offsets.append(base + line_start)
+                        found_values.append(QUANTITIES[name].value(block[line_start:line_end]))
+                        pos = block.find(marker, line_end, cut)
+                for match in STEP_PATTERN.finditer(block, 0, cut):
+                    steps.append(base + block.rfind(b'\n', 0, match.start()) + 1)
+                finished = finished or block.find(FINISHED_MARKER, 0, cut) != -1
+                if not chunk:
+                    break
+                carry = block[cut:]
+                offset += len(chunk)
+        steps = np.array(steps, dtype=np.int64)
+        result = {'natoms': natoms or 0, 'finished': finished}
+        for name, (found_offsets, found_values) in seen.items():
+            values = np.full(len(steps), np.nan)
+            valid, last = _last_per_step(steps, np.array(found_offsets, dtype=np.int64))
+            values[valid] = np.array(found_values)[last]
+            result[name] = values
+        table = np.full((len(steps), natoms or 0, 6), np.nan)
+        valid, last = _last_per_step(steps, np.array(force_offsets, dtype=np.int64))
+        if valid.any():
+            table[valid] = np.array(force_blocks)[last]
+        result['positions'], result['forces'] = table[:, :, :3], table[:, :, 3:]
+        return result
+
+
+def read_final(path, names=DEFAULT_QUANTITIES, index=False):
+    return Outcar(path, index=index).last(names)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="从 OUTCAR 末尾提取最终的偶极矩、能量、费米能级等 (与 tac OUTCAR | awk 结果相同)；"
+                    "也可读取 OUTCAR.gz/.xz/.zst。")
+    parser.add_argument('files', nargs='*', default=['OUTCAR'], help='OUTCAR 文件 (默认: OUTCAR，不存在时依次尝试 .gz/.xz/.zst)')
+    parser.add_argument('-q', '--quantities', default=','.join(DEFAULT_QUANTITIES),
+                        help=f"逗号分隔的要提取的量，按此顺序输出 (默认: {','.join(DEFAULT_QUANTITIES)})；可选: "
+                             + ', '.join(f"{k} ({q.help})" for k, q in QUANTITIES.items()))
+    parser.add_argument('--index', action='store_true', help=f'建立/使用 {INDEX_SUFFIX} 离子步索引')
+    parser.add_argument('--steps', action='store_true', help='按离子步输出每步的值 (隐含 --index)')
+    parser.add_argument('-H', '--with-filename', action='store_true', help='每行前输出文件名 (多个文件时默认)')
+    args = parser.parse_args()
+    names = [name for name in args.quantities.split(',') if name]
+    unknown = [name for name in names if name not in QUANTITIES]
+    if unknown or not names:
+        parser.error(f"未知的量: {','.join(unknown)} (可选: {','.join(QUANTITIES)})")
+
+    out = sys.stdout
+    for path in args.files:
+        prefix = f"{path} " if args.with_filename or len(args.files) > 1 else ''
+        try:
+            outcar = Outcar(path, index=args.index or args.steps)
+        except OSError as e:
+            print(f"错误: {e}", file=sys.stderr)
+            continue
+        if args.steps:
+            columns = [outcar.per_step(name) for name in names]
+            out.write(f"# {prefix}step {' '.join(names)}\n")
+            for step, row in enumerate(zip(*columns), 1):
+                out.write(f"{step} " + ' '.join(f"{v:.8f}" for v in row) + '\n')
+            continue
+        # 找不到的量输出 "-"，便于 shell 用 read 按位置读取
+        texts = outcar.last_text(names)
+        out.write(prefix + ' '.join(texts[name] or '-' for name in names) + '\n')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+import argparse
+import gzip
+import lzma
+import os
+import re
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from outcar import COMPRESSED_SUFFIXES, INDEX_SUFFIX, Outcar, compression
+
+# --- 扫描结果归档与 OUTCAR 压缩 ---
+# 对算完的扫描 (neb 的 disp_*、strain 的应变目录等)，把其下所有 OUTCAR 中实际用到的量
+# (每个离子步的 TOTEN、偶极矩、dipolmoment、E-fermi、原子坐标与受力) 收集到一个 npz (默认 outcars.npz)，
+# 各目录的数据首尾相接存放，用 step_start / atom_start 偏移取出。
+# --compress gz|xz|zst 另外把已正常结束的 OUTCAR 就地压缩 (先写临时文件，再替换并删除原文件)；
+# outcar.py 及用到它的脚本会自动找到 OUTCAR.gz 等，create_heatmap_data*.sh 的 tac | awk 也支持压缩文件。
+# 归档记录每个 OUTCAR 的大小和修改时间，重新运行时只解析新增或变化的。
+
+ARCHIVE_FILE = 'outcars.npz'
+ARCHIVE_VERSION = 1
+NAMES = ('energy', 'dipole', 'dipolmoment', 'efermi')
+COMPRESSORS = {'gz': gzip.open, 'xz': lzma.open}
+
+
+def natural_key(name):
+    # 与 sort -V 相同的自然排序 (同 neb/harvest.py)
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', name)]
+
+
+def find_outcars(root):
+    # root 下 (含子目录) 所有 OUTCAR 或其压缩文件 -> {相对目录: 文件名}
+    found = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        names = set(filenames)
+        for name in ('OUTCAR',) + tuple('OUTCAR' + suffix for suffix in COMPRESSED_SUFFIXES):
+            if name in names:
+                found[os.path.relpath(dirpath, root)] = name
+                break
+    return {d: found[d] for d in sorted(found, key=natural_key)}
+
+
+def stamp(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def compress(path, kind):
+    # OUTCAR -> OUTCAR.<kind>，保留修改时间，返回新路径
+    target = f"{path}.{kind}"
+    tmp = f"{target}.{os.getpid()}.tmp"
+    if kind == 'zst':
+        try:
+            import zstandard
+            with open(path, 'rb') as src, open(tmp, 'wb') as dst:
+                zstandard.ZstdCompressor(level=10).copy_stream(src, dst)
+        except ImportError:
+            if shutil.which('zstd') is None:
+                raise OSError("压缩为 .zst 需要 zstandard 模块或 zstd 命令") from None
+            subprocess.run(['zstd', '-q', '-10', '-f', path, '-o', tmp], check=True)
+    else:
+        with open(path, 'rb') as src, COMPRESSORS[kind](tmp, 'wb') as dst:
+            shutil.copyfileobj(src, dst, 1 << 20)
+    shutil.copystat(path, tmp)
+    os.replace(tmp, target)
+    os.remove(path)
+    if os.path.exists(path + INDEX_SUFFIX):
+        os.remove(path + INDEX_SUFFIX)  # 索引的偏移对压缩文件仍然有效，但按文件名对应不上
+    return target
+
+
+def process(root, directory, name, kind=None, parse=True):
+    # 在子进程中运行: 解析一个 OUTCAR (parse=False 时已有归档数据，只压缩)，需要时压缩
+    # -> (文件名, 大小与修改时间, 各离子步数据或 None)
+    path = os.path.join(root, directory, name)
+    try:
+        data = Outcar(path).ionic_steps(NAMES) if parse else None
+        if kind and (data is None or data['finished']) and compression(path) is None:
+            path = compress(path, kind)
+        return os.path.basename(path), stamp(path), data
+    except (OSError, ValueError, subprocess.CalledProcessError) as e:
+        return name, None, {'error': str(e)}
+
+
+class ScanArchive:
+    def __init__(self, path=ARCHIVE_FILE):
+        with np.load(path) as data:
+            if int(data['version']) != ARCHIVE_VERSION:
+                raise ValueError(f"{path}: 不支持的归档版本 {int(data['version'])}")
+            self.arrays = {key: data[key] for key in data.files}
+        self.dirs = [str(d) for d in self.arrays['dirs']]
+        self.rows = {d: k for k, d in enumerate(self.dirs)}
+
+    def stamp(self, directory):
+        k = self.rows[directory]
+        return str(self.arrays['files'][k]), self.arrays['stamps'][k].tolist()
+
+    def steps(self, directory):
+        # 一个目录的数据: 量名 -> (离子步数,)，positions/forces -> (离子步数, 原子数, 3)
+        a = self.arrays
+        k = self.rows[directory]
+        s0, s1 = a['step_start'][k], a['step_start'][k + 1]
+        r0, r1 = a['atom_start'][k], a['atom_start'][k + 1]
+        natoms = int(a['natoms'][k])
+        result = {name: a[name][s0:s1] for name in NAMES}
+        result['positions'] = a['positions'][r0:r1].reshape(s1 - s0, natoms, 3)
+        result['forces'] = a['forces'][r0:r1].reshape(s1 - s0, natoms, 3)
+        result['natoms'] = natoms
+        result['finished'] = bool(a['finished'][k])
+        return result
+
+
+def write_archive(path, dirs, files, stamps, records):
+    step_start, atom_start = [0], [0]
+    for data in records:
+        steps = len(data['energy'])
+        step_start.append(step_start[-1] + steps)
+        atom_start.append(atom_start[-1] + steps * data['natoms'])
+
+    def joined(key, shape):
+        parts = [np.asarray(data[key], dtype=float).reshape(shape) for data in records]
+        return np.concatenate(parts) if parts else np.zeros((0,) + shape[1:])
+
+    tmp = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez_compressed(tmp, version=ARCHIVE_VERSION, dirs=np.array(dirs, dtype=str),
+                        files=np.array(files, dtype=str), stamps=np.array(stamps, dtype=np.int64).reshape(-1, 2),
+                        finished=np.array([data['finished'] for data in records], dtype=bool),
+                        natoms=np.array([data['natoms'] for data in records], dtype=np.int64),
+                        step_start=np.array(step_start, dtype=np.int64), atom_start=np.array(atom_start, dtype=np.int64),
+                        positions=joined('positions', (-1, 3)), forces=joined('forces', (-1, 3)),
+                        **{name: joined(name, (-1,)) for name in NAMES})
+    os.replace(tmp, path)
+
+
+def fmt(value, spec):
+    return '-' if value is None or np.isnan(value) else format(value, spec)
+
+
+def show(archive, directory=None):
+    if directory is None:
+        print(f"# {'directory':<28s} {'steps':>5s} {'energy(eV)':>14s} {'dipole':>10s} {'E-fermi':>9s} "
+              f"{'max|F|':>8s} finished")
+        for d in archive.dirs:
+            data = archive.steps(d)
+            last = {name: data[name][-1] if len(data[name]) else None for name in NAMES}
+            forces = data['forces'][-1] if len(data['forces']) else np.empty((0, 3))
+            fmax = float(np.linalg.norm(forces, axis=1).max()) if len(forces) else None
+            print(f"  {d:<28s} {len(data['energy']):5d} {fmt(last['energy'], '14.6f')} "
+                  f"{fmt(last['dipole'], '10.5f')} {fmt(last['efermi'], '9.4f')} {fmt(fmax, '8.4f')} "
+                  f"{'yes' if data['finished'] else 'no'}")
+        return
+    data = archive.steps(directory)
+    print(f"# step {'energy(eV)':>14s} {'dipole':>10s} {'dipolmoment':>12s} {'E-fermi':>9s} {'max|F|':>8s}")
+    for k in range(len(data['energy'])):
+        forces = data['forces'][k]
+        fmax = float(np.linalg.norm(forces, axis=1).max()) if len(forces) else None
+        print(f"{k + 1:6d} {fmt(data['energy'][k], '14.6f')} {fmt(data['dipole'][k], '10.5f')} "
+              f"{fmt(data['dipolmoment'][k], '12.6f')} {fmt(data['efermi'][k], '9.4f')} {fmt(fmax, '8.4f')}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="把扫描中所有 OUTCAR 的能量、偶极矩、费米能级与受力归档到一个 npz，可选就地压缩 OUTCAR。")
+    parser.add_argument('root', nargs='?', default='.', help='扫描根目录 (默认: 当前目录)')
+    parser.add_argument('-o', '--output', default=ARCHIVE_FILE, help=f'归档文件 (相对根目录，默认: {ARCHIVE_FILE})')
+    parser.add_argument('--compress', choices=['gz', 'xz', 'zst'],
+                        help='归档后把正常结束的 OUTCAR 压缩为 OUTCAR.gz/.xz/.zst (删除原文件)')
+    parser.add_argument('--show', nargs='?', const='', metavar='DIR',
+                        help='只显示归档内容: 不给 DIR 时每个目录一行，给出时列出该目录的每个离子步')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='并行进程数 (默认: CPU 核数)')
+    parser.add_argument('--force', action='store_true', help='忽略已有归档，重新解析所有 OUTCAR')
+    args = parser.parse_args()
+    path = os.path.join(args.root, args.output)
+
+    try:
+        previous = None if args.force and args.show is None else ScanArchive(path)
+    except (OSError, ValueError, KeyError) as e:
+        if args.show is not None:
+            print(f"错误: 无法读取 {path}: {e}", file=sys.stderr)
+            sys.exit(1)
+        previous = None
+    if args.show is not None:
+        if args.show and args.show not in previous.rows:
+            print(f"错误: {path} 中没有目录 {args.show}", file=sys.stderr)
+            sys.exit(1)
+        show(previous, args.show or None)
+        return
+
+    t0 = time.perf_counter()
+    outcars = find_outcars(args.root)
+    compressed_before = sum(1 for name in outcars.values() if compression(name))
+    dirs, files, stamps, records = [], [], [], []
+    todo = []  # (目录, 文件名, 大小与修改时间, 已归档的数据或 None)
+    for directory, name in outcars.items():
+        current = stamp(os.path.join(args.root, directory, name))
+        record = None
+        if previous is not None and directory in previous.rows and previous.stamp(directory) == (name, current):
+            record = previous.steps(directory)
+            if not (args.compress and record['finished'] and compression(name) is None):
+                dirs.append(directory)
+                files.append(name)
+                stamps.append(current)
+                records.append(record)
+                continue
+        todo.append((directory, name, current, record))  # 新增或变化的，或者已归档但还要压缩
+    failed = []
+    if todo:
+        workers = min(args.jobs or os.cpu_count() or 1, len(todo))
+        arguments = ([args.root] * len(todo), [t[0] for t in todo], [t[1] for t in todo],
+                     [args.compress] * len(todo), [t[3] is None for t in todo])
+        if workers == 1:
+            parsed = list(map(process, *arguments))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                parsed = list(pool.map(process, *arguments))
+        for (directory, old_name, old_stamp, record), (name, current, data) in zip(todo, parsed):
+            if data is not None and 'error' in data:
+                print(f"警告: {directory}: {data['error']}", file=sys.stderr)
+                if record is None:
+                    failed.append(directory)
+                    continue
+                name, current, data = old_name, old_stamp, None  # 只是压缩失败，保留归档的数据
+            dirs.append(directory)
+            files.append(name)
+            stamps.append(current)
+            records.append(record if data is None else data)
+    order = sorted(range(len(dirs)), key=lambda k: natural_key(dirs[k]))
+    write_archive(path, [dirs[k] for k in order], [files[k] for k in order], [stamps[k] for k in order],
+                  [records[k] for k in order])
+    compressed = sum(1 for name in files if compression(name)) - compressed_before
+    parsed_count = sum(1 for t in todo if t[3] is None) - len(failed)
+    print(f"{len(outcars)} 个 OUTCAR: 解析 {parsed_count} 个，失败 {len(failed)} 个，"
+          f"其余来自归档" + (f"；压缩 {compressed} 个" if args.compress else '')
+          + f"；归档 {path} ({os.path.getsize(path) / 1e6:.2f} MB)，用时 {time.perf_counter() - t0:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
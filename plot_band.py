@@ -1,54 +1,72 @@
-import pyprocar
-import numpy as np
-import matplotlib.pyplot as plt
-
-def read_fermi_level(outcar_path):
-    with open(outcar_path, 'r') as f:
-        for line in f:
-            if "E-fermi" in line:
-                efermi = float(line.split()[2])
-                break
-    return efermi
-
-# 设置文件路径
-outcar_path = 'OUTCAR'
-dirname = '.'
-
-# 从 OUTCAR 文件中读取费米能级
-efermi = read_fermi_level(outcar_path)
-#efermi = pyprocar.get_efermi
-# 绘制能带结构
-fig, ax = pyprocar.bandsplot(
-    code='vasp',          # 使用VASP格式的输出文件
-    dirname='.',          # 当前目录
-    elimit=[-6, 6],       # 能量范围（相对于费米能级）
-    mode='plain',         # 绘图模式
-    color='blue',
-    fermi_linestyle='--',
-    fermi_color='black',
-    fermi_linewidth=2,
-    fermi=efermi,
-    knames=['G','M','K','G'],
-    linewidth=[2,2],
-    title="Band Structure",
-    figure_size=[4,6],
-    dpi=1000,
-    show=False,
-)
-
-Gap=pyprocar.scripts.bandgap(
-     dirname ='.',
-     code='vasp',
-     fermi=efermi,
-)
-
-gap_text = f"Eg = {Gap:.2f} eV"
-ax.text(0.27, 0.52, gap_text, transform=ax.transAxes, fontsize=14, verticalalignment='bottom')
-ax.set_title('Band Structure',fontsize=20)
-ax.set_xlabel('',fontsize=20)
-ax.set_ylabel('Energy (eV)',fontsize=20)
-ax.set_yticks([-6, -3, 0, 3, 6])
-ax.set_yticklabels([-6, -3, 0, 3, 6], fontsize=14)
-ax.set_xticklabels(['G','M','K','G'], fontsize=14)
-
-plt.savefig("1.png", dpi=1000,bbox_inches='tight')
+import argparse
+import sys
+
+from band import render
+from bandcache import CACHE_FILE, load
+
+# 能带数据 (本征值、k 路径、费米能级) 由 bandcache.py 解析一次并缓存在 .bandcache.npz，
+# 带隙与作图都从缓存读取；--gap-only 只输出带隙，不导入 matplotlib、不作图。
+
+
+def plot_bands(bands, gap, knames=('G', 'M', 'K', 'G'), elimit=(-6, 6), figure_size=(4, 6), dpi=1000):
+    # 与原来 pyprocar.bandsplot(mode='plain') 的设置相同: 蓝色能带、黑色虚线费米能级，能量相对于费米能级
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=figure_size, dpi=dpi)
+    energies = bands.energies - bands.efermi
+    for spin in range(energies.shape[0]):
+        render(ax, bands.distance, energies[spin].T, elimit, color='blue', linewidth=2)
+    ax.axhline(0, color='black', linestyle='--', linewidth=2)
+    for tick in bands.ticks[1:-1]:
+        ax.axvline(tick, color='black', linewidth=0.5)
+    ax.set_xlim(bands.distance[0], bands.distance[-1])
+    ax.set_ylim(*elimit)
+
+    gap_text = f"Eg = {gap:.2f} eV"
+    ax.text(0.27, 0.52, gap_text, transform=ax.transAxes, fontsize=14, verticalalignment='bottom')
+    ax.set_title('Band Structure', fontsize=20)
+    ax.set_xlabel('', fontsize=20)
+    ax.set_ylabel('Energy (eV)', fontsize=20)
+    ax.set_yticks([-6, -3, 0, 3, 6])
+    ax.set_yticklabels([-6, -3, 0, 3, 6], fontsize=14)
+    ax.set_xticks(bands.ticks)
+    labels = knames if knames else bands.labels
+    if len(labels) == len(bands.ticks):
+        ax.set_xticklabels(labels, fontsize=14)
+    return fig
+
+
+def main():
+    parser = argparse.ArgumentParser(description="绘制能带图并标注带隙 (数据缓存于 .bandcache.npz，只解析一次)。")
+    parser.add_argument('--dirname', default='.', help='VASP 能带计算目录 (默认: 当前目录)')
+    parser.add_argument('--cache', default=CACHE_FILE, help=f'缓存文件名 (默认: {CACHE_FILE})')
+    parser.add_argument('--refresh', action='store_true', help='忽略缓存重新解析')
+    parser.add_argument('--gap-only', action='store_true', help='只输出带隙与带边，不作图')
+    parser.add_argument('--knames', nargs='*', default=['G', 'M', 'K', 'G'],
+                        help='高对称点标签 (默认: G M K G；不给参数时取自 KPOINTS)')
+    parser.add_argument('--elimit', nargs=2, type=float, default=[-6, 6], help='能量范围，相对于费米能级 (默认: -6 6)')
+    parser.add_argument('--dpi', type=int, default=1000, help='图片分辨率 (默认: 1000)')
+    parser.add_argument('-o', '--output', default='1.png', help='输出图片 (默认: 1.png)')
+    args = parser.parse_args()
+
+    try:
+        bands, cached = load(args.dirname, args.cache, args.refresh)
+    except (OSError, ValueError, IndexError) as e:
+        print(f"错误: {e}", file=sys.stderr)
+        sys.exit(1)
+    edges = bands.band_edges()
+    print(f"Eg = {edges['gap']:.4f} eV ({'直接' if edges['direct'] else '间接'})，"
+          f"VBM {edges['vbm'] - bands.efermi:.4f} eV，CBM {edges['cbm'] - bands.efermi:.4f} eV (相对 E-fermi "
+          f"{bands.efermi:.4f} eV)" + ("，数据来自缓存" if cached else ""))
+    if args.gap_only:
+        return
+
+    import matplotlib
+    matplotlib.use('Agg')
+
+    fig = plot_bands(bands, edges['gap'], args.knames, args.elimit, dpi=args.dpi)
+    fig.savefig(args.output, dpi=args.dpi, bbox_inches='tight')
+
+
+if __name__ == "__main__":
+    main()
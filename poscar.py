@@ -0,0 +1,245 @@
+import argparse
+import os
+import sys
+
+import numpy as np
+
+# --- POSCAR/CONTCAR 读写 ---
+# Structure 用 NumPy 数组保存一个结构: 晶格 (文件中的数值，未乘缩放系数)、各元素原子数、坐标 (Direct 或
+# Cartesian，与文件相同)、可选的 Selective dynamics 标记和速度；VASP4 (没有元素行) 的文件写回时同样没有元素行。
+# 写出按 VASP 的 CONTCAR 格式 (坐标 16 位小数)。PoscarTemplate 把不变的部分只格式化一次，做成 % 模板，
+# 变化的数值 (部分原子的坐标、晶格) 留作占位符，每个结构只需一次 template % 数值；
+# Structure.format 本身也走这条路 (所有原子都是占位符)，一次 % 格式化全部坐标。
+# 速度之后的预测-校正数据 (MD 的 CONTCAR) 不保留。
+
+LATTICE_ROW = ' %21.16f%22.16f%22.16f\n'
+COORD_ROW = '%20.16f%20.16f%20.16f'
+VELOCITY_ROW = '%16.8E%16.8E%16.8E\n'
+
+
+class Structure:
+    __slots__ = ('title', 'scale', 'lattice', 'species', 'counts', 'coords', 'cartesian', 'selective',
+                 'velocities', 'velocity_line')
+
+    def __init__(self, title, scale, lattice, species, counts, coords, cartesian=False, selective=None,
+                 velocities=None, velocity_line=''):
+        self.title = title
+        self.scale = float(scale)  # 负数表示体积
+        self.lattice = np.asarray(lattice, dtype=float).reshape(3, 3)
+        self.species = None if species is None else list(species)  # VASP4 为 None
+        self.counts = [int(n) for n in counts]
+        self.coords = np.asarray(coords, dtype=float).reshape(-1, 3)
+        self.cartesian = bool(cartesian)
+        self.selective = None if selective is None else np.asarray(selective, dtype=bool).reshape(-1, 3)
+        self.velocities = None if velocities is None else np.asarray(velocities, dtype=float).reshape(-1, 3)
+        self.velocity_line = velocity_line  # 坐标与速度之间的那一行 (空行或 Cartesian/Direct)
+
+    @property
+    def natoms(self):
+        return len(self.coords)
+
+    @property
+    def factor(self):
+        # 实际的缩放系数
+        if self.scale < 0:
+            return (-self.scale / abs(np.linalg.det(self.lattice))) ** (1 / 3)
+        return self.scale
+
+    @property
+    def cell(self):
+        # 乘以缩放系数后的晶格 (Å，行为 a, b, c)
+        return self.factor * self.lattice
+
+    @property
+    def elements(self):
+        # 每个原子的元素序号
+        return np.repeat(np.arange(len(self.counts)), self.counts)
+
+    def direct(self):
+        # 分数坐标
+        return self.coords @ np.linalg.inv(self.lattice) if self.cartesian else self.coords.copy()
+
+    def cartesian_coords(self):
+        # 笛卡尔坐标 (Å)
+        return self.coords * self.factor if self.cartesian else self.coords @ self.cell
+
+    def copy(self, **changes):
+        # 复制并替换部分属性，例如 structure.copy(lattice=new_lattice)
+        values = {name: getattr(self, name) for name in self.__slots__}
+        values.update(changes)
+        return Structure(**values)
+
+    def format(self):
+        return PoscarTemplate(self, moving=np.ones(self.natoms, dtype=bool)).format(self.coords)
+
+    def write(self, path):
+        write_atomic(path, self.format())
+
+
+def _is_number(token):
+    try:
+        float(token)
+        return True
+    except ValueError:
+        return False
+
+
+def parse(text, name='POSCAR'):
+    lines = text.splitlines()
+    try:
+        title = lines[0].strip()
+        scale = float(lines[1].split()[0])
+        lattice = np.array([line.split()[:3] for line in lines[2:5]], dtype=float)
+        k = 5
+        tokens = lines[k].split()
+        species = None
+        if not _is_number(tokens[0]):  # VASP5 起有元素行
+            species = tokens
+            k += 1
+        counts = [int(token) for token in lines[k].split()]
+        k += 1
+        selective = lines[k].strip()[:1] in ('S', 's')
+        if selective:
+            k += 1
+        cartesian = lines[k].strip()[:1] in ('C', 'c', 'K', 'k')
+        k += 1
+        natoms = sum(counts)
+        block = lines[k:k + natoms]
+        if len(block) < natoms:
+            raise ValueError(f"只有 {len(block)} 行坐标，应为 {natoms} 行")
+        coords = flags = None
+        if not selective:
+            # 每行正好三个数时整块转换，行尾有元素名等注释时逐行 split
+            try:
+                values = np.array(' '.join(block).split(), dtype=float)
+                if values.size == 3 * natoms:
+                    coords = values.reshape(natoms, 3)
+            except ValueError:
+                pass
+        if coords is None:
+            rows = [line.split() for line in block]
+            coords = np.array([row[:3] for row in rows], dtype=float)
+            if selective:
+                flags = np.array([[t[:1] in ('T', 't') for t in row[3:6]] for row in rows]).reshape(natoms, 3)
+    except (IndexError, ValueError) as e:
+        raise ValueError(f"{name}: 无法解析: {e}") from None
+    k += natoms
+    velocities, velocity_line = None, ''
+    if len(lines) >= k + 1 + natoms:
+        try:
+            velocities = np.array([line.split()[:3] for line in lines[k + 1:k + 1 + natoms]], dtype=float)
+            velocity_line = lines[k].strip()
+        except ValueError:
+            velocities = None
+        if velocities is not None and velocities.shape != (natoms, 3):
+            velocities = None
+    return Structure(title, scale, lattice, species, counts, coords, cartesian, flags, velocities, velocity_line)
+
+
+def read(path='POSCAR'):
+    with open(path) as f:
+        return parse(f.read(), path)
+
+
+class PoscarTemplate:
+    # structure 中 moving 原子的坐标 (以及 lattice=True 时的三行晶格) 为 % 占位符，其余部分预先格式化
+    def __init__(self, structure, moving=None, lattice=False):
+        s = structure
+        self.moving = np.zeros(s.natoms, dtype=bool) if moving is None else np.asarray(moving, dtype=bool)
+        self.lattice = lattice
+        header = [s.title.replace('%', '%%') + '\n', f"{s.scale:19.14f}\n"]
+        header.append(LATTICE_ROW * 3 if lattice else (LATTICE_ROW * 3) % tuple(s.lattice.ravel().tolist()))
+        if s.species is not None:
+            header.append(''.join(f"{name:>6s}" for name in s.species).replace('%', '%%') + '\n')
+        header.append(''.join(f"{n:6d}" for n in s.counts) + '\n')
+        if s.selective is not None:
+            header.append('Selective dynamics\n')
+        header.append('Cartesian\n' if s.cartesian else 'Direct\n')
+        if s.selective is not None:
+            flags = np.where(s.selective, '   T', '   F')
+            ends = [''.join(row) + '\n' for row in flags.tolist()]
+        else:
+            ends = ['\n'] * s.natoms
+        rows = [COORD_ROW + end if move else (COORD_ROW % tuple(c)) + end
+                for c, move, end in zip(s.coords.tolist(), self.moving.tolist(), ends)]
+        tail = ''
+        if s.velocities is not None:
+            tail = s.velocity_line + '\n' + (VELOCITY_ROW * s.natoms) % tuple(s.velocities.ravel().tolist())
+        self.template = ''.join(header) + ''.join(rows) + tail.replace('%', '%%')
+
+    def values(self, moved=None, lattice=None):
+        values = np.asarray(lattice, dtype=float).ravel().tolist() if self.lattice else []
+        if moved is not None:
+            moved = np.asarray(moved, dtype=float)
+            if len(moved) != int(self.moving.sum()):
+                moved = moved[self.moving]  # 给出的是全部原子的坐标
+            values += moved.ravel().tolist()
+        return tuple(values)
+
+    def format(self, moved=None, lattice=None):
+        # moved: (移动原子数, 3) 或 (原子数, 3)；lattice: 3x3 (文件中的数值)
+        return self.template % self.values(moved, lattice)
+
+    def texts(self, moved=None, lattices=None):
+        # 批量: moved (结构数, 移动原子数, 3)、lattices (结构数, 3, 3)，逐个生成文本
+        count = len(moved) if moved is not None else len(lattices)
+        template = self.template
+        for k in range(count):
+            yield template % self.values(None if moved is None else moved[k],
+                                         None if lattices is None else lattices[k])
+
+
+def write_atomic(path, text):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def write_many(paths, texts):
+    # 批量写出 (自动建立所在目录)；返回写出的文件数
+    made = set()
+    count = 0
+    for path, text in zip(paths, texts):
+        folder = os.path.dirname(path)
+        if folder and folder not in made:
+            os.makedirs(folder, exist_ok=True)
+            made.add(folder)
+        with open(path, 'w') as f:
+            f.write(text)
+        count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="读取 POSCAR/CONTCAR，输出概要或按统一格式重写 (可转换坐标类型)。")
+    parser.add_argument('file', nargs='?', default='POSCAR', help='结构文件 (默认: POSCAR)')
+    parser.add_argument('-o', '--output', help='按统一格式写出到此文件 ("-" 为标准输出)')
+    parser.add_argument('--direct', action='store_true', help='写出前转换为 Direct 坐标')
+    parser.add_argument('--cartesian', action='store_true', help='写出前转换为 Cartesian 坐标')
+    args = parser.parse_args()
+    try:
+        s = read(args.file)
+    except (OSError, ValueError) as e:
+        print(f"错误: {e}", file=sys.stderr)
+        sys.exit(1)
+    if args.direct and s.cartesian:
+        s = s.copy(coords=s.direct(), cartesian=False)
+    elif args.cartesian and not s.cartesian:
+        s = s.copy(coords=s.cartesian_coords() / s.factor, cartesian=True)
+    if args.output == '-':
+        sys.stdout.write(s.format())
+        return
+    if args.output:
+        s.write(args.output)
+        return
+    names = s.species or [f"X{i + 1}" for i in range(len(s.counts))]
+    print(f"{s.title}: {s.natoms} 个原子 ({' '.join(f'{n}{c}' for n, c in zip(names, s.counts))})，"
+          f"{'Cartesian' if s.cartesian else 'Direct'}"
+          + ("，Selective dynamics" if s.selective is not None else '')
+          + ("，含速度" if s.velocities is not None else '')
+          + f"，体积 {abs(np.linalg.det(s.cell)):.4f} Å^3")
+
+
+if __name__ == "__main__":
+    main()
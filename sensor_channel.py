@@ -0,0 +1,200 @@
+import collections
+import threading
+import time
+
+from sensor_metrics import REGISTRY
+
+# --- 有界通道 ---
+# 取代原来无界的 Queue: 每个消费者 (界面数据、界面日志、存储...) 一个独立的有界通道，
+# 满了以后按通道各自的溢出策略处理:
+#   drop-oldest  丢弃最早的一条，保留最新数据 (适合界面显示)
+#   drop-newest  丢弃新来的这一条
+#   block        不丢数据: 线程生产者在 put 中等待；asyncio 服务器用 offer 得知已满后暂停读取 socket，
+#                由 TCP 流控把压力传回传感器，消费者腾出空间后再恢复读取
+# 每个通道记录深度、丢弃数以及入队到被取走的等待时间，并注册到 sensor_metrics.REGISTRY。
+
+DROP_OLDEST = 'drop-oldest'
+DROP_NEWEST = 'drop-newest'
+BLOCK = 'block'
+POLICIES = (DROP_OLDEST, DROP_NEWEST, BLOCK)
+
+# 通道名 -> {'maxsize': ..., 'policy': ...}，由命令行 (configure) 覆盖各通道的默认配置
+CHANNEL_OVERRIDES = {}
+CHANNELS = []  # 已创建的通道，用于统计输出
+
+
+class Empty(Exception):
+    pass
+
+
+class Closed(Empty):
+    # 通道已关闭且已取空
+    pass
+
+
+def configure(name, maxsize=None, policy=None):
+    if policy is not None and policy not in POLICIES:
+        raise ValueError(f"未知的溢出策略: {policy} (可选: {', '.join(POLICIES)})")
+    if maxsize is not None and maxsize < 1:
+        raise ValueError(f"通道 {name} 的容量至少为 1")
+    override = CHANNEL_OVERRIDES.setdefault(name, {})
+    if maxsize is not None:
+        override['maxsize'] = maxsize
+    if policy is not None:
+        override['policy'] = policy
+
+
+def parse_assignment(text):
+    # "name=value" -> (name, value)
+    name, sep, value = text.partition('=')
+    if not sep or not name or not value:
+        raise ValueError(f"格式应为 通道名=值: {text}")
+    return name, value
+
+
+def configure_spec(spec):
+    # 命令行 --channel 的格式: 通道名=策略[:容量]，例如 store=block:512、gui-data=drop-newest
+    name, value = parse_assignment(spec)
+    policy, _, size = value.partition(':')
+    configure(name, int(size) if size else None, policy or None)
+
+
+def _weight(item):
+    # 数据批次按读数条数计，其它条目计 1
+    return getattr(item, 'size', 1)
+
+
+class Channel:
+    def __init__(self, name, maxsize, policy=DROP_OLDEST, allow_block=True):
+        override = CHANNEL_OVERRIDES.get(name, {})
+        self.name = name
+        self.maxsize = override.get('maxsize', maxsize)
+        self.policy = override.get('policy', policy)
+        if self.policy not in POLICIES:
+            raise ValueError(f"未知的溢出策略: {self.policy}")
+        if self.policy == BLOCK and not allow_block:
+            # 例如日志通道: 写日志的地方无法暂停，不能使用 block
+            raise ValueError(f"通道 {name} 不支持 block 策略")
+        self.low_water = self.maxsize // 2  # block 策略下降到这个深度时通知生产者恢复
+        self._items = collections.deque()
+        self._cond = threading.Condition()
+        self._space_listeners = []
+        self._producers_paused = False
+        self.closed = False
+
+        # 统计
+        self.enqueued = 0
+        self.consumed = 0
+        self.dropped = 0
+        self.dropped_rows = 0
+        self.max_depth = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        labels = {'channel': name}
+        self.wait_hist = REGISTRY.histogram('sensor_channel_wait_seconds', '条目从入队到被消费者取走的时间', labels=labels)
+        REGISTRY.func('sensor_channel_depth', '通道当前深度', self.__len__, labels=labels)
+        REGISTRY.func('sensor_channel_capacity', '通道容量', lambda: self.maxsize, labels=labels)
+        REGISTRY.func('sensor_channel_dropped_total', '因通道已满丢弃的条目数', lambda: self.dropped, 'counter', labels)
+        REGISTRY.func('sensor_channel_dropped_rows_total', '因通道已满丢弃的读数条数',
+                      lambda: self.dropped_rows, 'counter', labels)
+        CHANNELS.append(self)
+
+    def __len__(self):
+        return len(self._items)
+
+    # --- 生产者 ---
+    def _append(self, item):
+        self._items.append((time.monotonic(), item))
+        self.enqueued += 1
+        if len(self._items) > self.max_depth:
+            self.max_depth = len(self._items)
+        self._cond.notify()
+
+    def _drop(self, item):
+        self.dropped += 1
+        self.dropped_rows += _weight(item)
+
+    def put(self, item, timeout=None):
+        # 线程生产者使用。block 策略下等待空间，超时返回 False；其它策略按溢出规则处理并返回 True
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                if self.policy == DROP_NEWEST:
+                    self._drop(item)
+                    return True
+                if self.policy == DROP_OLDEST:
+                    self._drop(self._items.popleft()[1])
+                elif not self._cond.wait_for(lambda: len(self._items) < self.maxsize, timeout):
+                    return False
+            self._append(item)
+            return True
+
+    def offer(self, item):
+        # 不阻塞的生产者 (事件循环) 使用。block 策略下即使已满也会收下这一条，
+        # 返回 False 表示生产者应暂停，直到 add_space_listener 注册的回调被调用
+        with self._cond:
+            if len(self._items) >= self.maxsize and self.policy != BLOCK:
+                if self.policy == DROP_NEWEST:
+                    self._drop(item)
+                    return True
+                self._drop(self._items.popleft()[1])
+            self._append(item)
+            if self.policy == BLOCK and len(self._items) >= self.maxsize:
+                self._producers_paused = True
+                return False
+            return True
+
+    def add_space_listener(self, callback):
+        # callback 在消费者线程中调用，需自行切换到生产者线程 (例如 loop.call_soon_threadsafe)
+        self._space_listeners.append(callback)
+
+    # --- 消费者 ---
+    def _take(self):
+        enqueued_at, item = self._items.popleft()
+        wait = time.monotonic() - enqueued_at
+        self.consumed += 1
+        self.wait_total += wait
+        self.wait_hist.observe(wait)
+        if wait > self.wait_max:
+            self.wait_max = wait
+        notify = self._producers_paused and len(self._items) <= self.low_water
+        if notify:
+            self._producers_paused = False
+        self._cond.notify_all()
+        return item, notify
+
+    def get(self, timeout=None):
+        # 通道为空时等待最多 timeout 秒，仍为空则抛出 Empty；已关闭且取空后抛出 Closed
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items or self.closed, timeout):
+                raise Empty
+            if not self._items:
+                raise Closed
+            item, notify = self._take()
+        if notify:
+            for callback in self._space_listeners:
+                callback()
+        return item
+
+    def get_nowait(self):
+        return self.get(timeout=0)
+
+    def close(self):
+        # 不再接收新数据的信号；已入队的条目仍可取出
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    # --- 统计 ---
+    def stats(self):
+        return {
+            'name': self.name, 'policy': self.policy, 'depth': len(self._items), 'maxsize': self.maxsize,
+            'max_depth': self.max_depth, 'enqueued': self.enqueued, 'consumed': self.consumed,
+            'dropped': self.dropped, 'dropped_rows': self.dropped_rows,
+            'wait_avg': self.wait_total / self.consumed if self.consumed else 0.0, 'wait_max': self.wait_max,
+        }
+
+    def summary(self):
+        s = self.stats()
+        return (f"{s['name']}[{s['policy']}] 深度 {s['depth']}/{s['maxsize']} (峰值 {s['max_depth']}), "
+                f"丢弃 {s['dropped']} 批/{s['dropped_rows']} 条, "
+                f"等待 平均 {s['wait_avg'] * 1000:.1f} ms / 最大 {s['wait_max'] * 1000:.1f} ms")
@@ -0,0 +1,150 @@
+import argparse
+import asyncio
+import multiprocessing
+import time
+from array import array
+
+from sensor_server import SensorServer, raise_nofile_limit
+
+# --- 本地压测客户端 ---
+# 模拟大量传感器节点向服务器发送 "#temp,humidity,pm2.5,co2,voc,pm1,pm10#" 数据帧。
+# CO2 字段里写入发送时刻 (单调时钟的微秒数，对 2^31 取模)，服务器端据此计算帧延迟。
+# Linux 上 CLOCK_MONOTONIC 是全系统共享的，因此服务器跑在子进程中也能直接比较。
+
+STAMP_MOD = 2 ** 31
+
+
+def now_stamp():
+    return (time.monotonic_ns() // 1000) % STAMP_MOD
+
+
+def make_frame(stamp):
+    return f"#23.5,45.0,12,{stamp},2,8,15#".encode()
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return float('nan')
+    k = min(len(sorted_values) - 1, int(round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+# --- 服务器子进程: 统计收到的帧数和延迟 ---
+def server_process(host, port, conn):
+    raise_nofile_limit()
+    latencies = array('L')
+
+    def on_batch(batch):
+        now = now_stamp()
+        co2 = batch.co2
+        latencies.extend((now - co2[k]) % STAMP_MOD for k in range(batch.size))
+
+    server = SensorServer(host, port, on_batch=on_batch, on_log=lambda message: None)
+
+    def on_command():
+        command = conn.recv()
+        if command == 'reset':
+            del latencies[:]
+            server.bad_frames = 0
+        elif command == 'stop':
+            conn.send((len(latencies), server.bad_frames, sorted(latencies)))
+            server.stop()
+
+    async def run():
+        asyncio.get_running_loop().add_reader(conn.fileno(), on_command)
+        serving = asyncio.create_task(server.serve())
+        while not server.listening and not serving.done():
+            await asyncio.sleep(0.01)
+        conn.send('ready')
+        await serving
+
+    asyncio.run(run())
+
+
+class LoadClient(asyncio.Protocol):
+    def connection_lost(self, exc):
+        pass
+
+
+async def generate_load(host, port, connections, rate, duration, frames_per_write, on_ready):
+    loop = asyncio.get_running_loop()
+    transports = []
+    for start in range(0, connections, 500):
+        batch = [loop.create_connection(LoadClient, host, port)
+                 for _ in range(min(500, connections - start))]
+        for transport, _ in await asyncio.gather(*batch):
+            transports.append(transport)
+    print(f"已建立 {len(transports)} 个连接。")
+    on_ready()
+
+    tick = 0.01
+    writes_per_tick = connections * rate * tick / frames_per_write
+    sent = skipped = 0
+    carry = 0.0
+    cursor = 0
+    start = time.monotonic()
+    next_tick = start
+    while time.monotonic() - start < duration:
+        carry += writes_per_tick
+        count = int(carry)
+        carry -= count
+        payload = make_frame(now_stamp()) * frames_per_write
+        for _ in range(count):
+            transport = transports[cursor]
+            cursor = (cursor + 1) % len(transports)
+            # 服务器处理不过来时不要在客户端无限堆积发送缓冲
+            if transport.get_write_buffer_size() > 64 * 1024:
+                skipped += frames_per_write
+                continue
+            transport.write(payload)
+            sent += frames_per_write
+        next_tick += tick
+        await asyncio.sleep(max(0.0, next_tick - time.monotonic()))
+    elapsed = time.monotonic() - start
+    for transport in transports:
+        transport.close()
+    return sent, skipped, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="传感器服务器本地压测工具。")
+    parser.add_argument('--host', default='127.0.0.1', help='服务器地址 (默认: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=18269, help='服务器端口 (默认: 18269)')
+    parser.add_argument('--connections', type=int, default=1000, help='并发连接数 (默认: 1000)')
+    parser.add_argument('--rate', type=float, default=10.0, help='每个连接每秒发送的帧数 (默认: 10)')
+    parser.add_argument('--duration', type=float, default=10.0, help='压测持续秒数 (默认: 10)')
+    parser.add_argument('--frames-per-write', type=int, default=1, help='每次写入合并的帧数 (默认: 1)')
+    parser.add_argument('--external', action='store_true',
+                        help='压测已在运行的外部服务器 (只统计发送速率，无法统计延迟)')
+    args = parser.parse_args()
+
+    raise_nofile_limit()
+    parent_conn = proc = None
+    if not args.external:
+        parent_conn, child_conn = multiprocessing.Pipe()
+        proc = multiprocessing.Process(target=server_process, args=(args.host, args.port, child_conn), daemon=True)
+        proc.start()
+        if parent_conn.recv() != 'ready':
+            raise RuntimeError("服务器子进程启动失败")
+
+    def on_ready():
+        if parent_conn is not None:
+            parent_conn.send('reset')
+
+    sent, skipped, elapsed = asyncio.run(generate_load(
+        args.host, args.port, args.connections, args.rate, args.duration, args.frames_per_write, on_ready))
+    print(f"发送 {sent} 帧, 用时 {elapsed:.2f} s, 发送速率 {sent / elapsed:.0f} 帧/秒, 因背压跳过 {skipped} 帧")
+
+    if parent_conn is not None:
+        time.sleep(0.5)  # 等待服务器处理完在途数据
+        parent_conn.send('stop')
+        received, bad_frames, latencies = parent_conn.recv()
+        proc.join(timeout=5)
+        print(f"服务器收到 {received} 帧 (解析失败 {bad_frames}), 持续吞吐 {received / elapsed:.0f} 帧/秒")
+        print(f"帧延迟: p50 {percentile(latencies, 50) / 1000:.2f} ms, "
+              f"p99 {percentile(latencies, 99) / 1000:.2f} ms, "
+              f"max {percentile(latencies, 100) / 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+import bisect
+import cProfile
+import http.server
+import os
+import pstats
+import sys
+import threading
+
+# --- 运行指标 ---
+# 计数器、仪表、直方图，按 Prometheus 文本格式输出，由一个本地 HTTP 端点 (/metrics) 提供。
+# 每个进程一个注册表 REGISTRY；同名同标签的指标重复注册时替换旧的 (例如界面中重新启动服务器)。
+# 热路径上只做整数加法或一次 bisect，不加锁: 读取方在 HTTP 线程，偶尔读到旧值无妨。
+
+METRICS_HOST = '127.0.0.1'
+# 秒: 解析耗时与通道等待时间都落在 10µs ~ 10s 之间
+TIME_BUCKETS = (1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    parts = []
+    for key, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, help_text, labels=None):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(sorted((labels or {}).items()))
+
+    def samples(self):
+        # [(名字后缀, 额外标签, 值), ...]
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labels=None):
+        super().__init__(name, help_text, labels)
+        self.value = 0
+
+    def inc(self, n=1):
+        self.value += n
+
+    def samples(self):
+        return [('', (), self.value)]
+
+
+class LabeledCounter(Metric):
+    # 一个标签维度的计数器族，例如按客户端统计的帧数
+    kind = 'counter'
+
+    def __init__(self, name, help_text, label, labels=None):
+        super().__init__(name, help_text, labels)
+        self.label = label
+        self.values = {}
+
+    def inc(self, key, n=1):
+        self.values[key] = self.values.get(key, 0) + n
+
+    def samples(self):
+        return [('', ((self.label, key),), value) for key, value in list(self.values.items())]
+
+
+class FuncMetric(Metric):
+    # 取值由回调给出，用于已有的统计属性 (例如 SensorServer.accepted)
+    def __init__(self, name, help_text, func, kind='gauge', labels=None):
+        super().__init__(name, help_text, labels)
+        self.func = func
+        self.kind = kind
+
+    def samples(self):
+        return [('', (), self.func())]
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, buckets=TIME_BUCKETS, labels=None):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # 最后一格是 +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self):
+        out = []
+        total = 0
+        for bound, n in zip(self.buckets + (float('inf'),), self.counts):
+            total += n
+            out.append(('_bucket', (('le', _format_value(bound)),), total))
+        out.append(('_sum', (), self.sum))
+        out.append(('_count', (), self.count))
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}  # (name, labels) -> Metric
+        self.lock = threading.Lock()
+
+    def add(self, metric):
+        with self.lock:
+            self.metrics[(metric.name, metric.labels)] = metric
+        return metric
+
+    def counter(self, name, help_text, labels=None):
+        return self.add(Counter(name, help_text, labels))
+
+    def histogram(self, name, help_text, buckets=TIME_BUCKETS, labels=None):
+        return self.add(Histogram(name, help_text, buckets, labels))
+
+    def func(self, name, help_text, func, kind='gauge', labels=None):
+        return self.add(FuncMetric(name, help_text, func, kind, labels))
+
+    def render(self):
+        with self.lock:
+            metrics = sorted(self.metrics.values(), key=lambda m: (m.name, m.labels))
+        lines = []
+        last_name = None
+        for metric in metrics:
+            if metric.name != last_name:
+                lines.append(f"# HELP {metric.name} {metric.help}")
+                lines.append(f"# TYPE {metric.name} {metric.kind}")
+                last_name = metric.name
+            for suffix, extra, value in metric.samples():
+                lines.append(f"{metric.name}{suffix}{_format_labels(metric.labels + extra)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+# --- HTTP 端点 ---
+class _MetricsHandler(http.server.BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # 不打印每次抓取
+
+
+def start_metrics_http(port, host=METRICS_HOST, registry=REGISTRY):
+    # 在后台线程中提供 http://host:port/metrics，返回 HTTPServer (shutdown() 停止)
+    handler = type('MetricsHandler', (_MetricsHandler,), {'registry': registry})
+    httpd = http.server.ThreadingHTTPServer((host, port), handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, name='sensor-metrics', daemon=True).start()
+    return httpd
+
+
+# --- 性能剖析 ---
+def run_profiled(path, func, *args, **kwargs):
+    # path 为空时直接调用；否则在 cProfile 下运行 func (只覆盖当前线程)，退出时写出 pstats 文件并打印前 15 项
+    if not path:
+        return func(*args, **kwargs)
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        print(f"[性能剖析] 已写入 {path} (进程 {os.getpid()})，累计耗时前 15 项:", file=sys.stderr)
+        pstats.Stats(profiler, stream=sys.stderr).sort_stats('cumulative').print_stats(15)
@@ -0,0 +1,198 @@
+# --- 传感器数据协议 ---
+# 帧格式: "#temp,humidity,pm2.5,co2,voc,pm1,pm10#"
+# 本模块不依赖 tkinter / PIL，可同时被 GUI (tcp.py) 与无界面服务器 (sensor_server.py) 使用。
+from array import array
+
+BUFFER_SIZE = 1024
+SENSOR_FIELDS = ('temperature', 'humidity', 'pm25', 'co2', 'voc_raw', 'pm1', 'pm10')
+VOC_QUALITY_MAP = {1: "优", 2: "良", 3: "中", 4: "差"}
+
+
+def voc_quality(voc_raw):
+    return VOC_QUALITY_MAP.get(voc_raw, f"未知 ({voc_raw})")
+
+
+# --- 数据解析函数 (已更新以处理7个数据点) ---
+def parse_sensor_data(data_str, on_log=None):
+    # 数据格式: "#temp,humidity,pm2.5,co2,voc,pm1,pm10#"
+    # 解析失败返回 None；给出 on_log 时把原因交给它 (与服务器的 on_log 相同，消息以换行结尾)，不再逐条 print
+    if not data_str.startswith("#") or not data_str.endswith("#"):
+        return None
+    try:
+        stripped_data = data_str[1:-1]
+        parts = stripped_data.split(',')
+        if len(parts) != 7: # <--- 检查7个数据部分
+            if on_log is not None:
+                on_log(f"数据段数量错误: 期望7个，实际{len(parts)} - {data_str}\n")
+            return None
+
+        temperature = float(parts[0])
+        humidity = float(parts[1])
+        pm25 = int(parts[2])
+        co2 = int(parts[3])
+        voc_raw = int(parts[4])
+        pm1 = int(parts[5])   # <--- 新增PM1
+        pm10 = int(parts[6])  # <--- 新增PM10
+
+        return {
+            "temperature": temperature, "humidity": humidity, "pm25": pm25,
+            "co2": co2, "voc_raw": voc_raw, "voc_quality": voc_quality(voc_raw),
+            "pm1": pm1, "pm10": pm10, # <--- 添加到返回字典
+            "raw_string": data_str
+        }
+    except ValueError as e:
+        if on_log is not None:
+            on_log(f"数据值转换错误: {e} - {data_str}\n")
+        return None
+    except Exception as e:
+        if on_log is not None:
+            on_log(f"解析数据时发生未知错误: {e} - {data_str}\n")
+        return None
+
+
+# --- 增量分帧器 ---
+# 在固定大小的 bytearray 上用 recv_into 直接接收数据，通过 memoryview 切出完整帧。
+# 未完成的尾部留在原地不复制，只有缓冲区尾部空间不够时才把 (不超过 max_pending 的) 残帧搬到开头。
+class FrameSplitter:
+    def __init__(self, max_pending=BUFFER_SIZE * 2, recv_size=BUFFER_SIZE):
+        self.max_pending = max_pending  # 不完整消息的最大长度，对应原来的 BUFFER_SIZE * 2 保护
+        self.recv_size = recv_size
+        self._buf = bytearray(max_pending + recv_size)
+        self._view = memoryview(self._buf)
+        self._start = 0   # 未消费数据的起点
+        self._end = 0     # 已接收数据的终点
+        self._resync = False  # 丢弃过长消息后，下一个 '#' 是该消息的结束符
+        self.overflows = 0
+
+    def get_buffer(self, sizehint=-1):
+        # 返回可写入的 memoryview (也可直接作为 asyncio.BufferedProtocol.get_buffer 的返回值)
+        if self._end == 0:
+            return self._view  # 上次的数据已全部消费，最常见的情况，不必再切片
+        if len(self._buf) - self._end < self.recv_size:
+            pending = self._end - self._start
+            self._buf[:pending] = bytes(self._view[self._start:self._end])
+            self._start, self._end = 0, pending
+        return self._view[self._end:]
+
+    def buffer_updated(self, nbytes):
+        self._end += nbytes
+
+    def recv_into(self, sock):
+        nbytes = sock.recv_into(self.get_buffer())
+        self._end += nbytes
+        return nbytes
+
+    def feed(self, data):
+        # 兼容只能拿到 bytes 的调用方，返回本次得到的所有完整帧
+        frames = []
+        data = memoryview(data)
+        while data:
+            target = self.get_buffer()
+            nbytes = min(len(target), len(data))
+            target[:nbytes] = data[:nbytes]
+            self._end += nbytes
+            data = data[nbytes:]
+            frames.extend(self.frames())
+        return frames
+
+    def frames(self):
+        # 逐个产出完整帧 (包含首尾 '#' 的 bytearray，只复制帧本身)
+        buf = self._buf
+        end = self._end
+        pos = self._start
+        if self._resync:
+            delimiter = buf.find(b'#', pos, end)
+            if delimiter == -1:
+                self._start = self._end = 0
+                return
+            pos = self._start = delimiter + 1
+            self._resync = False
+        while True:
+            start_index = buf.find(b'#', pos, end)
+            if start_index == -1:
+                break
+            end_index = buf.find(b'#', start_index + 1, end)
+            if end_index == -1:
+                if end - start_index > self.max_pending:
+                    # 消息过长且不完整: 丢弃并等待它的结束符，避免缓冲区无限增长
+                    self.overflows += 1
+                    self._resync = True
+                    break
+                self._start = start_index
+                return
+            pos = self._start = end_index + 1
+            yield buf[start_index:end_index + 1]
+        # 剩余数据中没有帧起始符，全部丢弃
+        self._start = self._end = 0
+
+
+# --- 批量解析 ---
+# 一批帧解析到预先分配好的列式数组 (array.array) 中，不再为每条消息创建字典。
+# 解析失败的帧按其在输入列表中的序号记录在 errors 里，由调用方统一汇报。
+class SensorBatch:
+    __slots__ = SENSOR_FIELDS + ('client_id', 'timestamp', 'size', 'errors', 'clients')
+
+    def __init__(self, capacity):
+        for name in ('temperature', 'humidity', 'timestamp'):
+            setattr(self, name, array('d', bytes(8 * capacity)))
+        for name in ('pm25', 'co2', 'voc_raw', 'pm1', 'pm10', 'client_id'):
+            setattr(self, name, array('q', bytes(8 * capacity)))
+        self.size = 0
+        self.errors = []   # [(帧序号, 错误原因), ...]
+        self.clients = {}  # client_id -> 客户端地址
+
+    def __len__(self):
+        return self.size
+
+    def row(self, k):
+        # 取出第 k 行，格式与 parse_sensor_data 的返回值一致 (仅用于需要单条记录的地方，例如界面显示)
+        item = {name: getattr(self, name)[k] for name in SENSOR_FIELDS}
+        item['voc_quality'] = voc_quality(item['voc_raw'])
+        item['raw_string'] = "#{temperature},{humidity},{pm25},{co2},{voc_raw},{pm1},{pm10}#".format(**item)
+        item['client_address'] = self.clients.get(self.client_id[k])
+        item['timestamp'] = self.timestamp[k]
+        return item
+
+
+def parse_sensor_batch(frames, client_ids, timestamps):
+    # frames: 完整帧 (bytes/bytearray，含首尾 '#')；client_ids、timestamps 与 frames 一一对应
+    batch = SensorBatch(len(frames))
+    temperature, humidity = batch.temperature, batch.humidity
+    pm25, co2, voc_raw, pm1, pm10 = batch.pm25, batch.co2, batch.voc_raw, batch.pm1, batch.pm10
+    client_id, timestamp = batch.client_id, batch.timestamp
+    errors = batch.errors
+    k = 0
+    for i, frame in enumerate(frames):
+        if frame[:1] != b'#' or frame[-1:] != b'#':
+            errors.append((i, "缺少帧起始/结束符"))
+            continue
+        parts = frame[1:-1].split(b',')
+        if len(parts) != 7:
+            errors.append((i, f"数据段数量错误: 期望7个，实际{len(parts)}"))
+            continue
+        try:
+            temperature[k] = float(parts[0])
+            humidity[k] = float(parts[1])
+            pm25[k] = int(parts[2])
+            co2[k] = int(parts[3])
+            voc_raw[k] = int(parts[4])
+            pm1[k] = int(parts[5])
+            pm10[k] = int(parts[6])
+        except (ValueError, OverflowError) as e:
+            errors.append((i, f"数据值转换错误: {e}"))
+            continue
+        client_id[k] = client_ids[i]
+        timestamp[k] = timestamps[i]
+        k += 1
+    batch.size = k
+    return batch
+
+
+def describe_errors(batch, frames, client_ids=None, limit=3):
+    # 把一批中的解析错误汇总成一行日志；给出 client_ids 时附带来源地址
+    shown = []
+    for i, reason in batch.errors[:limit]:
+        source = f"[{batch.clients.get(client_ids[i])}] " if client_ids is not None else ""
+        shown.append(f"{source}#{i}: {reason} - {bytes(frames[i]).decode('utf-8', errors='ignore')}")
+    more = f" 等共 {len(batch.errors)} 条" if len(batch.errors) > limit else ""
+    return f"数据解析失败: {'; '.join(shown)}{more}"
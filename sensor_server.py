@@ -0,0 +1,574 @@
+import argparse
+import asyncio
+import collections
+import itertools
+import multiprocessing
+import multiprocessing.connection
+import os
+import signal
+import sys
+import time
+from array import array
+
+import sensor_channel
+from sensor_metrics import REGISTRY, LabeledCounter, run_profiled, start_metrics_http
+from sensor_protocol import FrameSplitter, describe_errors, parse_sensor_batch
+
+try:
+    import resource  # 仅 Unix；Windows 上 tcp.py 的界面同样要能导入本模块
+except ImportError:
+    resource = None
+
+# --- 配置 ---
+HOST = '0.0.0.0'
+PORT = 8269
+IDLE_TIMEOUT = 60         # 与 tcp.py 中 client_socket.settimeout(60) 保持一致
+MAX_CONNECTIONS = 16384   # 超过此连接数直接拒绝，保证内存有界
+MAX_BATCH = 4096          # 每批最多解析的帧数
+LISTEN_BACKLOG = 4096     # 原来的 listen(5) 在大量节点同时上线时会丢连接
+
+
+def raise_nofile_limit():
+    # 1 万个以上的连接需要足够的文件描述符，把软限制提到硬限制；没有 resource 模块 (Windows) 时返回 None
+    if resource is None:
+        return None
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+            soft = hard
+        except (ValueError, OSError):
+            pass
+    return soft
+
+
+# --- 单个客户端连接 (asyncio 协议对象，没有独立线程) ---
+# 使用 BufferedProtocol，事件循环直接 recv_into 到分帧器的缓冲区，避免每次接收都生成新的 bytes。
+class SensorConnection(asyncio.BufferedProtocol):
+    def __init__(self, server):
+        self.server = server
+        self.transport = None
+        self.address = None
+        self.splitter = FrameSplitter()
+        self.client_id = next(server.client_ids)
+        self.last_seen = server.clock
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.address = transport.get_extra_info('peername')
+        if not self.server.register(self):
+            transport.abort()
+        elif self.server.paused:
+            transport.pause_reading()
+
+    def get_buffer(self, sizehint):
+        return self.splitter.get_buffer(sizehint)
+
+    def buffer_updated(self, nbytes):
+        server = self.server
+        self.last_seen = server.clock
+        server.bytes_received += nbytes
+        splitter = self.splitter
+        splitter.buffer_updated(nbytes)
+        overflows = splitter.overflows
+        server.add_frames(self, splitter.frames())
+        if splitter.overflows != overflows:
+            server.log(f"[警告] 来自 {self.address} 的数据缓冲区过长且消息不完整，已丢弃。\n")
+
+    def connection_lost(self, exc):
+        self.server.unregister(self, exc)
+
+
+# --- 无界面的 asyncio 服务器 ---
+class SensorServer:
+    def __init__(self, host=HOST, port=PORT, on_batch=None, on_log=None,
+                 max_connections=MAX_CONNECTIONS, idle_timeout=IDLE_TIMEOUT, verbose=False, reuse_port=False,
+                 client_ids=None, client_metrics=False):
+        self.host = host
+        self.port = port
+        self.reuse_port = reuse_port  # 多个进程共享同一端口 (SO_REUSEPORT)
+        self.on_batch = on_batch  # 回调参数为 SensorBatch，返回 False 表示下游已满，服务器暂停读取
+        self.on_log = on_log if on_log is not None else (lambda message: print(message, end=''))
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
+        self.verbose = verbose  # 是否记录每个连接的建立/断开
+
+        self.connections = set()
+        # 多进程时每个 worker 使用互不重叠的客户端编号 (见 worker_main)
+        self.client_ids = client_ids if client_ids is not None else itertools.count(1)
+        self.clock = time.monotonic()  # 粗粒度时钟，由 _tick 每秒刷新，避免每次 recv 都取时间
+        self.loop = None
+        self.listening = False
+        self._stop_event = None
+        self._stop_requested = False
+        self.paused = False  # 下游通道已满，所有连接暂停读取 (TCP 流控把压力传回传感器)
+
+        # 待解析的帧: 在同一轮事件循环中收到的帧合成一批，在下一轮开始时统一解析
+        self._pending_frames = []
+        self._pending_ids = array('q')
+        self._pending_times = array('d')
+        self._pending_clients = {}
+        self._flush_scheduled = False
+
+        # 运行统计
+        self.accepted = 0
+        self.rejected = 0
+        self.bytes_received = 0
+        self.frames = 0
+        self.bad_frames = 0
+        self.pauses = 0
+        self._register_metrics(client_metrics)
+
+    def _register_metrics(self, client_metrics):
+        # 同名指标会替换上一个 SensorServer 注册的 (界面中可以反复启动/停止服务器)
+        REGISTRY.func('sensor_accepted_total', '已接受的连接数', lambda: self.accepted, 'counter')
+        REGISTRY.func('sensor_rejected_total', '因超过连接上限被拒绝的连接数', lambda: self.rejected, 'counter')
+        REGISTRY.func('sensor_active_connections', '当前活动连接数', lambda: len(self.connections))
+        REGISTRY.func('sensor_bytes_received_total', '接收的字节数', lambda: self.bytes_received, 'counter')
+        REGISTRY.func('sensor_frames_parsed_total', '解析成功的帧数', lambda: self.frames, 'counter')
+        REGISTRY.func('sensor_frames_failed_total', '解析失败的帧数', lambda: self.bad_frames, 'counter')
+        REGISTRY.func('sensor_backpressure_pauses_total', '因下游通道已满暂停读取的次数', lambda: self.pauses, 'counter')
+        REGISTRY.func('sensor_reading_paused', '当前是否暂停读取 (1/0)', lambda: int(self.paused))
+        self.parse_time = REGISTRY.histogram('sensor_parse_seconds', '每批 parse_sensor_batch 的耗时')
+        self.batch_frames = REGISTRY.histogram('sensor_batch_frames', '每批的帧数',
+                                               buckets=(1, 4, 16, 64, 256, 1024, 4096))
+        # 按客户端地址统计帧数 (Prometheus 中用 rate() 得到每个客户端的消息速率)，需额外计数，默认关闭
+        self.client_frames = None
+        if client_metrics:
+            self.client_frames = REGISTRY.add(LabeledCounter(
+                'sensor_client_frames_total', '每个客户端 (IP) 解析成功的帧数', 'client'))
+
+    # --- 日志 ---
+    def log(self, message):
+        self.on_log(message)
+
+    # --- 连接管理 ---
+    def register(self, conn):
+        if len(self.connections) >= self.max_connections:
+            self.rejected += 1
+            return False
+        self.connections.add(conn)
+        self.accepted += 1
+        if self.verbose:
+            self.log(f"[新连接] {conn.address} 已连接。\n")
+        return True
+
+    def unregister(self, conn, exc):
+        if conn not in self.connections:
+            return
+        self.connections.discard(conn)
+        if not self.verbose:
+            return
+        if isinstance(exc, ConnectionResetError):
+            self.log(f"[连接重置] {conn.address} 连接被重置。\n")
+        elif exc is not None:
+            self.log(f"[错误] 处理 {conn.address} 时发生错误: {exc}\n")
+        else:
+            self.log(f"[断开连接] {conn.address} 已断开。\n")
+
+    # --- 帧处理: 先攒批，再用 parse_sensor_batch 一次解析 ---
+    def add_frames(self, conn, frames):
+        pending = self._pending_frames
+        before = len(pending)
+        pending.extend(frames)
+        count = len(pending) - before
+        if not count:
+            return
+        self._pending_ids.extend(itertools.repeat(conn.client_id, count))
+        self._pending_times.extend(itertools.repeat(time.time(), count))
+        self._pending_clients[conn.client_id] = conn.address
+        if len(pending) >= MAX_BATCH:
+            self.flush()
+        elif not self._flush_scheduled:
+            self._flush_scheduled = True
+            self.loop.call_soon(self.flush)
+
+    def flush(self):
+        self._flush_scheduled = False
+        frames = self._pending_frames
+        if not frames:
+            return
+        client_ids = self._pending_ids
+        started = time.perf_counter()
+        batch = parse_sensor_batch(frames, client_ids, self._pending_times)
+        self.parse_time.observe(time.perf_counter() - started)
+        self.batch_frames.observe(len(frames))
+        batch.clients = self._pending_clients
+        self._pending_frames = []
+        self._pending_ids = array('q')
+        self._pending_times = array('d')
+        self._pending_clients = {}
+
+        self.frames += batch.size
+        if self.client_frames is not None and batch.size:
+            self._count_clients(batch)
+        if batch.errors:
+            self.bad_frames += len(batch.errors)
+            self.log(f"[批量解析] {describe_errors(batch, frames, client_ids)}\n")
+        if batch.size and self.on_batch is not None and self.on_batch(batch) is False:
+            self.pause_reading()
+
+    def _count_clients(self, batch):
+        for client_id, n in collections.Counter(batch.client_id[:batch.size]).items():
+            address = batch.clients.get(client_id)
+            self.client_frames.inc(address[0] if isinstance(address, tuple) else str(address), n)
+
+    # --- 背压: 下游通道满时暂停读取，消费者腾出空间后恢复 ---
+    def pause_reading(self):
+        if self.paused:
+            return
+        self.paused = True
+        self.pauses += 1
+        for conn in self.connections:
+            conn.transport.pause_reading()
+        if self.verbose:
+            self.log("[背压] 下游通道已满，暂停读取。\n")
+
+    def resume_reading(self):
+        if not self.paused:
+            return
+        self.paused = False
+        for conn in self.connections:
+            conn.last_seen = self.clock  # 暂停期间没有数据不算空闲
+            conn.transport.resume_reading()
+        if self.verbose:
+            self.log("[背压] 恢复读取。\n")
+
+    def request_resume(self):
+        # 通道的 space listener，在消费者线程中调用
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.resume_reading)
+
+    # --- 定时任务: 刷新时钟并关闭空闲连接 ---
+    async def _tick(self):
+        last_sweep = self.clock
+        while True:
+            await asyncio.sleep(1)
+            self.clock = time.monotonic()
+            if self.paused or self.clock - last_sweep < self.idle_timeout / 4:
+                continue
+            last_sweep = self.clock
+            deadline = self.clock - self.idle_timeout
+            for conn in [c for c in self.connections if c.last_seen < deadline]:
+                if self.verbose:
+                    self.log(f"[超时] {conn.address} 连接超时。\n")
+                conn.transport.close()
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+        if self._stop_requested:
+            self._stop_event.set()
+        server = await self.loop.create_server(
+            lambda: SensorConnection(self), self.host, self.port,
+            backlog=LISTEN_BACKLOG, reuse_address=True, reuse_port=self.reuse_port or None)
+        self.listening = True
+        self.log(f"[状态] 服务器正在监听 {self.host}:{self.port}\n")
+        ticker = asyncio.create_task(self._tick())
+        try:
+            await self._stop_event.wait()
+        finally:
+            ticker.cancel()
+            self.flush()
+            server.close()
+            for conn in list(self.connections):
+                conn.transport.close()
+            await server.wait_closed()
+            self.listening = False
+            self.log("[状态] 服务器已停止。\n")
+
+    def stop(self):
+        # 可以从其他线程调用
+        self._stop_requested = True
+        if self.loop is not None and self._stop_event is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._stop_event.set)
+
+    def run(self):
+        asyncio.run(self.serve())
+
+
+# --- 周期性打印统计信息 ---
+async def report_stats(server, interval):
+    last_frames = server.frames
+    last_time = time.monotonic()
+    while True:
+        await asyncio.sleep(interval)
+        now = time.monotonic()
+        rate = (server.frames - last_frames) / (now - last_time)
+        last_frames, last_time = server.frames, now
+        server.log(f"[统计] 活动连接 {len(server.connections)}, 累计帧 {server.frames}, "
+                   f"失败 {server.bad_frames}, 速率 {rate:.0f} 帧/秒, 背压暂停 {server.pauses} 次\n")
+        log_channels(server.log)
+
+
+def log_channels(on_log):
+    for channel in sensor_channel.CHANNELS:
+        on_log(f"[通道] {channel.summary()}\n")
+
+
+async def run_headless(server, stats_interval):
+    reporter = asyncio.create_task(report_stats(server, stats_interval)) if stats_interval > 0 else None
+    try:
+        await server.serve()
+    finally:
+        if reporter:
+            reporter.cancel()
+
+
+# --- 数据输出 (sink) ---
+# 每个 sink 提供 put(batch) (线程中调用，可能等待)、offer(batch) (事件循环中调用，返回 False 表示已满)
+# 与 close()，由 --sink 参数创建。
+class StdoutSink:
+    # 每条读数输出一行 CSV: 时间戳,客户端,温度,湿度,PM2.5,CO2,VOC,PM1,PM10
+    def put(self, batch):
+        lines = []
+        for k in range(batch.size):
+            address = batch.clients.get(batch.client_id[k])
+            host = address[0] if isinstance(address, tuple) else address
+            lines.append(f"{batch.timestamp[k]:.3f},{host},{batch.temperature[k]},{batch.humidity[k]},"
+                         f"{batch.pm25[k]},{batch.co2[k]},{batch.voc_raw[k]},{batch.pm1[k]},{batch.pm10[k]}\n")
+        sys.stdout.write("".join(lines))
+
+    def offer(self, batch):
+        self.put(batch)
+        return True
+
+    def close(self):
+        sys.stdout.flush()
+
+
+def make_sink(spec, on_log=None):
+    kind, _, arg = spec.partition(':')
+    if kind == 'store':
+        from sensor_store import StoreSink  # 只有需要时才导入
+        return StoreSink(arg or 'sensor_data', on_log=on_log)
+    if kind == 'stdout':
+        return StdoutSink()
+    raise ValueError(f"未知的 sink: {spec} (可选: store[:DIR], stdout)")
+
+
+class SinkFanout:
+    def __init__(self, sinks):
+        self.sinks = sinks
+
+    def put(self, batch):
+        for sink in self.sinks:
+            sink.put(batch)
+
+    def offer(self, batch):
+        # 每个 sink 都要收到这一批，任一 sink 已满即返回 False
+        return all([sink.offer(batch) for sink in self.sinks])
+
+    def add_space_listener(self, callback):
+        for sink in self.sinks:
+            channel = getattr(sink, 'channel', None)
+            if channel is not None:
+                channel.add_space_listener(callback)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+
+# --- 运行方式 ---
+def stderr_logger(prefix=""):
+    # 日志写到 stderr，stdout 留给 --sink stdout
+    return lambda message: print(prefix + message, end='', file=sys.stderr, flush=True)
+
+
+def profile_path(profile, suffix=None):
+    # 多进程时每个进程写各自的文件: out.prof -> out.worker0.prof
+    if not profile or suffix is None:
+        return profile
+    root, ext = os.path.splitext(profile)
+    return f"{root}.{suffix}{ext}"
+
+
+def start_metrics(port, on_log, label=""):
+    if not port:
+        return None
+    try:
+        httpd = start_metrics_http(port)
+    except OSError as e:
+        on_log(f"[警告] 无法在端口 {port} 提供指标: {e}\n")
+        return None
+    on_log(f"[状态] {label}指标地址 http://{httpd.server_address[0]}:{port}/metrics\n")
+    return httpd
+
+
+def serve(server, stats_interval, profile=None):
+    # 在当前进程中运行服务器直到 Ctrl-C / SIGTERM；profile 为文件名时在 cProfile 下运行事件循环
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda signum, frame: server.stop())
+    try:
+        run_profiled(profile, asyncio.run, run_headless(server, stats_interval))
+    finally:
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, signal.SIG_IGN)
+
+
+def serve_forever(args):
+    # 单进程: 无界面服务器 + sinks
+    on_log = stderr_logger()
+    sinks = SinkFanout([make_sink(spec, on_log) for spec in args.sink])
+    server = SensorServer(args.host, args.port, on_batch=sinks.offer if sinks.sinks else None, on_log=on_log,
+                          max_connections=args.max_connections, verbose=args.verbose,
+                          client_metrics=args.client_metrics)
+    sinks.add_space_listener(server.request_resume)
+    start_metrics(args.metrics_port, on_log)
+    try:
+        serve(server, args.stats_interval, args.profile)
+    finally:
+        sinks.close()
+
+
+def worker_main(host, port, worker_id, workers, conn, max_connections=MAX_CONNECTIONS,
+                verbose=False, stats_interval=0, metrics_port=None, client_metrics=False, profile=None):
+    # worker 进程: 接收、分帧、解析，把解析好的批次通过管道发给汇聚进程。
+    # 汇聚进程的通道满时不再读管道，conn.send 阻塞，worker 也就不再读 socket，压力同样经 TCP 传回。
+    # 指标端口: 汇聚进程用 metrics_port，第 i 个 worker 用 metrics_port + 1 + i
+    on_log = stderr_logger(f"[worker {worker_id}] ")
+    server = SensorServer(host, port, on_batch=conn.send, on_log=on_log,
+                          max_connections=max_connections, verbose=verbose, reuse_port=True,
+                          client_ids=itertools.count(worker_id + 1, workers), client_metrics=client_metrics)
+    start_metrics(metrics_port and metrics_port + 1 + worker_id, on_log)
+    try:
+        serve(server, stats_interval, profile_path(profile, f"worker{worker_id}"))
+    finally:
+        conn.close()
+
+
+def start_workers(host, port, workers, **kwargs):
+    # 启动 workers 个共享端口 (SO_REUSEPORT) 的 worker 进程，返回 (进程列表, 管道接收端列表)
+    procs, conns = [], []
+    for i in range(workers):
+        recv_conn, send_conn = multiprocessing.Pipe(duplex=False)
+        proc = multiprocessing.Process(target=worker_main, args=(host, port, i, workers, send_conn),
+                                       kwargs=kwargs, name=f"sensor-worker-{i}")
+        proc.start()
+        send_conn.close()  # 父进程只保留接收端，worker 退出后 recv 会得到 EOFError
+        procs.append(proc)
+        conns.append(recv_conn)
+    return procs, conns
+
+
+def aggregate(conns, on_batch, stats_interval=0, on_log=None):
+    # 汇聚进程: 从所有 worker 管道接收批次并交给 on_batch，直到所有 worker 退出；返回累计行数
+    rows = 0
+    last_rows, last_time = 0, time.monotonic()
+    conns = list(conns)
+    while conns:
+        for conn in multiprocessing.connection.wait(conns, timeout=stats_interval or None):
+            try:
+                batch = conn.recv()
+            except EOFError:
+                conns.remove(conn)
+                continue
+            rows += batch.size
+            on_batch(batch)
+        now = time.monotonic()
+        if stats_interval and on_log and now - last_time >= stats_interval:
+            on_log(f"[汇聚] worker {len(conns)} 个, 累计 {rows} 条, 速率 {(rows - last_rows) / (now - last_time):.0f} 条/秒\n")
+            log_channels(on_log)
+            last_rows, last_time = rows, now
+    return rows
+
+
+def run_workers(args):
+    # 多进程: 内核通过 SO_REUSEPORT 把连接分给各 worker，各自分帧解析后把批次发给本进程统一写 sinks
+    on_log = stderr_logger()
+    sinks = SinkFanout([make_sink(spec, on_log) for spec in args.sink])
+    procs, conns = start_workers(args.host, args.port, args.workers, max_connections=args.max_connections,
+                                 verbose=args.verbose, stats_interval=args.stats_interval,
+                                 metrics_port=args.metrics_port, client_metrics=args.client_metrics,
+                                 profile=args.profile)
+    aggregated = REGISTRY.counter('sensor_aggregated_rows_total', '汇聚进程从 worker 收到的读数条数')
+    start_metrics(args.metrics_port, on_log, "汇聚进程")
+
+    def on_batch(batch):
+        aggregated.inc(batch.size)
+        sinks.put(batch)
+
+    def shutdown(signum, frame):
+        # 通知所有 worker 正常退出，汇聚循环在所有管道关闭后结束
+        for proc in procs:
+            if proc.is_alive():
+                proc.terminate()
+
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, shutdown)
+    try:
+        run_profiled(profile_path(args.profile, "aggregator"), aggregate, conns, on_batch, args.stats_interval, on_log)
+    finally:
+        for proc in procs:
+            proc.join()
+        sinks.close()
+
+
+def run_with_gui(args):
+    from tcp import run_gui  # 只有 --gui 时才导入 tkinter / PIL
+    sinks = [make_sink(spec) for spec in args.sink]
+    start_metrics(args.metrics_port, stderr_logger())
+    try:
+        run_gui(args.host, args.port, sinks, client_metrics=args.client_metrics, profile=args.profile)
+    finally:
+        for sink in sinks:
+            sink.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="传感器数据接收服务器 (asyncio，默认无界面)。")
+    parser.add_argument('--host', default=HOST, help=f'监听地址 (默认: {HOST})')
+    parser.add_argument('--port', type=int, default=PORT, help=f'监听端口 (默认: {PORT})')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='工作进程数，大于 1 时通过 SO_REUSEPORT 共享端口，解析结果汇聚到主进程写 sinks (默认: 1)')
+    parser.add_argument('--sink', action='append', default=[], metavar='SPEC',
+                        help='数据输出，可重复: store[:DIR] 写入 SQLite 存储 (默认目录 sensor_data)；'
+                             'stdout 输出 CSV 行')
+    parser.add_argument('--channel', action='append', default=[], metavar='NAME=POLICY[:SIZE]',
+                        help='设置有界通道的溢出策略与容量，可重复。通道: store (默认 block)、gui-data (默认 drop-oldest)、'
+                             'gui-log (默认 drop-oldest，不支持 block)；策略: drop-oldest、drop-newest、block')
+    parser.add_argument('--gui', action='store_true', help='同时打开 Tk 图形界面 (需要 tkinter 与 Pillow)')
+    parser.add_argument('--max-connections', type=int, default=MAX_CONNECTIONS,
+                        help=f'每个进程的最大并发连接数 (默认: {MAX_CONNECTIONS})')
+    parser.add_argument('--stats-interval', type=float, default=5.0,
+                        help='统计信息打印间隔秒数，0 表示不打印 (默认: 5)')
+    parser.add_argument('--verbose', action='store_true', help='记录每个连接的建立与断开')
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help='在 127.0.0.1 的该端口以 Prometheus 文本格式提供 /metrics；'
+                             '多进程时第 i 个 worker 使用 端口+1+i')
+    parser.add_argument('--client-metrics', action='store_true',
+                        help='额外按客户端地址统计帧数 (sensor_client_frames_total)')
+    parser.add_argument('--profile', metavar='FILE',
+                        help='在 cProfile 下运行接收线程，退出时写出 pstats 文件 (多进程时按 worker 加后缀)')
+    args = parser.parse_args()
+
+    if args.workers < 1:
+        parser.error("--workers 至少为 1")
+    if args.gui and args.workers > 1:
+        parser.error("--gui 只能与单进程模式 (--workers 1) 一起使用")
+    for spec in args.sink:
+        if spec.partition(':')[0] not in ('store', 'stdout'):
+            parser.error(f"未知的 sink: {spec}")
+    for spec in args.channel:
+        try:
+            sensor_channel.configure_spec(spec)
+        except ValueError as e:
+            parser.error(f"--channel {spec}: {e}")
+    if sensor_channel.CHANNEL_OVERRIDES.get('gui-log', {}).get('policy') == sensor_channel.BLOCK:
+        parser.error("gui-log 通道不支持 block 策略")
+
+    nofile = raise_nofile_limit()
+    if nofile is not None and nofile < args.max_connections:
+        stderr_logger()(f"[警告] 文件描述符上限为 {nofile}，不足以支撑 {args.max_connections} 个连接。\n")
+
+    if args.gui:
+        run_with_gui(args)
+    elif args.workers > 1:
+        run_workers(args)
+    else:
+        serve_forever(args)
+
+
+if __name__ == "__main__":
+    main()
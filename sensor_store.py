@@ -0,0 +1,215 @@
+import argparse
+import os
+import sqlite3
+import threading
+import time
+
+from sensor_channel import BLOCK, Channel, Closed, Empty
+from sensor_protocol import SENSOR_FIELDS
+
+# --- 传感器数据持久化 ---
+# 原始数据按天分文件存放 (readings-YYYYMMDD.sqlite，UTC 日期)，表内以 (client, ts, seq) 为主键聚簇，
+# 同一客户端的数据在文件中连续存放，相当于按 天 x 客户端地址 分区。
+# 1 分钟 / 1 小时的 min/mean/max 汇总在每次写入时由 SQLite 增量更新到 rollups.sqlite，
+# 查询 "客户端 X 最近 24 小时的 PM2.5" 只读汇总表，不扫描原始数据。
+# 所有数据库都使用 WAL 模式，按批写入。
+
+RESOLUTIONS = {'1m': 60, '1h': 3600}
+CHANNEL_SIZE = 256  # 写入线程前最多积压的批次数 (每批至多 MAX_BATCH 条)
+DAY_SECONDS = 86400
+MAX_ATTACHED_DAYS = 4
+
+_COLUMNS = ', '.join(SENSOR_FIELDS)
+_ROLLUP_COLUMNS = ', '.join(f"{f}_min, {f}_sum, {f}_max" for f in SENSOR_FIELDS)
+
+
+def _rollup_upsert(table, select):
+    updates = ', '.join(
+        f"{f}_min = MIN({f}_min, excluded.{f}_min), {f}_sum = {f}_sum + excluded.{f}_sum, "
+        f"{f}_max = MAX({f}_max, excluded.{f}_max)" for f in SENSOR_FIELDS)
+    # WHERE true 用于消除 INSERT ... SELECT ... ON CONFLICT 的语法歧义
+    return (f"INSERT INTO {table} (client, bucket, n, {_ROLLUP_COLUMNS}) {select} WHERE true GROUP BY 1, 2 "
+            f"ON CONFLICT (client, bucket) DO UPDATE SET n = n + excluded.n, {updates}")
+
+
+# 先把本批原始数据聚合到 1 分钟 (temp.staging_1m)，1 小时汇总再由 1 分钟汇总合并得到，原始数据只聚合一次
+_STAGE_1M = ("INSERT INTO temp.staging_1m SELECT client, CAST(ts / 60 AS INTEGER) * 60, COUNT(*), "
+             + ', '.join(f"MIN({f}), SUM({f}), MAX({f})" for f in SENSOR_FIELDS)
+             + " FROM temp.staging GROUP BY 1, 2")
+_ROLLUP_1M = _rollup_upsert('rollup_1m', f"SELECT client, bucket, n, {_ROLLUP_COLUMNS} FROM temp.staging_1m")
+_ROLLUP_1H = _rollup_upsert('rollup_1h', "SELECT client, bucket / 3600 * 3600, SUM(n), "
+                            + ', '.join(f"MIN({f}_min), SUM({f}_sum), MAX({f}_max)" for f in SENSOR_FIELDS)
+                            + " FROM temp.staging_1m")
+
+
+class SensorStore:
+    def __init__(self, root='sensor_data'):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(root, 'rollups.sqlite'), check_same_thread=False)
+        self._configure(self.conn, 'main')
+        for name in RESOLUTIONS:
+            self.conn.execute(f"CREATE TABLE IF NOT EXISTS rollup_{name} (client TEXT, bucket INTEGER, n INTEGER, "
+                              f"{_ROLLUP_COLUMNS}, PRIMARY KEY (client, bucket)) WITHOUT ROWID")
+        self.conn.execute(f"CREATE TEMP TABLE staging (seq INTEGER PRIMARY KEY, client TEXT, ts REAL, {_COLUMNS})")
+        self.conn.execute(f"CREATE TEMP TABLE staging_1m (client TEXT, bucket INTEGER, n INTEGER, {_ROLLUP_COLUMNS})")
+        self._days = {}  # 天序号 -> 已 ATTACH 的 schema 名
+        # seq 的高位是进程号，多个写入进程 (sensor_server.py --workers) 共用同一组文件时主键不会冲突
+        self._seq = os.getpid() << 32
+        self.rows_written = 0
+
+    @staticmethod
+    def _configure(conn, schema):
+        conn.execute(f"PRAGMA {schema}.journal_mode=WAL")
+        conn.execute(f"PRAGMA {schema}.synchronous=NORMAL")
+
+    def _day_schema(self, day):
+        schema = self._days.get(day)
+        if schema is not None:
+            return schema
+        if len(self._days) >= MAX_ATTACHED_DAYS:
+            oldest = min(self._days)
+            self.conn.execute(f"DETACH DATABASE {self._days.pop(oldest)}")
+        name = time.strftime('%Y%m%d', time.gmtime(day * DAY_SECONDS))
+        schema = f"d{name}"
+        self.conn.execute("ATTACH DATABASE ? AS " + schema, (os.path.join(self.root, f"readings-{name}.sqlite"),))
+        self._configure(self.conn, schema)
+        self.conn.execute(f"CREATE TABLE IF NOT EXISTS {schema}.readings (client TEXT, ts REAL, seq INTEGER, "
+                          f"{_COLUMNS}, PRIMARY KEY (client, ts, seq)) WITHOUT ROWID")
+        self._days[day] = schema
+        return schema
+
+    # --- 写入 ---
+    def append(self, batches):
+        # batches: SensorBatch 列表，在一个事务内写入原始数据并更新汇总
+        rows = []
+        first_ts, last_ts = float('inf'), float('-inf')
+        for batch in batches:
+            n = batch.size
+            if not n:
+                continue
+            first_ts = min(first_ts, min(batch.timestamp[:n]))
+            last_ts = max(last_ts, max(batch.timestamp[:n]))
+            clients = {cid: (addr[0] if isinstance(addr, tuple) else str(addr))
+                       for cid, addr in batch.clients.items()}
+            hosts = [clients.get(cid, '?') for cid in batch.client_id[:n]]
+            rows.extend(zip(hosts, batch.timestamp[:n], *(getattr(batch, f)[:n] for f in SENSOR_FIELDS)))
+        if not rows:
+            return 0
+        conn = self.conn
+        # ATTACH 与切换 WAL 不能在事务中进行，先准备好本批涉及的日期分区
+        days = range(int(first_ts // DAY_SECONDS), int(last_ts // DAY_SECONDS) + 1)
+        schemas = [(day, self._day_schema(day)) for day in days]
+        with conn:
+            conn.executemany(f"INSERT INTO temp.staging (client, ts, {_COLUMNS}) "
+                             f"VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            for day, schema in schemas:
+                conn.execute(f"INSERT INTO {schema}.readings (client, ts, seq, {_COLUMNS}) "
+                             f"SELECT client, ts, seq + ?, {_COLUMNS} FROM temp.staging "
+                             f"WHERE ts >= ? AND ts < ?", (self._seq, day * DAY_SECONDS, (day + 1) * DAY_SECONDS))
+            conn.execute(_STAGE_1M)
+            conn.execute(_ROLLUP_1M)
+            conn.execute(_ROLLUP_1H)
+            conn.execute("DELETE FROM temp.staging")
+            conn.execute("DELETE FROM temp.staging_1m")
+        self._seq += len(rows)
+        self.rows_written += len(rows)
+        return len(rows)
+
+    # --- 查询 ---
+    def query(self, client, field='pm25', start=None, end=None, resolution='1h'):
+        # 返回 [(bucket 起始时间戳, 样本数, min, mean, max), ...]，只读汇总表
+        if field not in SENSOR_FIELDS:
+            raise ValueError(f"未知字段: {field}")
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"未知汇总粒度: {resolution} (可选: {', '.join(RESOLUTIONS)})")
+        end = time.time() if end is None else end
+        start = end - DAY_SECONDS if start is None else start
+        seconds = RESOLUTIONS[resolution]
+        cur = self.conn.execute(
+            f"SELECT bucket, n, {field}_min, {field}_sum * 1.0 / n, {field}_max FROM rollup_{resolution} "
+            f"WHERE client = ? AND bucket >= ? AND bucket < ? ORDER BY bucket",
+            (client, int(start // seconds) * seconds, end))
+        return cur.fetchall()
+
+    def clients(self):
+        return [c for (c,) in self.conn.execute("SELECT DISTINCT client FROM rollup_1h ORDER BY client")]
+
+    def close(self):
+        self.conn.close()
+
+
+# --- 写入线程 ---
+# 服务器的 on_batch 回调只把批次放进有界通道 "store"，写库在独立线程里按时间/行数攒批完成，不阻塞事件循环。
+# 通道默认使用 block 策略: 磁盘跟不上时不丢数据，而是让服务器暂停读取 socket (见 sensor_channel.py)。
+class StoreSink:
+    def __init__(self, root, flush_interval=0.5, flush_rows=20000, on_log=None):
+        self.root = root
+        self.flush_interval = flush_interval
+        self.flush_rows = flush_rows
+        self.on_log = on_log if on_log is not None else (lambda message: print(message, end=''))
+        self.channel = Channel('store', CHANNEL_SIZE, BLOCK)
+        self.thread = threading.Thread(target=self._run, name='sensor-store', daemon=True)
+        self.thread.start()
+
+    def put(self, batch):
+        # 线程中调用 (例如多进程汇聚循环)，block 策略下等待写入线程腾出空间
+        self.channel.put(batch)
+
+    def offer(self, batch):
+        # 事件循环中调用，返回 False 表示通道已满，调用方应暂停读取
+        return self.channel.offer(batch)
+
+    def close(self):
+        self.channel.close()
+        self.thread.join()
+
+    def _run(self):
+        store = SensorStore(self.root)
+        pending, rows = [], 0
+        deadline = time.monotonic() + self.flush_interval
+        running = True
+        while running:
+            try:
+                item = self.channel.get(timeout=max(0.0, deadline - time.monotonic()))
+                pending.append(item)
+                rows += item.size
+            except Closed:
+                running = False
+            except Empty:
+                pass
+            if pending and (not running or rows >= self.flush_rows or time.monotonic() >= deadline):
+                try:
+                    store.append(pending)
+                except sqlite3.Error as e:
+                    self.on_log(f"[存储错误] 写入 {rows} 条数据失败: {e}\n")
+                pending, rows = [], 0
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flush_interval
+        store.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="查询传感器数据汇总 (不扫描原始数据)。")
+    parser.add_argument('client', nargs='?', help='客户端地址 (IP)，省略时列出所有客户端')
+    parser.add_argument('--root', default='sensor_data', help='数据目录 (默认: sensor_data)')
+    parser.add_argument('--field', default='pm25', choices=SENSOR_FIELDS, help='字段 (默认: pm25)')
+    parser.add_argument('--hours', type=float, default=24, help='查询最近多少小时 (默认: 24)')
+    parser.add_argument('--resolution', default='1h', choices=list(RESOLUTIONS), help='汇总粒度 (默认: 1h)')
+    args = parser.parse_args()
+
+    store = SensorStore(args.root)
+    if args.client is None:
+        for client in store.clients():
+            print(client)
+        return
+    end = time.time()
+    rows = store.query(args.client, args.field, end - args.hours * 3600, end, args.resolution)
+    print(f"{'时间':<20} {'样本数':>8} {'min':>10} {'mean':>10} {'max':>10}")
+    for bucket, n, low, mean, high in rows:
+        stamp = time.strftime('%Y-%m-%d %H:%M', time.localtime(bucket))
+        print(f"{stamp:<20} {n:>8} {low:>10.2f} {mean:>10.2f} {high:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,136 +1,225 @@
+import argparse
+import hashlib
+import json
 import os
 import shutil
-import numpy as np
+import time
 
+import numpy as np
 
-def read_poscar(filename):
+from poscar import PoscarTemplate, read, write_atomic
+
+# --- 应变系列 ---
+# 对初始 POSCAR 的晶格施加一系列应变，每个应变一个目录 (含 scf、scf/band 两级子目录):
+#   uniaxial  分别拉伸 a、b 晶格矢量 (比例 s)，写入 mobility-x/<s>、mobility-y/<s> 及 OPTCELL (默认，与原脚本相同)
+#   biaxial   a、b 分别按 sa、sb 拉伸的二维网格，biaxial/<sa>_<sb>
+#   shear     面内剪切 (工程切应变 γ，ε_xy = γ/2)，shear/<γ>
+#   tensor    任意应变张量 (Voigt: xx yy zz yz xz xy，笛卡尔坐标) 乘以每个幅度，tensor/<幅度>
+# a、b 的拉伸作用于晶格矢量本身 (L' = S L)，剪切与任意张量作用于笛卡尔坐标 (L' = L (I + ε)ᵀ)；
+# POSCAR 由 poscar.py 读写: 晶格以外的部分只格式化一次，每个应变只代入新的晶格。
+# INCAR-*、KPOINTS*、POTCAR 等共享输入默认用硬链接 (跨文件系统时退为符号链接)，不再每个目录复制一份。
+# 各目录的输入 (POSCAR 内容、共享文件的大小与修改时间、链接方式) 记录在 strain.json，重新运行时跳过未变化的目录。
+
+MANIFEST = 'strain.json'
+MANIFEST_VERSION = 1
+# 每一级目录: (相对路径, [(源文件, 目标文件名), ...])
+LEVELS = (
+    ('', [('INCAR-opt', 'INCAR'), ('KPOINTS', 'KPOINTS'), ('POTCAR', 'POTCAR')]),
+    ('scf', [('INCAR-scf', 'INCAR'), ('KPOINTS', 'KPOINTS'), ('POTCAR', 'POTCAR')]),
+    (os.path.join('scf', 'band'), [('INCAR-band', 'INCAR'), ('KPOINTS-band', 'KPOINTS'), ('POTCAR', 'POTCAR')]),
+)
+# uniaxial: 轴 -> (晶格矢量序号, 目录, OPTCELL)
+AXES = {'a': (0, 'mobility-x', '010'), 'b': (1, 'mobility-y', '100')}
+DEFAULT_RANGES = {
+    'uniaxial': (0.985, 1.0151, 0.005),  # 拉伸比例
+    'biaxial': (0.985, 1.0151, 0.005),
+    'shear': (-0.02, 0.0201, 0.01),  # 应变幅度
+    'tensor': (-0.02, 0.0201, 0.01),
+}
+LINK_MODES = ('hardlink', 'symlink', 'reflink', 'copy')
+FICLONE = 0x40049409  # Linux ioctl: 共享数据块的副本 (btrfs、xfs 等)
+
+
+def scale_vectors(lattice, scales):
+    # 按比例拉伸各晶格矢量: L' = diag(scales) L
+    return lattice * np.asarray(scales, dtype=float)[:, None]
+
+
+def deform(lattice, strain):
+    # 笛卡尔应变张量 ε (3x3 对称): L' = L (I + ε)ᵀ
+    return lattice @ (np.eye(3) + strain).T
+
+
+def voigt(components):
+    xx, yy, zz, yz, xz, xy = components
+    return np.array([[xx, xy, xz], [xy, yy, yz], [xz, yz, zz]], dtype=float)
+
+
+def strain_series(mode, lattice, values, axes=('a', 'b'), tensor=None):
+    # 返回 [(目录, 新晶格, OPTCELL 内容或 None, 应变描述), ...]
+    series = []
+    if mode == 'uniaxial':
+        for value in values:
+            for axis in axes:
+                index, folder, optcell = AXES[axis]
+                scales = np.ones(3)
+                scales[index] = value
+                series.append((os.path.join(folder, f'{value:.3f}'), scale_vectors(lattice, scales), optcell,
+                               {'axis': axis, 'scale': float(value)}))
+    elif mode == 'biaxial':
+        for sa in values:
+            for sb in values:
+                series.append((os.path.join('biaxial', f'{sa:.3f}_{sb:.3f}'), scale_vectors(lattice, [sa, sb, 1.0]),
+                               None, {'scale': [float(sa), float(sb)]}))
+    elif mode == 'shear':
+        for gamma in values:
+            series.append((os.path.join('shear', f'{gamma:.3f}'), deform(lattice, voigt([0, 0, 0, 0, 0, gamma / 2])),
+                           None, {'gamma': float(gamma)}))
+    else:
+        for amplitude in values:
+            strain = amplitude * voigt(tensor)
+            series.append((os.path.join('tensor', f'{amplitude:.4f}'), deform(lattice, strain), None,
+                           {'amplitude': float(amplitude), 'strain': strain.tolist()}))
+    return series
+
+
+# --- 共享输入文件 ---
+def reflink(src, dst):
+    import fcntl  # 仅 Unix；其他平台 ImportError 不是 OSError，在 place 中一并处理
+    with open(src, 'rb') as s, open(dst, 'wb') as d:
+        fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+
+
+def place(src, dst, mode):
+    # 把 src 以 mode 方式放到 dst (先建临时文件再 os.replace)，返回实际使用的方式
+    tmp = f"{dst}.{os.getpid()}.tmp"
+    if os.path.lexists(tmp):
+        os.remove(tmp)
+    used = mode
+    if mode == 'hardlink':
+        try:
+            os.link(src, tmp)
+        except OSError:
+            used = 'symlink'  # 跨文件系统或不支持硬链接
+    if used == 'reflink':
+        try:
+            reflink(src, tmp)
+        except (OSError, ImportError):
+            used = 'copy'
+    if used == 'symlink':
+        os.symlink(os.path.relpath(src, os.path.dirname(dst)), tmp)
+    elif used == 'copy':
+        shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
+    return used
+
+
+def fingerprint(paths):
+    # 共享文件的 (大小, 修改时间)；不存在的为 None
+    result = {}
+    for path in paths:
+        try:
+            st = os.stat(path)
+            result[path] = [st.st_size, st.st_mtime_ns]
+        except FileNotFoundError:
+            result[path] = None
+    return result
+
+
+def input_key(text, optcell, stats, link):
+    digest = hashlib.sha1()
+    digest.update(text.encode())
+    digest.update(repr((optcell, sorted(stats.items()), link)).encode())
+    return digest.hexdigest()
+
+
+def load_manifest(path):
+    try:
+        with open(path) as f:
+            data = json.load(f)
+        if data.get('version') != MANIFEST_VERSION:
+            return {}
+        return data['directories']
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def generate(root, structure, series, link='hardlink', force=False):
+    # 返回 (写出的目录数, 跳过的目录数, 各链接方式的文件数)
+    template = PoscarTemplate(structure, lattice=True)
+    sources = sorted({src for _, files in LEVELS for src, _ in files})
+    stats = fingerprint([os.path.join(root, src) for src in sources])
+    stats = {os.path.basename(path): value for path, value in stats.items()}
+    manifest_path = os.path.join(root, MANIFEST)
+    previous = {} if force else load_manifest(manifest_path)
+    directories = {}
+    written = skipped = 0
+    used = {}
+    for folder, new_lattice, optcell, description in series:
+        text = template.format(lattice=new_lattice)
+        key = input_key(text, optcell, stats, link)
+        directory = os.path.join(root, folder)
+        directories[folder] = {'key': key, 'lattice': new_lattice.tolist(), **description}
+        if previous.get(folder, {}).get('key') == key and os.path.exists(os.path.join(directory, 'POSCAR')):
+            skipped += 1
+            continue
+        for level, files in LEVELS:
+            target = os.path.join(directory, level)
+            os.makedirs(target, exist_ok=True)
+            for src, name in files:
+                if stats[src] is None:
+                    continue
+                mode = place(os.path.join(root, src), os.path.join(target, name), link)
+                used[mode] = used.get(mode, 0) + 1
+        write_atomic(os.path.join(directory, 'POSCAR'), text)
+        if optcell is not None:
+            write_atomic(os.path.join(directory, 'OPTCELL'), optcell)
+        written += 1
+    previous.update(directories)
+    write_atomic(manifest_path, json.dumps({'version': MANIFEST_VERSION, 'sources': stats, 'link': link,
+                                            'generated_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+                                            'directories': previous}, indent=1) + '\n')
+    return written, skipped, used
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成应变系列的 POSCAR 及计算目录 (单轴、双轴、剪切或任意应变张量)。")
+    parser.add_argument('--mode', choices=list(DEFAULT_RANGES), default='uniaxial',
+                        help='uniaxial: 分别拉伸 a、b (mobility-x/y，默认)；biaxial: a、b 拉伸比例的二维网格；'
+                             'shear: 面内剪切；tensor: --tensor 给出的应变张量乘以各幅度')
+    parser.add_argument('--range', nargs=3, type=float, metavar=('START', 'STOP', 'STEP'),
+                        help='np.arange 的取值范围: uniaxial/biaxial 为拉伸比例 (默认 0.985 1.0151 0.005)，'
+                             'shear 为工程切应变 γ、tensor 为幅度 (默认 -0.02 0.0201 0.01)')
+    parser.add_argument('--values', nargs='+', type=float, help='直接给出取值 (代替 --range)')
+    parser.add_argument('--axes', nargs='+', choices=list(AXES), default=['a', 'b'],
+                        help='uniaxial 拉伸的晶格矢量 (默认: a b)')
+    parser.add_argument('--tensor', nargs=6, type=float, metavar=('XX', 'YY', 'ZZ', 'YZ', 'XZ', 'XY'),
+                        help='tensor 模式的应变张量 (Voigt 顺序，张量分量而非工程切应变)')
+    parser.add_argument('--link', choices=LINK_MODES, default='hardlink',
+                        help='共享输入文件的放置方式 (默认: hardlink，跨文件系统时退为 symlink；'
+                             'reflink 不支持时退为 copy)')
+    parser.add_argument('--root', default=os.path.dirname(os.path.abspath(__file__)),
+                        help='含 POSCAR、INCAR-*、KPOINTS*、POTCAR 的目录，应变目录也建在这里 (默认: 脚本所在目录)')
+    parser.add_argument('--force', action='store_true', help=f'忽略 {MANIFEST}，重新生成所有目录')
+    args = parser.parse_args()
+    if args.mode == 'tensor' and args.tensor is None:
+        parser.error("tensor 模式需要 --tensor")
+
+    # 读取初始的POSCAR文件
     try:
-        with open(filename, 'r') as f:
-            lines = f.readlines()
-        return lines
-    except FileNotFoundError:
-        print(f"Error: The file {filename} was not found.")
-        return None
-
-
-def write_poscar(lines, directory, filename='POSCAR'):
-    os.makedirs(directory, exist_ok=True)
-    filepath = os.path.join(directory, filename)
-    with open(filepath, 'w') as f:
-        f.writelines(lines)
-
-
-def write_optcell(directory, content):
-    filepath = os.path.join(directory, 'OPTCELL')
-    with open(filepath, 'w') as f:
-        f.write(content)
-
-
-def apply_strain(lines, strain_a, strain_b):
-    # Modify the lattice vectors based on strain
-    a_vector = list(map(float, lines[2].split()))
-    b_vector = list(map(float, lines[3].split()))
-
-    # Apply strain
-    a_vector[0] *= strain_a
-    b_vector[0] *= strain_b
-    b_vector[1] *= strain_b
-
-    # Update the lines with new lattice vectors
-    lines[2] = "   {:.10f} {:.10f} {:.10f}\n".format(*a_vector)
-    lines[3] = "   {:.10f} {:.10f} {:.10f}\n".format(*b_vector)
-
-    return lines
-
-
-def copy_and_rename_files(src_files, dest_dir, dest_names):
-    os.makedirs(dest_dir, exist_ok=True)
-    for src_file, dest_name in zip(src_files, dest_names):
-        if os.path.exists(src_file):
-            dest_file = os.path.join(dest_dir, dest_name)
-            shutil.copy(src_file, dest_file)
-
-
-# 获取当前目录路径
-current_dir = os.path.dirname(os.path.abspath(__file__))
-initial_poscar_path = os.path.join(current_dir, 'POSCAR')
-
-# 读取初始的POSCAR文件
-initial_poscar = read_poscar(initial_poscar_path)
-
-if initial_poscar:
-    strains = np.arange(0.985, 1.0151, 0.005)  # 应变范围从0.985到1.015，步长为0.005
-
-    for strain in strains:
-        strain_str = f'{strain:.3f}'
-
-        # 对a轴应用应变
-        strained_a_poscar = apply_strain(initial_poscar.copy(), strain, 1.0)
-        a_directory = os.path.join(current_dir, 'mobility-x', strain_str)
-        write_poscar(strained_a_poscar, a_directory)
-        write_optcell(a_directory, '010')
-
-        # 复制文件到mobility-x目录并重命名
-        copy_and_rename_files(
-            [os.path.join(current_dir, 'INCAR-opt'),
-             os.path.join(current_dir, 'KPOINTS'),
-             os.path.join(current_dir, 'POTCAR')],
-            a_directory,
-            ['INCAR', 'KPOINTS', 'POTCAR']
-        )
-
-        scf_directory = os.path.join(a_directory, 'scf')
-        copy_and_rename_files(
-            [os.path.join(current_dir, 'INCAR-scf'),
-             os.path.join(current_dir, 'KPOINTS'),
-             os.path.join(current_dir, 'POTCAR')],
-            scf_directory,
-            ['INCAR', 'KPOINTS', 'POTCAR']
-        )
-
-        band_directory = os.path.join(scf_directory, 'band')
-        copy_and_rename_files(
-            [os.path.join(current_dir, 'INCAR-band'),
-             os.path.join(current_dir, 'KPOINTS-band'),
-             os.path.join(current_dir, 'POTCAR')],
-            band_directory,
-            ['INCAR', 'KPOINTS', 'POTCAR']
-        )
-
-        # 对b轴应用应变
-        strained_b_poscar = apply_strain(initial_poscar.copy(), 1.0, strain)
-        b_directory = os.path.join(current_dir, 'mobility-y', strain_str)
-        write_poscar(strained_b_poscar, b_directory)
-        write_optcell(b_directory, '100')
-
-        # 复制文件到mobility-y目录并重命名
-        copy_and_rename_files(
-            [os.path.join(current_dir, 'INCAR-opt'),
-             os.path.join(current_dir, 'KPOINTS'),
-             os.path.join(current_dir, 'POTCAR')],
-            b_directory,
-            ['INCAR', 'KPOINTS', 'POTCAR']
-        )
-
-        scf_directory = os.path.join(b_directory, 'scf')
-        copy_and_rename_files(
-            [os.path.join(current_dir, 'INCAR-scf'),
-             os.path.join(current_dir, 'KPOINTS'),
-             os.path.join(current_dir, 'POTCAR')],
-            scf_directory,
-            ['INCAR', 'KPOINTS', 'POTCAR']
-        )
-
-        band_directory = os.path.join(scf_directory, 'band')
-        copy_and_rename_files(
-            [os.path.join(current_dir, 'INCAR-band'),
-             os.path.join(current_dir, 'KPOINTS-band'),
-             os.path.join(current_dir, 'POTCAR')],
-            band_directory,
-            ['INCAR', 'KPOINTS', 'POTCAR']
-        )
-
-    print(
-        "Strained POSCAR and OPTCELL files, along with INCAR, KPOINTS, POTCAR files, generated and organized for a-axis and b-axis strains.")
-else:
-    print("Failed to read the initial POSCAR file.")
+        structure = read(os.path.join(args.root, 'POSCAR'))
+    except (OSError, ValueError) as e:
+        print(f"Failed to read the initial POSCAR file: {e}")
+        return
+    values = args.values if args.values else np.arange(*(args.range or DEFAULT_RANGES[args.mode]))
+    series = strain_series(args.mode, structure.lattice, values, args.axes, args.tensor)
+
+    t0 = time.perf_counter()
+    written, skipped, used = generate(args.root, structure, series, args.link, args.force)
+    links = ', '.join(f"{mode} {count}" for mode, count in used.items()) or '无'
+    print(f"{len(series)} 个应变目录: 生成 {written} 个，跳过 {skipped} 个未变化的；共享文件 {links}；"
+          f"清单 {MANIFEST}，用时 {time.perf_counter() - t0:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from bandcache import load
+from locpot import Locpot, vacuum_levels
+from outcar import Outcar, resolve
+from poscar import read
+from strain import AXES, MANIFEST
+
+# --- 应变系列分析 ---
+# 遍历 strain.py 生成的 mobility-x/<s>、mobility-y/<s> 目录 (取自 strain.json，没有时按目录名)，用进程池并行:
+#   <目录>/scf/band   由 bandcache.py 取 VBM、CBM 与带隙 (其 .bandcache.npz 只在 EIGENVAL 等变化时重新解析)
+#   <目录>/OUTCAR     结构优化后的总能量 TOTEN
+#   LOCPOT           依次找 scf/band、scf、<目录> 下的 LOCPOT，由 locpot.py 取 z 方向两侧真空能级的平均值
+# 再对每个轴按应变 ε = s - 1 拟合:
+#   形变势 E1 = dE_edge/dε (线性拟合，eV)；带边先减去各自的真空能级，
+#   只要该轴有一个点缺少 LOCPOT (或找不到真空平台) 就整轴改用 EIGENVAL 中的绝对本征值，结果标为未对齐
+#   二维弹性常数 C2D = (1/S0) d²E/dε² (二次拟合，N/m)，S0 为未应变 POSCAR 的 ab 面积
+# 结果写入 strain_summary.dat；每个目录的结果连同输入文件的大小与修改时间缓存在 strain_analysis.json，
+# 重新运行时只处理新增或变化的目录。--plot 另外用 Agg 后端画出拟合图。
+
+RESULTS_FILE = 'strain_analysis.json'
+SUMMARY_FILE = 'strain_summary.dat'
+RESULTS_VERSION = 2
+EV_PER_A2 = 16.021766  # eV/Å² -> J/m² (N/m)
+# 决定一个目录结果的输入文件
+LOCPOTS = (os.path.join('scf', 'band', 'LOCPOT'), os.path.join('scf', 'LOCPOT'), 'LOCPOT')  # 按此顺序取第一个
+INPUTS = ('OUTCAR', os.path.join('scf', 'band', 'EIGENVAL'), os.path.join('scf', 'band', 'OUTCAR'),
+          os.path.join('scf', 'band', 'KPOINTS'), os.path.join('scf', 'band', 'POSCAR')) + LOCPOTS
+
+
+def find_points(root):
+    # -> [(目录, 轴, 拉伸比例), ...]
+    try:
+        with open(os.path.join(root, MANIFEST)) as f:
+            directories = json.load(f)['directories']
+        points = [(folder, entry['axis'], entry['scale']) for folder, entry in directories.items() if 'axis' in entry]
+    except (OSError, ValueError, KeyError):
+        points = []
+        for axis, (_, folder, _) in AXES.items():
+            for path in glob.glob(os.path.join(root, folder, '*')):
+                try:
+                    points.append((os.path.relpath(path, root), axis, float(os.path.basename(path))))
+                except ValueError:
+                    continue
+    return sorted((p for p in points if os.path.isdir(os.path.join(root, p[0]))), key=lambda p: (p[1], p[2]))
+
+
+def stamps(root, folder):
+    result = {}
+    for name in INPUTS:
+        try:
+            st = os.stat(resolve(os.path.join(root, folder, name)))  # OUTCAR 可能已被压缩
+            result[name] = [st.st_size, st.st_mtime_ns]
+        except FileNotFoundError:
+            result[name] = None
+    return result
+
+
+def analyse(root, folder):
+    # 在子进程中运行 -> {'vbm', 'cbm', 'gap', 'energy', 'vacuum'}，缺少的为 None；另有 'error'
+    result = {'vbm': None, 'cbm': None, 'gap': None, 'energy': None, 'vacuum': None}
+    path = os.path.join(root, folder)
+    try:
+        result['energy'] = Outcar(os.path.join(path, 'OUTCAR')).last(['energy'])['energy']
+    except OSError:
+        pass
+    try:
+        bands, _ = load(os.path.join(path, 'scf', 'band'))
+        edges = bands.band_edges()
+        result.update(vbm=edges['vbm'], cbm=edges['cbm'], gap=edges['gap'])
+    except (OSError, ValueError, IndexError) as e:
+        result['error'] = str(e)
+    locpot = next((os.path.join(path, name) for name in LOCPOTS if os.path.exists(os.path.join(path, name))), None)
+    if locpot is not None:
+        try:
+            levels = vacuum_levels(*Locpot(locpot).planar_average(2))
+            result['vacuum'] = (levels['left'] + levels['right']) / 2
+        except (OSError, ValueError, IndexError) as e:
+            message = f"{os.path.relpath(locpot, path)}: {e}"
+            result['error'] = f"{result['error']}; {message}" if 'error' in result else message
+    return result
+
+
+def load_results(path):
+    try:
+        with open(path) as f:
+            data = json.load(f)
+        if data.get('version') != RESULTS_VERSION:
+            return {}
+        return data['points']
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def area(poscar):
+    # 缩放系数为负 (体积) 时由 poscar.Structure.cell 换算
+    lattice = read(poscar).cell
+    return float(np.linalg.norm(np.cross(lattice[0], lattice[1])))
+
+
+def aligned(rows):
+    # 有带边的点都有真空能级时，E1 用对齐后的带边拟合
+    points = [r for _, r in rows if r['vbm'] is not None or r['cbm'] is not None]
+    return bool(points) and all(r['vacuum'] is not None for r in points)
+
+
+def edge_data(rows, edge, align):
+    # -> (点数, 2) 的 (ε, 带边)，align 时减去真空能级
+    return np.array([(eps, r[edge] - r['vacuum'] if align else r[edge])
+                     for eps, r in rows if r[edge] is not None]).reshape(-1, 2)
+
+
+def fit_axis(rows, s0):
+    # rows: [(ε, 结果), ...] -> 拟合结果 (数据点不足时为 None)
+    fits = {'aligned': aligned(rows)}
+    for edge in ('vbm', 'cbm'):
+        data = edge_data(rows, edge, fits['aligned'])
+        fits['E1_' + edge] = float(np.polyfit(data[:, 0], data[:, 1], 1)[0]) if len(data) >= 2 else None
+    data = np.array([(eps, r['energy']) for eps, r in rows if r['energy'] is not None]).reshape(-1, 2)
+    if len(data) >= 3 and s0:
+        fits['C2D'] = float(2 * np.polyfit(data[:, 0], data[:, 1], 2)[0] / s0 * EV_PER_A2)
+    else:
+        fits['C2D'] = None
+    return fits
+
+
+def fmt(value, spec='.6f'):
+    return '-' if value is None else format(value, spec)
+
+
+def write_summary(path, points, results, fits, s0):
+    # VBM/CBM 为 EIGENVAL 中的绝对本征值，Vacuum 为真空能级 (没有 LOCPOT 时为 -)
+    lines = [f"# axis strain       VBM(eV)       CBM(eV)       Gap(eV)     Energy(eV)    Vacuum(eV)\n"]
+    for folder, axis, scale in points:
+        r = results[folder]
+        lines.append(f"{axis:>6s} {scale - 1:+8.4f} {fmt(r['vbm']):>13s} {fmt(r['cbm']):>13s} {fmt(r['gap']):>13s} "
+                     f"{fmt(r['energy']):>14s} {fmt(r['vacuum']):>13s}\n")
+    lines.append(f"# S0 = {fmt(s0, '.6f')} Å^2\n")
+    lines.append("# axis  E1_VBM(eV)  E1_CBM(eV)   C2D(N/m)  E1_reference\n")
+    for axis, fit in fits.items():
+        lines.append(f"# {axis:>4s} {fmt(fit['E1_vbm'], '11.4f')} {fmt(fit['E1_cbm'], '11.4f')} "
+                     f"{fmt(fit['C2D'], '10.3f')}  {'vacuum' if fit['aligned'] else 'unaligned'}\n")
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        f.write(''.join(lines))
+    os.replace(tmp, path)
+
+
+def plot(root, points, results, fits):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    for axis in fits:
+        rows = [(scale - 1, results[folder]) for folder, a, scale in points if a == axis]
+        fig, (ax_edge, ax_energy) = plt.subplots(1, 2, figsize=(9, 4))
+        for edge, color in (('vbm', 'blue'), ('cbm', 'red')):
+            data = edge_data(rows, edge, fits[axis]['aligned'])
+            ax_edge.plot(data[:, 0] * 100, data[:, 1], 'o', color=color, label=edge.upper())
+            slope = fits[axis]['E1_' + edge]
+            if slope is not None:
+                p = np.polyfit(data[:, 0], data[:, 1], 1)
+                ax_edge.plot(data[:, 0] * 100, np.polyval(p, data[:, 0]), '-', color=color,
+                             label=f"E1 = {slope:.2f} eV")
+        ax_edge.set_xlabel('Strain (%)')
+        ax_edge.set_ylabel('Energy - E_vac (eV)' if fits[axis]['aligned'] else 'Energy (eV, unaligned)')
+        ax_edge.legend()
+        data = np.array([(eps, r['energy']) for eps, r in rows if r['energy'] is not None]).reshape(-1, 2)
+        ax_energy.plot(data[:, 0] * 100, data[:, 1], 'o', color='black')
+        if fits[axis]['C2D'] is not None:
+            p = np.polyfit(data[:, 0], data[:, 1], 2)
+            eps = np.linspace(data[:, 0].min(), data[:, 0].max(), 100)
+            ax_energy.plot(eps * 100, np.polyval(p, eps), '-', color='black',
+                           label=f"C2D = {fits[axis]['C2D']:.1f} N/m")
+            ax_energy.legend()
+        ax_energy.set_xlabel('Strain (%)')
+        ax_energy.set_ylabel('Total energy (eV)')
+        fig.suptitle(f'{axis} axis')
+        fig.savefig(os.path.join(root, f'strain_{axis}.png'), dpi=300, bbox_inches='tight')
+        plt.close(fig)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="并行分析 strain.py 的应变目录: 带边、带隙、形变势与二维弹性常数。")
+    parser.add_argument('root', nargs='?', default='.', help='strain.py 的根目录 (默认: 当前目录)')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='并行进程数 (默认: CPU 核数)')
+    parser.add_argument('--poscar', default='POSCAR', help='未应变结构，用于面积 S0 (默认: 根目录的 POSCAR)')
+    parser.add_argument('--plot', action='store_true', help='画出各轴的拟合图 strain_<轴>.png')
+    parser.add_argument('--force', action='store_true', help='忽略缓存，重新处理所有目录')
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    points = find_points(args.root)
+    if not points:
+        print(f"错误: {args.root} 中没有应变目录 (mobility-x/*, mobility-y/*)", file=sys.stderr)
+        sys.exit(1)
+    results_path = os.path.join(args.root, RESULTS_FILE)
+    cached = {} if args.force else load_results(results_path)
+    results = {}
+    todo = []
+    for folder, _, _ in points:
+        stamp = stamps(args.root, folder)
+        old = cached.get(folder)
+        if old and old.get('stamps') == stamp:
+            results[folder] = old
+        else:
+            results[folder] = {'stamps': stamp}
+            todo.append(folder)
+    if todo:
+        workers = args.jobs or os.cpu_count() or 1
+        if workers == 1 or len(todo) == 1:
+            parsed = [analyse(args.root, folder) for folder in todo]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                parsed = list(pool.map(analyse, [args.root] * len(todo), todo))
+        for folder, result in zip(todo, parsed):
+            results[folder].update(result)
+            if 'error' in result:
+                print(f"警告: {folder}: {result['error']}", file=sys.stderr)
+
+    try:
+        s0 = area(os.path.join(args.root, args.poscar))
+    except (OSError, ValueError, IndexError):
+        s0 = None
+    fits = {}
+    for axis in sorted({axis for _, axis, _ in points}):
+        fits[axis] = fit_axis([(scale - 1, results[folder]) for folder, a, scale in points if a == axis], s0)
+
+    with open(results_path + '.tmp', 'w') as f:
+        json.dump({'version': RESULTS_VERSION, 'points': results, 'fits': fits, 'S0': s0}, f, indent=1)
+    os.replace(results_path + '.tmp', results_path)
+    write_summary(os.path.join(args.root, SUMMARY_FILE), points, results, fits, s0)
+    if args.plot:
+        plot(args.root, points, results, fits)
+
+    for axis, fit in fits.items():
+        print(f"{axis}: E1(VBM) {fmt(fit['E1_vbm'], '.3f')} eV, E1(CBM) {fmt(fit['E1_cbm'], '.3f')} eV "
+              f"({'已对齐真空能级' if fit['aligned'] else '未对齐真空能级'}), C2D {fmt(fit['C2D'], '.2f')} N/m")
+    print(f"{len(points)} 个应变目录，处理 {len(todo)} 个，其余来自缓存；结果 {SUMMARY_FILE}，"
+          f"用时 {time.perf_counter() - t0:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
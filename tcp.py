@@ -1,141 +1,57 @@
-import socket
 import threading
 import tkinter as tk
 from tkinter import scrolledtext, messagebox, font as tkFont
-from queue import Queue
 from PIL import Image, ImageTk # <--- 导入Pillow库
 
+from sensor_channel import DROP_OLDEST, Channel, Empty
+from sensor_metrics import run_profiled
+from sensor_server import HOST, PORT, SensorServer, SinkFanout
+
 # --- 配置 ---
-HOST = '0.0.0.0'
-PORT = 8269
-BUFFER_SIZE = 1024
-data_queue = Queue()
-
-# --- 数据解析函数 (已更新以处理7个数据点) ---
-def parse_sensor_data(data_str):
-    # 数据格式: "#temp,humidity,pm2.5,co2,voc,pm1,pm10#"
-    if not data_str.startswith("#") or not data_str.endswith("#"):
-        return None
-    try:
-        stripped_data = data_str[1:-1]
-        parts = stripped_data.split(',')
-        if len(parts) != 7: # <--- 检查7个数据部分
-            # log_to_gui(f"数据段数量错误: 期望7个，实际{len(parts)} - {data_str}\n") # 避免在非GUI线程直接调用GUI相关
-            print(f"数据段数量错误: 期望7个，实际{len(parts)} - {data_str}") # 打印到控制台
-            return None
-
-        temperature = float(parts[0])
-        humidity = float(parts[1])
-        pm25 = int(parts[2])
-        co2 = int(parts[3])
-        voc_raw = int(parts[4])
-        pm1 = int(parts[5])   # <--- 新增PM1
-        pm10 = int(parts[6])  # <--- 新增PM10
-
-        voc_quality_map = {1: "优", 2: "良", 3: "中", 4: "差"}
-        voc_quality = voc_quality_map.get(voc_raw, f"未知 ({voc_raw})")
-        return {
-            "temperature": temperature, "humidity": humidity, "pm25": pm25,
-            "co2": co2, "voc_raw": voc_raw, "voc_quality": voc_quality,
-            "pm1": pm1, "pm10": pm10, # <--- 添加到返回字典
-            "raw_string": data_str
-        }
-    except ValueError as e:
-        print(f"数据值转换错误: {e} - {data_str}")
-        return None
-    except Exception as e:
-        print(f"解析数据时发生未知错误: {e} - {data_str}")
-        return None
+# 服务器核心在 sensor_server.py 中 (不依赖 tkinter/PIL)，本文件只负责界面。
+# 数据与日志使用两个独立的有界通道，策略与容量可用 sensor_server.py --channel 修改。
+# 界面只显示每个客户端的最新数据，积压时丢弃最早的批次即可。
+data_channel = Channel('gui-data', 256, DROP_OLDEST)
+log_channel = Channel('gui-log', 1000, DROP_OLDEST, allow_block=False)
+
+# --- 界面刷新参数 ---
+REFRESH_INTERVAL_MS = 100    # process_queue 的调用间隔
+MAX_ITEMS_PER_TICK = 2000    # 每次刷新最多从队列取出的条目数，剩余的留到下一次，避免卡住Tk主循环
+MAX_DATA_LOG_PER_TICK = 20   # 每次刷新最多写入日志的数据行数 (每个客户端只写最新一条)
+MAX_LOG_LINES = 1000         # 日志区域最多保留的行数 (环形，超出后删除最早的行)
 
 # --- 日志记录到GUI ---
 def log_to_gui(message):
-    data_queue.put(f"LOG:{message}")
+    log_channel.offer(message)
 
-# --- 处理客户端连接的函数 ---
-def handle_client_connection(client_socket, client_address):
-    log_to_gui(f"[新连接] {client_address} 已连接。\n")
-    data_buffer = ""
+# --- 在后台线程中运行服务器核心 ---
+def run_server(server, profile=None):
     try:
-        while True:
-            request_bytes = client_socket.recv(BUFFER_SIZE)
-            if not request_bytes:
-                log_to_gui(f"[断开连接] {client_address} 已断开。\n")
-                break
-            data_buffer += request_bytes.decode('utf-8', errors='ignore')
-            while True:
-                start_index = data_buffer.find('#')
-                if start_index == -1: break
-                end_index = data_buffer.find('#', start_index + 1)
-                if end_index == -1:
-                    if len(data_buffer) > BUFFER_SIZE * 2:
-                        log_to_gui(f"[警告] 来自 {client_address} 的数据缓冲区过长且消息不完整。尝试保留起始部分。\n")
-                        data_buffer = data_buffer[start_index:]
-                    break
-                complete_message = data_buffer[start_index : end_index + 1]
-                data_buffer = data_buffer[end_index + 1 :]
-                parsed_data = parse_sensor_data(complete_message)
-                if parsed_data:
-                    parsed_data['client_address'] = client_address
-                    data_queue.put(parsed_data)
-                else:
-                    log_to_gui(f"[{client_address}] 数据解析失败: {complete_message}\n")
-    except ConnectionResetError:
-        log_to_gui(f"[连接重置] {client_address} 连接被重置。\n")
-    except socket.timeout:
-        log_to_gui(f"[超时] {client_address} 连接超时。\n")
-    except Exception as e:
-        log_to_gui(f"[错误] 处理 {client_address} 时发生错误: {e}\n")
-    finally:
-        log_to_gui(f"[关闭连接] 关闭与 {client_address} 的连接。\n")
-        client_socket.close()
-
-# --- 启动TCP服务器的函数 ---
-def start_tcp_server(gui_app_instance):
-    server_socket = None
-    try:
-        server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        server_socket.bind((HOST, PORT))
-        server_socket.listen(5)
-        log_to_gui(f"[状态] 服务器正在监听 {HOST}:{PORT}\n")
-
-        while gui_app_instance.server_running:
-            try:
-                client_socket, client_address = server_socket.accept()
-                client_socket.settimeout(60)
-                client_thread = threading.Thread(target=handle_client_connection, args=(client_socket, client_address), daemon=True)
-                client_thread.start()
-            except socket.error as e:
-                if gui_app_instance.server_running:
-                    log_to_gui(f"[服务器错误] accept失败: {e}\n")
-                break
-            except Exception as e:
-                if gui_app_instance.server_running:
-                     log_to_gui(f"[服务器意外错误]: {e}\n")
-                break
+        run_profiled(profile, server.run)
     except OSError as e:
-        log_to_gui(f"[服务器错误] 无法启动服务器于 {HOST}:{PORT} - {e}\n")
-        messagebox.showerror("服务器错误", f"无法启动服务器于 {HOST}:{PORT}。\n端口可能已被占用或无权限。\n错误: {e}")
+        log_to_gui(f"[服务器错误] 无法启动服务器于 {server.host}:{server.port} - {e}\n")
     except Exception as e:
         log_to_gui(f"[服务器致命错误] {e}\n")
-        messagebox.showerror("服务器致命错误", f"发生意外错误: {e}")
-    finally:
-        log_to_gui("[状态] 服务器已停止。\n")
-        if server_socket:
-            server_socket.close()
-        if gui_app_instance.server_running:
-            gui_app_instance.server_running = False
-            gui_app_instance.update_status_indicator(False)
 
 
 class SensorDisplayApp:
-    def __init__(self, master):
+    def __init__(self, master, host=HOST, port=PORT, sinks=(), client_metrics=False, profile=None):
         self.master = master
-        master.title(f"空气质量监测上位机 (监听 {HOST}:{PORT})")
+        self.host = host
+        self.port = port
+        # 除界面外还要接收数据批次的对象 (需提供 put/offer 方法)，例如 sensor_store.StoreSink
+        self.sinks = SinkFanout(list(sinks))
+        master.title(f"空气质量监测上位机 (监听 {host}:{port})")
         master.geometry("800x600") # 调整窗口大小以适应新布局和图片
 
+        self.server = None
         self.server_thread = None
         self.server_running = False
+        self.client_metrics = client_metrics
+        self.profile = profile  # 接收线程的 cProfile 输出文件
+        # block 策略的通道腾出空间后通知当前的服务器恢复读取
+        data_channel.add_space_listener(self.resume_server)
+        self.sinks.add_space_listener(self.resume_server)
 
         # --- 字体定义 ---
         self.font_ui_chinese_s10 = tkFont.Font(family="SimSun", size=10)
@@ -167,9 +83,9 @@ class SensorDisplayApp:
             self.stop_icon_tk = ImageTk.PhotoImage(stop_pil_image)
 
         except FileNotFoundError as e:
-            log_to_gui(f"LOG:警告: 图片文件未找到 ({e.filename})。\n")
+            log_to_gui(f"警告: 图片文件未找到 ({e.filename})。\n")
         except Exception as e:
-            log_to_gui(f"LOG:错误: 加载图片时出错 - {e}\n")
+            log_to_gui(f"错误: 加载图片时出错 - {e}\n")
 
 
         # --- 主布局框架 ---
@@ -251,17 +167,39 @@ class SensorDisplayApp:
 
         self.log_text = scrolledtext.ScrolledText(log_frame, wrap=tk.WORD, height=8, state=tk.DISABLED, font=self.font_log_western_s9)
         self.log_text.pack(fill="both", expand=True, padx=2, pady=2)
-
-        self.master.after(100, self.process_queue)
+        self.log_line_count = 0
+
+        # --- 刷新统计 ---
+        # coalesced: 同一次刷新内被同一客户端更新的数据覆盖、未单独显示的条数
+        # dropped:   超过每次刷新上限而未写入日志的数据行数
+        # trimmed:   因日志环形上限被删除的旧日志行数
+        # 通道丢弃数与等待时间来自 data_channel / log_channel 的统计
+        self.render_stats = {"rendered": 0, "coalesced": 0, "dropped": 0, "trimmed": 0}
+        self.render_stats_var = tk.StringVar(value="刷新统计: --")
+        tk.Label(log_frame, textvariable=self.render_stats_var, font=self.font_ui_chinese_s10, anchor="w").pack(fill="x")
+
+        self.master.after(REFRESH_INTERVAL_MS, self.process_queue)
         self.master.protocol("WM_DELETE_WINDOW", self.on_closing)
 
+    def on_batch(self, batch):
+        # 在服务器线程中调用，返回 False 时服务器暂停读取
+        accepted = data_channel.offer(batch)
+        return self.sinks.offer(batch) and accepted
+
+    def resume_server(self):
+        server = self.server
+        if server is not None:
+            server.request_resume()
+
     def start_server(self):
         if not self.server_running:
             self.server_running = True
             self.status_label.config(text="服务器状态: 启动中...", fg="orange")
             self.start_button.config(state=tk.DISABLED)
             self.stop_button.config(state=tk.NORMAL)
-            self.server_thread = threading.Thread(target=start_tcp_server, args=(self,), daemon=True)
+            self.server = SensorServer(self.host, self.port, on_batch=self.on_batch, on_log=log_to_gui, verbose=True,
+                                       client_metrics=self.client_metrics)
+            self.server_thread = threading.Thread(target=run_server, args=(self.server, self.profile), daemon=True)
             self.server_thread.start()
         else:
             log_to_gui("[GUI] 服务器已经在运行中。\n")
@@ -270,12 +208,7 @@ class SensorDisplayApp:
         if self.server_running:
             log_to_gui("[GUI] 请求停止服务器...\n")
             self.server_running = False
-            connect_host = '127.0.0.1' if HOST == '0.0.0.0' else HOST
-            try:
-                with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                    s.settimeout(0.1)
-                    s.connect((connect_host, PORT))
-            except Exception: pass
+            self.server.stop()
             if self.server_thread and self.server_thread.is_alive():
                  self.server_thread.join(timeout=1.5)
             self.update_status_indicator(False)
@@ -293,41 +226,97 @@ class SensorDisplayApp:
             self.stop_button.config(state=tk.DISABLED)
 
     def update_log_display(self, message):
+        # 一次性插入 (可能包含多行的) 文本，并把日志裁剪到 MAX_LOG_LINES 行
         self.log_text.config(state=tk.NORMAL)
         self.log_text.insert(tk.END, message)
+        self.log_line_count += message.count("\n")
+        excess = self.log_line_count - MAX_LOG_LINES
+        if excess > 0:
+            self.log_text.delete("1.0", f"{excess + 1}.0")
+            self.log_line_count -= excess
+            self.render_stats["trimmed"] += excess
         self.log_text.see(tk.END)
         self.log_text.config(state=tk.DISABLED)
 
+    def show_data(self, item):
+        values = (
+            (self.temp_var, f"温度: {item['temperature']:.1f} °C"),
+            (self.hum_var, f"湿度: {item['humidity']:.1f} %"),
+            (self.pm25_var, f"PM2.5: {item['pm25']} µg/m³"),
+            (self.co2_var, f"CO2: {item['co2']} ppm"),
+            (self.voc_var, f"空气质量: {item['voc_quality']} (原始值: {item['voc_raw']})"),
+            (self.pm1_var, f"PM1: {item['pm1']} µg/m³"),     # <--- 更新PM1显示
+            (self.pm10_var, f"PM10: {item['pm10']} µg/m³"),  # <--- 更新PM10显示
+        )
+        for var, text in values:
+            if var.get() != text:  # 值没变就不触发重绘
+                var.set(text)
+
+    def handle_log(self, log_msg):
+        if "[状态] 服务器正在监听" in log_msg:
+            self.update_status_indicator(True)
+        elif "[状态] 服务器已停止" in log_msg or \
+             "无法启动服务器" in log_msg or \
+             "服务器致命错误" in log_msg:
+            self.server_running = False
+            self.update_status_indicator(False)
+            if "无法启动服务器" in log_msg:
+                messagebox.showerror("服务器错误", f"无法启动服务器于 {self.host}:{self.port}。\n端口可能已被占用或无权限。\n{log_msg}")
+
     def process_queue(self):
+        # 每次刷新: 每个客户端只保留最新的一条数据，所有日志合并成一次插入
+        latest = {}       # client_id -> (batch, 行号)
+        newest = None     # 本次刷新收到的最后一条数据
+        log_parts = []
+        rows = 0
         try:
-            while True:
-                item = data_queue.get_nowait()
-                if isinstance(item, dict):
-                    self.temp_var.set(f"温度: {item['temperature']:.1f} °C")
-                    self.hum_var.set(f"湿度: {item['humidity']:.1f} %")
-                    self.pm25_var.set(f"PM2.5: {item['pm25']} µg/m³")
-                    self.co2_var.set(f"CO2: {item['co2']} ppm")
-                    self.voc_var.set(f"空气质量: {item['voc_quality']} (原始值: {item['voc_raw']})")
-                    self.pm1_var.set(f"PM1: {item['pm1']} µg/m³")     # <--- 更新PM1显示
-                    self.pm10_var.set(f"PM10: {item['pm10']} µg/m³")   # <--- 更新PM10显示
+            for _ in range(MAX_ITEMS_PER_TICK):
+                try:
+                    log_msg = log_channel.get_nowait()
+                except Empty:
+                    break
+                log_parts.append(log_msg)
+                self.handle_log(log_msg)
 
+            for _ in range(MAX_ITEMS_PER_TICK):
+                try:
+                    batch = data_channel.get_nowait()
+                except Empty:
+                    break
+                client_id = batch.client_id
+                for k in range(batch.size):
+                    latest[client_id[k]] = (batch, k)
+                rows += batch.size
+                newest = (batch, batch.size - 1)
+
+            if latest:
+                stats = self.render_stats
+                stats["rendered"] += len(latest)
+                stats["coalesced"] += rows - len(latest)
+                batch, k = newest
+                self.show_data(batch.row(k))
+
+                per_client = list(latest.values())
+                shown = per_client[-MAX_DATA_LOG_PER_TICK:]
+                stats["dropped"] += len(per_client) - len(shown)
+                for batch, k in shown:
+                    row = batch.row(k)
                     client_addr_str = "未知客户端"
-                    if 'client_address' in item and isinstance(item['client_address'], tuple) and len(item['client_address']) == 2:
-                         client_addr_str = f"来自 {item['client_address'][0]}:{item['client_address'][1]}"
-                    self.update_log_display(f"数据: {item['raw_string']} ({client_addr_str})\n")
-
-                elif isinstance(item, str) and item.startswith("LOG:"):
-                    log_msg = item[4:]
-                    self.update_log_display(log_msg)
-                    if "[状态] 服务器正在监听" in log_msg:
-                        self.update_status_indicator(True)
-                    elif "[状态] 服务器已停止" in log_msg or \
-                         "无法启动服务器" in log_msg or \
-                         "服务器致命错误" in log_msg:
-                        self.update_status_indicator(False)
+                    if isinstance(row['client_address'], tuple) and len(row['client_address']) == 2:
+                         client_addr_str = f"来自 {row['client_address'][0]}:{row['client_address'][1]}"
+                    log_parts.append(f"数据: {row['raw_string']} ({client_addr_str})\n")
+                channel = data_channel.stats()
+                self.render_stats_var.set(
+                    f"刷新统计: 已显示 {stats['rendered']}, 合并 {stats['coalesced']}, "
+                    f"未写日志 {stats['dropped']}, 日志裁剪 {stats['trimmed']}, "
+                    f"通道丢弃 {channel['dropped_rows']} 条/日志 {log_channel.dropped} 条, "
+                    f"平均等待 {channel['wait_avg'] * 1000:.0f} ms")
+
+            if log_parts:
+                self.update_log_display("".join(log_parts))
         except Exception: pass
         finally:
-            self.master.after(100, self.process_queue)
+            self.master.after(REFRESH_INTERVAL_MS, self.process_queue)
 
     def on_closing(self):
         if messagebox.askokcancel("退出", "确定要退出应用程序吗？这将停止服务器。"):
@@ -336,7 +325,11 @@ class SensorDisplayApp:
                 self.server_thread.join(timeout=1)
             self.master.destroy()
 
-if __name__ == "__main__":
+def run_gui(host=HOST, port=PORT, sinks=(), client_metrics=False, profile=None):
     root = tk.Tk()
-    app = SensorDisplayApp(root)
+    app = SensorDisplayApp(root, host, port, sinks, client_metrics, profile)
     root.mainloop()
+
+
+if __name__ == "__main__":
+    run_gui()
\ No newline at end of file
@@ -0,0 +1,205 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from xdatcar import CHUNK_FRAMES, Xdatcar, parse_axes, parse_frames
+
+# --- XDATCAR 流式统计 ---
+# 一遍扫描 XDATCAR (经 xdatcar.py 的 mmap + 帧索引按块读取)，只保留 O(原子数 + 格点数) 的状态:
+#   每个原子、每个坐标轴的帧数、均值、M2 (方差 = M2/(n-1))、最小值、最大值
+#   每种元素沿 c 方向 (分数坐标 z) 的数密度直方图
+#   每 --window 帧一组的各元素平均坐标 (看漂移、是否平衡)
+# 每块帧先整体求均值与 M2，再按 Chan 等的合并公式并入 (Welford 更新的成块形式)。
+# 帧按固定大小 (TASK_CHUNKS 个块) 切成任务交给进程池，各任务的结果按帧的顺序合并，
+# 合并的顺序与进程数无关，因此 -j 不同时结果逐位相同。
+
+TASK_CHUNKS = 16  # 每个任务的块数 (每块 CHUNK_FRAMES 帧)
+PREFIX = 'trajstats'
+
+
+class TrajStats:
+    def __init__(self, natoms, naxes, nelements, bins):
+        self.n = 0
+        self.mean = np.zeros((natoms, naxes))
+        self.m2 = np.zeros((natoms, naxes))
+        self.min = np.full((natoms, naxes), np.inf)
+        self.max = np.full((natoms, naxes), -np.inf)
+        self.hist = np.zeros((nelements, bins), dtype=np.int64)
+        self.windows = {}  # 窗口序号 -> [帧数, 各元素坐标之和 (元素数, 轴数)]
+
+    def _combine(self, n, mean, m2):
+        # Chan 等的成对合并: 两组的 (n, 均值, M2) -> 合并后的
+        if not self.n:
+            self.n, self.mean, self.m2 = n, mean, m2
+            return
+        total = self.n + n
+        delta = mean - self.mean
+        self.mean = self.mean + delta * (n / total)
+        self.m2 = self.m2 + m2 + delta ** 2 * (self.n * n / total)
+        self.n = total
+
+    def update(self, frames, coords, zfrac, element_of, starts, window):
+        # frames: 帧号 (f,)；coords: (f, 原子数, 轴数)；zfrac: (f, 原子数) 分数坐标 z
+        mean = coords.mean(axis=0)
+        self._combine(len(frames), mean, ((coords - mean) ** 2).sum(axis=0))
+        np.minimum(self.min, coords.min(axis=0), out=self.min)
+        np.maximum(self.max, coords.max(axis=0), out=self.max)
+        bins = self.hist.shape[1]
+        index = np.minimum((zfrac % 1.0 * bins).astype(np.int64), bins - 1)
+        self.hist += np.bincount((element_of * bins + index).ravel(),
+                                 minlength=self.hist.size).reshape(self.hist.shape)
+        # 各帧各元素的坐标之和，再按窗口分组
+        per_element = np.add.reduceat(coords, starts, axis=1)
+        keys = frames // window
+        cuts = np.flatnonzero(np.diff(keys)) + 1
+        for key, group in zip(keys[np.concatenate([[0], cuts])], np.split(per_element, cuts)):
+            entry = self.windows.setdefault(int(key), [0, 0.0])
+            entry[0] += len(group)
+            entry[1] = entry[1] + group.sum(axis=0)
+
+    def merge(self, other):
+        if other.n:
+            self._combine(other.n, other.mean, other.m2)
+        np.minimum(self.min, other.min, out=self.min)
+        np.maximum(self.max, other.max, out=self.max)
+        self.hist += other.hist
+        for key, (count, sums) in other.windows.items():
+            entry = self.windows.setdefault(key, [0, 0.0])
+            entry[0] += count
+            entry[1] = entry[1] + sums
+
+    @property
+    def variance(self):
+        return self.m2 / (self.n - 1) if self.n > 1 else np.zeros_like(self.m2)
+
+
+def element_layout(counts):
+    # -> (每个原子的元素序号, 各元素第一个原子的序号)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(np.int64)
+    return np.repeat(np.arange(len(counts)), counts), starts
+
+
+def process(path, frames, axes, cartesian, bins, window):
+    # 在子进程中运行: 统计 frames (升序帧号) -> TrajStats
+    with Xdatcar(path) as xdat:
+        element_of, starts = element_layout(xdat.counts)
+        read_axes = [0, 1, 2] if cartesian else sorted(set(axes) | {2})
+        pick = [read_axes.index(a) for a in axes]
+        stats = TrajStats(xdat.natoms, len(axes), len(xdat.counts), bins)
+        for lo in range(0, len(frames), CHUNK_FRAMES):
+            chunk = frames[lo:lo + CHUNK_FRAMES]
+            direct = xdat.read(chunk, axes=read_axes, cartesian=False)
+            zfrac = direct[:, :, read_axes.index(2)]
+            if cartesian:
+                coords = np.empty_like(direct)
+                for n, frame in enumerate(chunk):
+                    coords[n] = direct[n] @ xdat.cell(frame)
+                coords = coords[:, :, pick]
+            else:
+                coords = direct[:, :, pick]
+            stats.update(chunk, coords, zfrac, element_of, starts, window)
+    return stats
+
+
+def write_text(path, text):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def write_results(prefix, xdat, stats, axes, window):
+    names = 'xyz'
+    element_of, _ = element_layout(xdat.counts)
+    species = xdat.species
+    # 每个原子
+    std = np.sqrt(stats.variance)
+    head = ' '.join(f"{'mean_' + names[a]:>12s} {'std_' + names[a]:>12s} {'min_' + names[a]:>12s} "
+                    f"{'max_' + names[a]:>12s}" for a in axes)
+    lines = [f"# {stats.n} frames\n", f"# atom element {head}\n"]
+    local = {}
+    for i in range(xdat.natoms):
+        element = species[element_of[i]]
+        local[element] = local.get(element, 0) + 1
+        values = ' '.join(f"{stats.mean[i, j]:12.6f} {std[i, j]:12.6f} {stats.min[i, j]:12.6f} {stats.max[i, j]:12.6f}"
+                          for j in range(len(axes)))
+        lines.append(f"{i + 1:6d} {element + str(local[element]):>7s} {values}\n")
+    write_text(f"{prefix}_atoms.dat", ''.join(lines))
+
+    # 沿 c 的数密度 (Å^-3)；晶格取第一帧，高度 = 体积 / ab 面积
+    cell = xdat.cell(0)
+    volume = abs(np.linalg.det(cell))
+    height = volume / np.linalg.norm(np.cross(cell[0], cell[1]))
+    bins = stats.hist.shape[1]
+    density = stats.hist / (max(stats.n, 1) * volume / bins)
+    centers = (np.arange(bins) + 0.5) / bins
+    lines = [f"#  z_frac    z(Angstrom) " + ' '.join(f"{s:>12s}" for s in species) + "\n"]
+    for k in range(bins):
+        lines.append(f"{centers[k]:8.5f} {centers[k] * height:12.5f} "
+                     + ' '.join(f"{d:12.6e}" for d in density[:, k]) + "\n")
+    write_text(f"{prefix}_density.dat", ''.join(lines))
+
+    # 窗口平均
+    counts = np.asarray(xdat.counts)
+    head = ' '.join(f"{s + '_' + names[a]:>12s}" for s in species for a in axes)
+    lines = [f"# window {window} frames\n", f"# first   last  frames {head}\n"]
+    for key in sorted(stats.windows):
+        count, sums = stats.windows[key]
+        means = sums / count / counts[:, None]
+        lines.append(f"{key * window + 1:7d} {(key + 1) * window:6d} {count:7d} "
+                     + ' '.join(f"{v:12.6f}" for v in means.ravel()) + "\n")
+    write_text(f"{prefix}_windows.dat", ''.join(lines))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="一遍扫描 XDATCAR: 每个原子坐标的均值/标准差/最值、各元素沿 c 的数密度、窗口平均。")
+    parser.add_argument('file', nargs='?', default='XDATCAR', help='XDATCAR 文件 (默认: XDATCAR)')
+    parser.add_argument('--axes', default='z', help='统计的坐标轴 (默认: z)，例如 xyz')
+    parser.add_argument('--cartesian', action='store_true', help='按 Cartesian 坐标 (Å) 统计 (默认 Direct)')
+    parser.add_argument('--frames', help='帧范围 start:stop[:step]，帧号从 1 开始')
+    parser.add_argument('--bins', type=int, default=200, help='沿 c 的直方图格点数 (默认: 200)')
+    parser.add_argument('--window', type=int, default=1000, help='窗口平均的帧数 (默认: 1000)')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='并行进程数 (默认: CPU 核数)')
+    parser.add_argument('-o', '--prefix', default=PREFIX,
+                        help=f'输出文件前缀 (默认: {PREFIX} -> {PREFIX}_atoms.dat, _density.dat, _windows.dat)')
+    args = parser.parse_args()
+    try:
+        axes = parse_axes(args.axes)
+    except ValueError as e:
+        parser.error(str(e))
+
+    t0 = time.perf_counter()
+    # 先在主进程建立 (并缓存) 帧索引，子进程直接读取
+    with Xdatcar(args.file) as xdat:
+        frames = xdat.frame_indices(parse_frames(args.frames) if args.frames else None)
+        if not len(frames):
+            print("错误: 没有选中的帧", file=sys.stderr)
+            sys.exit(1)
+        size = TASK_CHUNKS * CHUNK_FRAMES
+        tasks = [frames[lo:lo + size] for lo in range(0, len(frames), size)]
+        workers = min(args.jobs or os.cpu_count() or 1, len(tasks))
+        options = (axes, args.cartesian, args.bins, args.window)
+        if workers == 1:
+            parts = (process(args.file, task, *options) for task in tasks)
+            pool = None
+        else:
+            pool = ProcessPoolExecutor(max_workers=workers)
+            parts = pool.map(process, [args.file] * len(tasks), tasks, *[[o] * len(tasks) for o in options])
+        stats = TrajStats(xdat.natoms, len(axes), len(xdat.counts), args.bins)
+        try:
+            for part in parts:  # 按帧的顺序合并
+                stats.merge(part)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        write_results(args.prefix, xdat, stats, axes, args.window)
+    print(f"{stats.n} 帧，{xdat.natoms} 个原子，{len(tasks)} 个任务 / {workers} 个进程；"
+          f"输出 {args.prefix}_atoms.dat、_density.dat、_windows.dat，用时 {time.perf_counter() - t0:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,571 @@
+import argparse
+import mmap
+import os
+import sys
+
+import numpy as np
+
+# --- XDATCAR 流式读取 ---
+# 用 mmap 打开 XDATCAR，只扫描一遍 "configuration=" 建立帧偏移索引 (可缓存到 XDATCAR.xdatidx.npz)，
+# 之后按帧切片、原子、坐标轴读取，返回 (帧数, 原子数, 轴数) 的 NumPy 数组，不把整个文件读进内存。
+# 支持变胞 (每帧前重复晶格头) 与 Direct/Cartesian 两种坐标，可互相转换。
+#
+# VASP 按固定宽度 (例如 3F12.8) 写坐标，读取时直接从 mmap 中按列取出所需原子/轴的字符，
+# 把数字拼成整数尾数再除以 10^小数位数 (与 float(文本) 结果完全一致)；命令行输出文本时
+# 连解析都不需要，直接拷贝字符。遇到宽度或小数点位置不一致的帧自动退回逐帧 split 解析。
+
+KEY = b'configuration='
+INDEX_SUFFIX = '.xdatidx.npz'
+INDEX_VERSION = 1
+CHUNK_FRAMES = 1024  # 每次向量化解析的帧数
+AXES = {'x': 0, 'y': 1, 'z': 2}
+MAX_DIGITS = 15  # 尾数用 float64 精确表示的位数上限
+_U = np.uint64
+
+
+def parse_axes(axes):
+    # 'z' / 'xy' / [2] -> [2] / [0, 1] / [2]
+    if isinstance(axes, str):
+        try:
+            return [AXES[a] for a in axes.lower()]
+        except KeyError:
+            raise ValueError(f"未知坐标轴: {axes} (可选 x y z)")
+    return [int(a) for a in axes]
+
+
+def _swar8(chars, offset):
+    # chars: C 连续的 (..., w) 字节，从每个字段第 offset 个字符起正好 8 位 ASCII 数字 (高位在前)。
+    # 把这 8 个字节当作一个 64 位整数，用 3 轮乘加移位并行算出 8 位十进制数 (SWAR)
+    v = np.ndarray(chars.shape[:-1], dtype='<u8', buffer=chars, offset=offset,
+                   strides=tuple(st for st in chars.strides[:-1])) - _U(0x3030303030303030)
+    v = (v * _U(10) + (v >> _U(8))) & _U(0x00FF00FF00FF00FF)
+    v = (v * _U(100) + (v >> _U(16))) & _U(0x0000FFFF0000FFFF)
+    return ((v * _U(10000) + (v >> _U(32))) & _U(0xFFFFFFFF)).view(np.int64)
+
+
+def _parse_fixed(chars, dot):
+    # chars: (..., w) 的 ASCII 字节，每个是右对齐、小数点在第 dot 列的定点小数，例如 b'  -0.12345678'
+    # 把数字拼成整数尾数，再除以 10^小数位数；格式不符时返回 None
+    width = chars.shape[-1]
+    places = width - 1 - dot
+    chars = np.ascontiguousarray(chars)  # 只保留这几列，后面逐列运算时访问的内存更少
+    if not (chars[..., dot] == 46).all():
+        return None
+    fraction = chars[..., dot + 1:]
+    if places and (fraction.min() < 48 or fraction.max() > 57):
+        return None
+    # 小数点前只能是空格、负号和数字 (Fortran 溢出时输出的 ***** 没有小数点，上面已排除)
+    if dot and chars[..., :dot].max() > 57:
+        return None
+    mantissa = np.zeros(chars.shape[:-1], dtype=np.int64)
+    negative = np.zeros(chars.shape[:-1], dtype=bool)
+    bias = 0
+    for j in range(dot):
+        column = chars[..., j]
+        negative |= column == 45
+        mantissa *= 10
+        mantissa += np.maximum(column, np.uint8(48))  # 空格和负号 (都小于 '0') 当作 0
+        bias = bias * 10 + 48
+    if places == 8:
+        # VASP 常见的 F12.8 / F10.8: 小数部分正好 8 位，一次 SWAR 解析
+        mantissa -= bias
+        mantissa *= 10 ** 8
+        mantissa += _swar8(chars, dot + 1)
+    else:
+        for j in range(dot + 1, width):
+            mantissa *= 10
+            mantissa += chars[..., j]
+            bias = bias * 10 + 48
+        mantissa -= bias
+    values = mantissa / 10.0 ** places
+    values[negative] *= -1
+    return values
+
+
+def _lattice(lines):
+    # lines: 晶格头中的 缩放系数 与 三行晶格矢量
+    scale = float(lines[0].split()[0])
+    lattice = np.array([line.split()[:3] for line in lines[1:4]], dtype=float)
+    if scale < 0:  # 负数表示体积
+        scale = (-scale / abs(np.linalg.det(lattice))) ** (1 / 3)
+    return scale * lattice
+
+
+class Xdatcar:
+    def __init__(self, path='XDATCAR', cache_index=True):
+        self.path = path
+        self._file = open(path, 'rb')
+        self.size = os.fstat(self._file.fileno()).st_size
+        self.mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if hasattr(mmap, 'MADV_SEQUENTIAL'):
+            self.mm.madvise(mmap.MADV_SEQUENTIAL)
+        self._buf = np.frombuffer(self.mm, dtype=np.uint8)
+        self._read_header()
+        if not (cache_index and self._load_index()):
+            self._build_index()
+            if cache_index:
+                self._save_index()
+        self._detect_layout()
+        self._cells = {}
+
+    # --- 头信息 ---
+    def _read_header(self):
+        self.mm.seek(0)
+        lines = [self.mm.readline().decode('utf-8', 'replace') for _ in range(7)]
+        self.title = lines[0].strip()
+        first = lines[5].split()
+        if all(token.isdigit() for token in first):
+            # VASP4: 没有元素行
+            self.species = [f"X{i + 1}" for i in range(len(first))]
+            self.counts = [int(token) for token in first]
+            self.header_lines = 6
+        else:
+            self.species = first
+            self.counts = [int(token) for token in lines[6].split()]
+            self.header_lines = 7
+        self.natoms = sum(self.counts)
+
+    # --- 帧索引 ---
+    def _build_index(self):
+        mm = self.mm
+        starts, offsets, cartesian, cell_frames, cell_offsets = [], [], [], [], []
+        variable = False
+        pos = mm.find(KEY, 0)  # _read_header 已经移动了 mmap 的当前位置
+        while pos != -1:
+            line_start = mm.rfind(b'\n', 0, pos) + 1
+            end = mm.find(b'\n', pos)
+            if end == -1:
+                break
+            frame = len(offsets)
+            if frame == 0:
+                cell_frames.append(0)
+                cell_offsets.append(0)
+            elif frame == 1 or variable:
+                # 变胞: 上一行是各元素原子数 (全是整数)，说明本帧前重复了晶格头 (由第 2 帧判断)
+                prev_start = mm.rfind(b'\n', 0, line_start - 1) + 1
+                prev = mm[prev_start:line_start].split()
+                if prev and all(token.isdigit() for token in prev):
+                    variable = True
+                    start = prev_start
+                    for _ in range(self.header_lines - 1):
+                        start = mm.rfind(b'\n', 0, start - 1) + 1
+                    cell_frames.append(frame)
+                    cell_offsets.append(start)
+            starts.append(line_start)
+            offsets.append(end + 1)
+            cartesian.append(mm[line_start:line_start + 1] in (b'C', b'c', b'K', b'k'))
+            if frame >= 1 and not variable:
+                end = self._skip_ahead(starts, offsets, cartesian, pos - line_start, end - line_start)
+            pos = mm.find(KEY, end + 1)
+
+        # 每帧坐标块的结束位置: 下一帧的 configuration 行或晶格头开始处
+        ends = np.append(np.array(starts[1:], dtype=np.int64), self.size)
+        if len(cell_frames) > 1:
+            ends[np.array(cell_frames[1:]) - 1] = cell_offsets[1:]
+        offsets = np.array(offsets, dtype=np.int64)
+        cartesian = np.array(cartesian, dtype=bool)
+        # 正在运行的 MD 最后一帧可能不完整，丢掉
+        if len(offsets) and mm[int(offsets[-1]):int(ends[-1])].count(b'\n') + 1 < self.natoms:
+            offsets, cartesian, ends = offsets[:-1], cartesian[:-1], ends[:-1]
+        self.offsets = offsets
+        self.ends = ends
+        self.cartesian = cartesian
+        self.cell_frames = np.array(cell_frames, dtype=np.int64)
+        self.cell_offsets = np.array(cell_offsets, dtype=np.int64)
+
+    def _skip_ahead(self, starts, offsets, cartesian, key_at, newline_at):
+        # 定胞的 XDATCAR 每帧字节数通常相同: 按最近两帧的间距预测后续各帧的 configuration 行，
+        # 分块向量化核对 (关键字、行尾换行、行首字母)，一直接受到第一个对不上的位置，返回最后接受帧的行尾
+        stride = offsets[-1] - offsets[-2]
+        last = starts[-1]
+        key = np.frombuffer(KEY, dtype=np.uint8)
+        first = self._buf[last]
+        while stride > 0:
+            count = min(65536, (self.size - 1 - last - newline_at) // stride)
+            if count <= 0:
+                break
+            candidates = last + stride * np.arange(1, count + 1, dtype=np.int64)
+            ok = ((self._buf[candidates[:, None] + key_at + np.arange(len(KEY))] == key).all(axis=1)
+                  & (self._buf[candidates + newline_at] == 10) & (self._buf[candidates] == first)
+                  & (self._buf[candidates - 1] == 10))
+            accepted = count if ok.all() else int(np.argmin(ok))
+            if not accepted:
+                break
+            candidates = candidates[:accepted]
+            starts.extend(candidates.tolist())
+            offsets.extend((candidates + newline_at + 1).tolist())
+            cartesian.extend([cartesian[-1]] * accepted)
+            last = int(candidates[-1])
+            if accepted < count:
+                break
+        return last + newline_at
+
+    def _index_path(self):
+        return self.path + INDEX_SUFFIX
+
+    def _load_index(self):
+        try:
+            with np.load(self._index_path()) as data:
+                if (int(data['version']) != INDEX_VERSION or int(data['size']) != self.size
+                        or int(data['mtime_ns']) != os.stat(self.path).st_mtime_ns):
+                    return False
+                for name in ('offsets', 'ends', 'cartesian', 'cell_frames', 'cell_offsets'):
+                    setattr(self, name, data[name])
+        except (OSError, KeyError, ValueError):
+            return False
+        return True
+
+    def _save_index(self):
+        path = self._index_path()
+        tmp = f"{path}.{os.getpid()}.tmp.npz"
+        try:
+            np.savez(tmp, version=INDEX_VERSION, size=self.size, mtime_ns=os.stat(self.path).st_mtime_ns,
+                     offsets=self.offsets, ends=self.ends, cartesian=self.cartesian,
+                     cell_frames=self.cell_frames, cell_offsets=self.cell_offsets)
+            os.replace(tmp, path)
+        except OSError:
+            pass  # 目录不可写时不缓存
+
+    def __len__(self):
+        return len(self.offsets)
+
+    @property
+    def variable_cell(self):
+        return len(self.cell_frames) > 1
+
+    # --- 固定宽度布局 ---
+    def _detect_layout(self):
+        # 以第一帧为准: 每行长度 line_len 相同，各轴的字段区间 (起点, 宽度) 相同时启用向量化解析
+        self.line_len = None
+        if not len(self):
+            return
+        start = int(self.offsets[0])
+        block = self.mm[start:int(self.ends[0])]
+        lines = block.split(b'\n')[:self.natoms]
+        line_len = len(lines[0]) + 1
+        if len(lines) < self.natoms or any(len(line) + 1 != line_len for line in lines):
+            return
+        first = lines[0]
+        spans, prev_end, k = [], 0, 0
+        for _ in range(3):
+            while k < len(first) and first[k:k + 1].isspace():
+                k += 1
+            token_start = k
+            while k < len(first) and not first[k:k + 1].isspace():
+                k += 1
+            if k == token_start:
+                return
+            token = first[token_start:k]
+            if token.count(b'.') != 1 or k - prev_end - 1 > MAX_DIGITS:
+                return
+            # (字段起点, 宽度, 小数点在字段内的位置)，字段从上一个数的末尾开始，数值右对齐
+            spans.append((prev_end, k - prev_end, token_start + token.index(b'.') - prev_end))
+            prev_end = k
+        self.line_len = line_len
+        self.spans = spans
+
+    # --- 晶格 ---
+    def cell(self, frame):
+        # 第 frame 帧的晶格矩阵 (行为 a, b, c，已乘缩放系数)
+        k = int(np.searchsorted(self.cell_frames, frame, side='right')) - 1
+        lattice = self._cells.get(k)
+        if lattice is None:
+            self.mm.seek(int(self.cell_offsets[k]))
+            lines = [self.mm.readline().decode() for _ in range(5)]
+            lattice = self._cells[k] = _lattice(lines[1:5])
+        return lattice
+
+    # --- 原子选择 ---
+    def atoms_of(self, element, indices=None):
+        # 元素 element 的全局原子序号 (0 起)；indices 为该元素内的序号 (1 起，与 extract_z.sh 相同)
+        if element not in self.species:
+            raise ValueError(f"元素 {element} 不在 XDATCAR 中 (已有: {' '.join(self.species)})")
+        k = self.species.index(element)
+        start = sum(self.counts[:k])
+        count = self.counts[k]
+        if indices is None:
+            return np.arange(start, start + count)
+        indices = np.asarray(list(indices), dtype=np.int64)
+        if indices.size and (indices.min() < 1 or indices.max() > count):
+            raise ValueError(f"元素 {element} 只有 {count} 个原子")
+        return start + indices - 1
+
+    # --- 读取 ---
+    def frame_indices(self, frames=None):
+        if frames is None:
+            return np.arange(len(self))
+        if isinstance(frames, slice):
+            return np.arange(len(self))[frames]
+        frames = np.atleast_1d(np.asarray(frames, dtype=np.int64))
+        frames[frames < 0] += len(self)
+        return frames
+
+    def read(self, frames=None, atoms=None, axes='xyz', cartesian=None):
+        # 返回 (帧数, 原子数, 轴数) 的 float64 数组。
+        # cartesian=None 保持文件中的坐标类型；True/False 时统一转换为 Cartesian/Direct
+        frames = self.frame_indices(frames)
+        atoms = np.arange(self.natoms) if atoms is None else np.asarray(atoms, dtype=np.int64)
+        axes = parse_axes(axes)
+        convert = cartesian is not None and bool((self.cartesian[frames] != cartesian).any())
+        read_axes = [0, 1, 2] if convert else axes
+        out = np.empty((len(frames), len(atoms), len(axes)))
+        for lo in range(0, len(frames), CHUNK_FRAMES):
+            chunk = frames[lo:lo + CHUNK_FRAMES]
+            coords = self._read_raw(chunk, atoms, read_axes)
+            if convert:
+                coords = self._convert(chunk, coords, cartesian)[..., axes]
+            out[lo:lo + len(chunk)] = coords
+        return out
+
+    def _read_raw(self, frames, atoms, axes):
+        if self.line_len is not None:
+            values = self._read_fixed(frames, atoms, axes)
+            if values is not None:
+                return values
+        out = np.empty((len(frames), len(atoms), len(axes)))
+        for n, frame in enumerate(frames):
+            out[n] = self._read_frame(frame)[atoms][:, axes]
+        return out
+
+    def _lines(self, frames, atoms):
+        # 选中原子的坐标行，形状 (帧数, 原子数, 行长)；布局与这些帧不符时返回 None。
+        # 帧间距相同且原子连续时 (同一元素的原子总是连续的) 每帧只需一次连续拷贝，不需要索引数组
+        base = self.offsets[frames]
+        line_len = self.line_len
+        n, k = len(base), len(atoms)
+        # 选中原子所在行必须在本帧之内
+        if ((atoms.max() + 1) * line_len > (self.ends[frames] - base)).any():
+            return None
+        frame_step = int(base[1] - base[0]) if n > 1 else 0
+        first = int(base[0]) + int(atoms[0]) * line_len
+        if ((n < 2 or (np.diff(base) == frame_step).all()) and frame_step >= 0
+                and (k < 2 or (np.diff(atoms) == 1).all())):
+            view = np.lib.stride_tricks.as_strided(self._buf[first:], shape=(n, k * line_len),
+                                                   strides=(frame_step, 1), writeable=False)
+            lines = np.array(view).reshape(n, k, line_len)
+        else:
+            columns = (atoms * line_len)[:, None] + np.arange(line_len)[None, :]
+            lines = self._buf[base[:, None, None] + columns[None, :, :]]
+        # 行尾必须是换行符
+        if not (lines[:, :, -1] == 10).all():
+            return None
+        return lines
+
+    def _field(self, lines, axis):
+        start, width, _ = self.spans[axis]
+        return lines[:, :, start:start + width]
+
+    def _read_fixed(self, frames, atoms, axes):
+        # 所有帧的坐标行宽度一致时直接从 mmap 中按列取字符并向量化解析；不一致时返回 None
+        if not len(atoms):
+            return np.empty((len(frames), 0, len(axes)))
+        lines = self._lines(frames, atoms)
+        if lines is None:
+            return None
+        out = np.empty((len(frames), len(atoms), len(axes)))
+        for j, axis in enumerate(axes):
+            values = _parse_fixed(self._field(lines, axis), self.spans[axis][2])
+            if values is None:
+                return None
+            out[:, :, j] = values
+        return out
+
+    def _strided(self, frames, atoms):
+        # 帧间距相同、原子连续且选中原子所在行都在本帧之内时，返回 (第一个选中行的偏移, 帧间距)，否则返回 None
+        base = self.offsets[frames]
+        n, k = len(base), len(atoms)
+        frame_step = int(base[1] - base[0]) if n > 1 else 0
+        if not ((n < 2 or (np.diff(base) == frame_step).all()) and frame_step >= 0
+                and (k < 2 or (np.diff(atoms) == 1).all())):
+            return None
+        if ((atoms.max() + 1) * self.line_len > (self.ends[frames] - base)).any():
+            return None
+        return int(base[0]) + int(atoms[0]) * self.line_len, frame_step
+
+    def _gather(self, first, frame_step, shape, offset, size, out=None):
+        # 把每个选中行中 [offset, offset+size) 的字节当作一个定长元素 (V 类型) 从 mmap 中一次拷贝，
+        # 比逐字节的跨步拷贝快一倍。返回 (帧数, 原子数, size) 的字节数组，或写入 out 的 V 类型视图
+        view = np.ndarray(shape, dtype=f'V{size}', buffer=self.mm, offset=first + offset,
+                          strides=(frame_step, self.line_len))
+        if out is not None:
+            out[...] = view
+            return out
+        return np.array(view).view(np.uint8).reshape(shape + (size,))
+
+    def _field_chars(self, frames, atoms, axis):
+        # 选中原子某一轴的字符，形状 (帧数, 原子数, 宽度)；布局与这些帧不符时返回 None
+        layout = self._strided(frames, atoms)
+        if layout is None:
+            lines = self._lines(frames, atoms)
+            return None if lines is None else self._field(lines, axis)
+        start, width, _ = self.spans[axis]
+        # 从字段起点拷贝到行尾 (含换行符)，顺便检查行尾
+        chars = self._gather(*layout, (len(frames), len(atoms)), start, self.line_len - start)
+        if not (chars[:, :, -1] == 10).all():  # 行尾必须是换行符
+            return None
+        return chars[:, :, :width]
+
+    def _copy_text(self, frames, atoms, axis):
+        # 最常见的情形: 布局规则、帧号位数相同、每个数值去掉共同的前导空格后不含空格。
+        # 共同前导空格数由第一帧猜出，数值字符直接从 mmap 拷贝到输出行中，再检查跳过的都是空格、
+        # 拷贝的都不是空格；任一条件不满足时返回 None，由 iter_text 拼好整行后删除空格
+        numbers = frames + 1
+        digits = len(str(int(numbers.max())))
+        layout = self._strided(frames, atoms)
+        if layout is None or len(str(int(numbers.min()))) != digits:
+            return None
+        first, frame_step = layout
+        n, k = len(frames), len(atoms)
+        start, width, _ = self.spans[axis]
+        # 行尾必须是换行符
+        ends = np.ndarray((n, k), dtype=np.uint8, buffer=self.mm, offset=first + self.line_len - 1,
+                          strides=(frame_step, self.line_len))
+        if not (ends == 10).all():
+            return None
+        head = np.frombuffer(self.mm, dtype=np.uint8, count=k * self.line_len, offset=first)
+        head = head.reshape(k, self.line_len)[:, start:start + width]
+        lead = int((np.cumprod(head == 32, axis=1)).sum(axis=1).min())
+        if lead == width:
+            return None
+        if lead and not (self._gather(first, frame_step, (n, k), start, lead) == 32).all():
+            return None
+        token = width - lead
+        row = np.empty((n, digits + k * (token + 1) + 1), dtype=np.uint8)
+        row[:, :digits] = numbers[:, None] // 10 ** np.arange(digits - 1, -1, -1) % 10 + 48
+        row[:, digits:-1].reshape(n, k, token + 1)[:, :, 0] = 44
+        fields = np.ndarray((n, k), dtype=f'V{token}', buffer=row, offset=digits + 1,
+                            strides=(row.shape[1], token + 1))
+        self._gather(first, frame_step, (n, k), start + lead, token, out=fields)
+        if not (row[:, :-1] > 32).all():
+            return None
+        row[:, -1] = 10
+        return row.tobytes()
+
+    def iter_text(self, frames, atoms, axis):
+        # 命令行输出: 每 CHUNK_FRAMES 帧一段 "帧号,v1,v2,...\n"，数值按文件中的原文拷贝 (与 awk 打印 $3 相同)，
+        # 不做坐标转换。固定宽度布局时整块拷贝字符，否则逐帧 split
+        for lo in range(0, len(frames), CHUNK_FRAMES):
+            chunk = frames[lo:lo + CHUNK_FRAMES]
+            if self.line_len is not None and len(atoms):
+                text = self._copy_text(chunk, atoms, axis)
+                if text is not None:
+                    yield text
+                    continue
+                chars = self._field_chars(chunk, atoms, axis)
+            else:
+                chars = None
+            if chars is None:
+                parts = []
+                for frame in chunk:
+                    block = self.mm[int(self.offsets[frame]):int(self.ends[frame])]
+                    lines = block.split(b'\n', self.natoms)
+                    parts.append(b','.join([b'%d' % (frame + 1)] + [lines[i].split()[axis] for i in atoms]) + b'\n')
+                yield b''.join(parts)
+                continue
+            # 每行: 帧号 (右对齐) + k 个 ",字段" + 换行，最后统一删掉空格
+            n, k, width = chars.shape
+            number = np.char.rjust((chunk + 1).astype(bytes), 10).view(np.uint8).reshape(n, -1)
+            row = np.full((n, number.shape[1] + k * (width + 1) + 1), 32, dtype=np.uint8)
+            row[:, :number.shape[1]] = number
+            fields = row[:, number.shape[1]:-1].reshape(n, k, width + 1)
+            fields[:, :, 0] = 44
+            fields[:, :, 1:] = chars
+            row[:, -1] = 10
+            row = row.ravel()
+            yield row[(row != 32) & (row != 0)].tobytes()
+
+    def read_text(self, frames, atoms, axis):
+        return b''.join(self.iter_text(frames, atoms, axis))
+
+    def _read_frame(self, frame):
+        block = self.mm[int(self.offsets[frame]):int(self.ends[frame])]
+        tokens = block.split(b'\n', self.natoms)[:self.natoms]
+        return np.array([line.split()[:3] for line in tokens], dtype=float)
+
+    def _convert(self, frames, coords, cartesian):
+        out = coords.copy()
+        for n, frame in enumerate(frames):
+            if self.cartesian[frame] == cartesian:
+                continue
+            lattice = self.cell(frame)
+            out[n] = coords[n] @ lattice if cartesian else coords[n] @ np.linalg.inv(lattice)
+        return out
+
+    def close(self):
+        self._buf = None  # 先释放对 mmap 的引用
+        self.mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def decimals_of(xdat, atoms, axis):
+    # 第一帧中该字段的小数位数，用于按文件原样的精度输出
+    block = xdat.mm[int(xdat.offsets[0]):int(xdat.ends[0])]
+    token = block.split(b'\n', int(atoms[0]) + 1)[int(atoms[0])].split()[axis]
+    return len(token.split(b'.')[1]) if b'.' in token else 8
+
+
+def parse_frames(text):
+    # "100:2000:10" -> slice(100, 2000, 10)，帧号从 1 开始 (与输出第一列一致)
+    parts = [int(p) - 1 if p and i < 2 else (int(p) if p else None) for i, p in enumerate(text.split(':'))]
+    if len(parts) == 1:
+        return slice(parts[0], parts[0] + 1)
+    return slice(*parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="从 XDATCAR 提取元素坐标 (默认输出与 extract_z.sh 相同: 帧号,z1,z2,...)。")
+    parser.add_argument('element', help='元素符号 (如 O)')
+    parser.add_argument('file', nargs='?', default='XDATCAR', help='XDATCAR 文件 (默认: XDATCAR)')
+    parser.add_argument('indices', nargs='?', default='',
+                        help='该元素内以逗号分隔的原子序号 (从 1 开始)，如 "2,4"；省略为全部')
+    parser.add_argument('--axes', default='z', help='输出的坐标轴 (默认: z)，例如 xyz')
+    parser.add_argument('--cartesian', action='store_true', help='输出 Cartesian 坐标 (默认 Direct)')
+    parser.add_argument('--frames', help='帧范围 start:stop[:step]，帧号从 1 开始')
+    parser.add_argument('--npy', help='把 (帧数, 原子数, 轴数) 数组保存为 .npy，而不是输出文本')
+    parser.add_argument('--no-index-cache', action='store_true', help=f'不读写 {INDEX_SUFFIX} 帧索引缓存')
+    args = parser.parse_args()
+
+    with Xdatcar(args.file, cache_index=not args.no_index_cache) as xdat:
+        try:
+            indices = [int(i) for i in args.indices.split(',')] if args.indices else None
+            if indices is not None:
+                # 与 awk 版一致: 按文件中的顺序输出、重复的只输出一次、超出范围的忽略
+                count = xdat.counts[xdat.species.index(args.element)] if args.element in xdat.species else 0
+                skipped = sorted({i for i in indices if not 1 <= i <= count})
+                if skipped:
+                    print(f"警告: 忽略超出范围的序号 {skipped} (元素 {args.element} 共 {count} 个原子)", file=sys.stderr)
+                indices = sorted({i for i in indices if 1 <= i <= count})
+            atoms = xdat.atoms_of(args.element, indices)
+        except ValueError as e:
+            parser.error(str(e))
+        axes = parse_axes(args.axes)
+        frames = xdat.frame_indices(parse_frames(args.frames) if args.frames else None)
+        if not args.npy and len(axes) == 1 and not args.cartesian and not xdat.cartesian[frames].any():
+            out = sys.stdout.buffer
+            for part in xdat.iter_text(frames, atoms, axes[0]):
+                out.write(part)
+            return
+        coords = xdat.read(frames, atoms, axes, cartesian=args.cartesian)
+        if args.npy:
+            np.save(args.npy, coords)
+            return
+        if not len(frames) or not len(atoms):
+            return
+        decimals = decimals_of(xdat, atoms, axes[0]) if not args.cartesian else 6
+        row_format = '%d' + (f',%.{decimals}f' * (len(atoms) * len(axes))) + '\n'
+        flat = coords.reshape(len(frames), -1)
+        out = sys.stdout
+        for lo in range(0, len(frames), CHUNK_FRAMES):
+            rows = flat[lo:lo + CHUNK_FRAMES].tolist()
+            out.write(''.join([row_format % (frame + 1, *row) for frame, row in zip(frames[lo:lo + CHUNK_FRAMES], rows)]))
+
+
+if __name__ == "__main__":
+    main()